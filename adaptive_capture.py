@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Adaptive capture — per-camera resolution / frame-rate control.
+#
+# Every ADAPT_INTERVAL seconds the controller looks at the last window of
+# decodes (how many frames that passed the gate actually read a barcode)
+# and at the CPU the process used, then moves at most one step:
+#
+#   CPU high                     -> fewer fps, then lower resolution
+#   reads failing, CPU has room  -> higher resolution
+#   CPU low, reads fine          -> more fps, back up to the camera's max
+#
+# A resolution that had to be left because reads failed becomes the
+# floor, so the controller does not bounce between two levels. The
+# frame rate is applied twice: requested from the camera (CAP_PROP_FPS,
+# ignored by many RTSP sources) and enforced by should_decode(), which
+# lets only that many frames per second through to the decoders.
+#
+# Kept free of OpenCV imports; pipeline.apply_capture_settings() does the
+# cap.set() calls on the capture thread.
+# -----------------------------------------------------------------------
+
+RESOLUTION_LEVELS = [(640, 360), (960, 540), (1280, 720), (1920, 1080)]
+FPS_LEVELS = [8, 15, 30]
+
+ADAPT_INTERVAL = 2.0
+MIN_DECODES = 10          # decodes in a window before the hit rate is trusted
+CPU_HIGH = 0.75           # share of all cores used by this process
+CPU_LOW = 0.40
+HIT_RATE_LOW = 0.30       # share of decoded (gated-in) frames that read a barcode
+HIT_RATE_OK = 0.60
+
+
+def process_cpu_share(last):
+    """(share, mark): CPU used by this process since `last` as a share of all cores."""
+    now = (time.monotonic(), time.process_time())
+    if last is None:
+        return None, now
+    wall = now[0] - last[0]
+    if wall <= 0:
+        return None, now
+    return (now[1] - last[1]) / wall / (os.cpu_count() or 1), now
+
+
+class AdaptiveCapture:
+    def __init__(self, frame_size=(1280, 720), fps=None, resolutions=RESOLUTION_LEVELS,
+                 fps_levels=FPS_LEVELS, interval=ADAPT_INTERVAL, cpu_share=process_cpu_share,
+                 label="capture"):
+        """frame_size / fps: where to start (and the highest level used);
+        cpu_share(last) -> (share, mark) can be swapped for a machine-wide measure."""
+        self.resolutions = [size for size in resolutions if size[0] <= frame_size[0]] or [frame_size]
+        self.fps_levels = list(fps_levels)
+        self.interval = interval
+        self.cpu_share = cpu_share
+        self.label = label
+        self.res_level = len(self.resolutions) - 1
+        self.fps_level = len(self.fps_levels) - 1
+        if fps is not None:
+            self.fps_level = max(0, sum(1 for f in self.fps_levels if f <= fps) - 1)
+        self.res_floor = 0
+        self.stats = {"changes": 0, "resolution_down": 0, "resolution_up": 0, "fps_down": 0, "fps_up": 0}
+        self.last_cpu = None
+        self.last_hit_rate = None
+
+        self._outcomes = deque()  # (time, hit) for decodes in the current window
+        self._mark = None
+        self._next_check = time.monotonic() + interval
+        self._next_decode = 0.0
+        self._pending = (self.frame_size, self.fps)
+        self._lock = threading.Lock()
+
+    @property
+    def frame_size(self):
+        return self.resolutions[self.res_level]
+
+    @property
+    def fps(self):
+        return self.fps_levels[self.fps_level]
+
+    # -------------------------------------------------------------------------
+    # Capture / decode hooks
+    # -------------------------------------------------------------------------
+
+    def pending_change(self):
+        """(frame_size, fps) to apply to the capture, once per change; otherwise None."""
+        with self._lock:
+            change, self._pending = self._pending, None
+        return change
+
+    def should_decode(self, now=None):
+        """Frame-rate cap for the decoders; call once per captured frame."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now < self._next_decode:
+                return False
+            self._next_decode = max(self._next_decode + 1.0 / self.fps, now - 0.5 / self.fps)
+            return True
+
+    def record(self, hit, now=None):
+        """Called after every decode with whether it read a barcode."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._outcomes.append((now, bool(hit)))
+            while self._outcomes and self._outcomes[0][0] < now - self.interval * 2:
+                self._outcomes.popleft()
+        self.maybe_adapt(now)
+
+    # -------------------------------------------------------------------------
+    # Policy
+    # -------------------------------------------------------------------------
+
+    def maybe_adapt(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now < self._next_check:
+                return None
+            self._next_check = now + self.interval
+            cpu, self._mark = self.cpu_share(self._mark)
+            decodes = len(self._outcomes)
+            hit_rate = sum(hit for _, hit in self._outcomes) / decodes if decodes else None
+            self.last_cpu, self.last_hit_rate = cpu, hit_rate
+            if cpu is None:
+                return None
+            step = self._choose(cpu, hit_rate if decodes >= MIN_DECODES else None)
+            if step is None:
+                return None
+            self.stats["changes"] += 1
+            self.stats[step] += 1
+            self._outcomes.clear()
+            self._pending = (self.frame_size, self.fps)
+            change = self._pending
+        METRICS.count(f"adapt_{step}")
+        print(f"[Adaptive] {self.label}: {step.replace('_', ' ')} -> {change[0][0]}x{change[0][1]} @ {change[1]} fps "
+              f"(cpu {cpu:.0%}, hit rate {'n/a' if hit_rate is None else f'{hit_rate:.0%}'})")
+        return step
+
+    def _choose(self, cpu, hit_rate):
+        top_res = len(self.resolutions) - 1
+        top_fps = len(self.fps_levels) - 1
+        if cpu > CPU_HIGH:
+            if self.fps_level > 0:
+                self.fps_level -= 1
+                return "fps_down"
+            if self.res_level > self.res_floor and (hit_rate is None or hit_rate >= HIT_RATE_OK):
+                self.res_level -= 1
+                return "resolution_down"
+            return None
+        if hit_rate is not None and hit_rate < HIT_RATE_LOW and self.res_level < top_res:
+            # Small / distant barcodes: more pixels help; don't come back down here
+            self.res_level += 1
+            self.res_floor = max(self.res_floor, self.res_level)
+            return "resolution_up"
+        if cpu < CPU_LOW:
+            if self.fps_level < top_fps:
+                self.fps_level += 1
+                return "fps_up"
+            if hit_rate is not None and hit_rate >= HIT_RATE_OK and self.res_level > self.res_floor:
+                # Reads are easy at this size; try a cheaper one
+                self.res_level -= 1
+                return "resolution_down"
+        return None
+
+    def snapshot_stats(self):
+        with self._lock:
+            return {
+                "frame_size": list(self.frame_size),
+                "fps": self.fps,
+                "cpu": None if self.last_cpu is None else round(self.last_cpu, 3),
+                "hit_rate": None if self.last_hit_rate is None else round(self.last_hit_rate, 3),
+                **self.stats,
+            }
@@ -0,0 +1,303 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# -----------------------------------------------------------------------
+# Decoder backends — every barcode library sits behind the same small
+# interface, so the scanner, the station and the benchmarks can swap,
+# race or auto-select them.
+#
+#   DecoderBackend.load()          import the library; False if missing
+#   DecoderBackend.decode(gray)    [{"data", "rect": (x, y, w, h)}]
+#
+# Detection is deferred: importing zxing-cpp / pyzbar is slow (and pyzbar
+# may fail loading its DLL on Windows), so it happens in
+# probe_backends(), which the Tk app runs on a background thread after
+# the window appears and the CLIs call on first use. OpenCV only counts
+# as a backend when its build has cv2.barcode (4.8+ or contrib).
+#
+# make_decoder(spec) turns a CLI/config value into a decoder callable:
+#   None / "<name>"  one backend (None = the preferred installed one)
+#   "race"           RaceDecoder: all backends on the same image at once,
+#                    first non-empty answer wins
+#   "auto"           BackendTuner: calibrate on the first frames, then
+#                    stick to the fastest backend that reads as well as
+#                    the best one
+# -----------------------------------------------------------------------
+
+# Calibration defaults for BackendTuner
+DEFAULT_CALIBRATION_SAMPLES = 30
+DEFAULT_HIT_TOLERANCE = 0.05
+
+
+def _points_rect(points):
+    """Bounding (x, y, w, h) of a sequence of (x, y) corner points."""
+    xs = [int(p[0]) for p in points]
+    ys = [int(p[1]) for p in points]
+    return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+
+class DecoderBackend:
+    name = None
+
+    def load(self):
+        """Imports the library. Returns False if it isn't installed."""
+        raise NotImplementedError
+
+    def decode(self, image_gray):
+        raise NotImplementedError
+
+
+class ZxingBackend(DecoderBackend):
+    name = "zxingcpp"
+
+    def load(self):
+        try:
+            import zxingcpp
+        except ImportError:
+            return False
+        self._zxingcpp = zxingcpp
+        return True
+
+    def decode(self, image_gray):
+        results = []
+        for barcode in self._zxingcpp.read_barcodes(image_gray):
+            text = barcode.text.strip()
+            if text:
+                p = barcode.position
+                corners = [(c.x, c.y) for c in (p.top_left, p.top_right, p.bottom_right, p.bottom_left)]
+                results.append({"data": text, "rect": _points_rect(corners)})
+        return results
+
+
+class PyzbarBackend(DecoderBackend):
+    name = "pyzbar"
+
+    def load(self):
+        try:
+            from pyzbar.pyzbar import decode as pyzbar_decode
+        except (ImportError, OSError):  # OSError: zbar DLL missing on Windows
+            return False
+        self._decode = pyzbar_decode
+        return True
+
+    def decode(self, image_gray):
+        results = []
+        for barcode in self._decode(image_gray):
+            text = barcode.data.decode("utf-8").strip()
+            if text:
+                results.append({"data": text, "rect": tuple(barcode.rect)})
+        return results
+
+
+class OpenCVBackend(DecoderBackend):
+    """cv2.barcode.BarcodeDetector (OpenCV >= 4.8, or opencv-contrib)."""
+    name = "opencv"
+
+    def __init__(self):
+        self._local = threading.local()   # one detector per thread
+
+    def load(self):
+        try:
+            import cv2
+        except ImportError:
+            return False
+        if not hasattr(cv2, "barcode"):   # OpenCV < 4.8 without the contrib modules
+            print(f"[INFO] OpenCV {cv2.__version__} has no barcode detector; skipping the opencv backend")
+            return False
+        self._cv2 = cv2
+        return True
+
+    def _detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = self._cv2.barcode.BarcodeDetector()
+        return detector
+
+    def decode(self, image_gray):
+        ok, infos, _, points = self._detector().detectAndDecodeWithType(image_gray)
+        if not ok or points is None:
+            return []
+        return [{"data": text.strip(), "rect": _points_rect(corners)}
+                for text, corners in zip(infos, points) if text.strip()]
+
+
+# Every backend we know, in order of preference
+BACKENDS = [ZxingBackend(), PyzbarBackend(), OpenCVBackend()]
+BACKEND_PREFERENCE = tuple(backend.name for backend in BACKENDS)
+
+_lock = threading.Lock()
+_loaded = None   # name -> loaded DecoderBackend, once probed
+
+
+def register_backend(backend, first=False):
+    """Adds a DecoderBackend; takes effect for probes that haven't run yet."""
+    global BACKEND_PREFERENCE
+    with _lock:
+        BACKENDS.insert(0 if first else len(BACKENDS), backend)
+        BACKEND_PREFERENCE = tuple(b.name for b in BACKENDS)
+
+
+def probe_backends():
+    """Loads the available decoders (once). Returns their names in order of preference."""
+    global _loaded
+    with _lock:
+        if _loaded is None:
+            _loaded = {backend.name: backend for backend in BACKENDS if backend.load()}
+            if _loaded:
+                print(f"[INFO] Using {_available()[0]} for barcode scanning")
+            else:
+                print("[WARNING] No barcode scanner library found! Install: pip install zxing-cpp")
+        return _available()
+
+
+def _available():
+    return [name for name in BACKEND_PREFERENCE if name in _loaded]
+
+
+def get_backend(name):
+    """The loaded DecoderBackend called `name`, or None if it isn't installed."""
+    probe_backends()
+    return _loaded.get(name)
+
+
+def scanner_name():
+    backends = probe_backends()
+    return backends[0] if backends else None
+
+
+# -----------------------------------------------------------------------
+# Racing and auto-selection
+# -----------------------------------------------------------------------
+
+class RaceDecoder:
+    """Runs several backends on the same image concurrently; the first hit wins.
+
+    Losers keep running to completion in the pool (the C decoders can't be
+    interrupted), so the pool is sized for a few frames in flight.
+    """
+
+    def __init__(self, names=None, max_workers=None):
+        names = names or probe_backends()
+        self.backends = [get_backend(name) for name in names if get_backend(name) is not None]
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or 2 * max(1, len(self.backends)), thread_name_prefix="decode-race"
+        )
+        self.wins = {backend.name: 0 for backend in self.backends}
+        self._lock = threading.Lock()
+
+    def __call__(self, image_gray):
+        if len(self.backends) == 1:
+            return self.backends[0].decode(image_gray)
+        pending = {self.executor.submit(backend.decode, image_gray): backend for backend in self.backends}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    print(f"[Race] {backend.name} failed: {e}")
+                    continue
+                if results:
+                    with self._lock:
+                        self.wins[backend.name] += 1
+                    return results
+        return []
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class BackendTuner:
+    """Picks a backend per camera from a calibration run on its own frames.
+
+    Every image is decoded by every backend until `samples` images that
+    at least one backend can read have been seen; only those images count
+    for latency and hits, so frames without a barcode don't skew the median.
+    Then the backend with the lowest median latency among those whose hit
+    rate is within `tolerance` of the best is chosen, and used alone from
+    then on.
+    """
+
+    def __init__(self, names=None, samples=DEFAULT_CALIBRATION_SAMPLES,
+                 tolerance=DEFAULT_HIT_TOLERANCE, label=None):
+        names = names or probe_backends()
+        self.backends = [get_backend(name) for name in names if get_backend(name) is not None]
+        self.samples = samples
+        self.tolerance = tolerance
+        self.label = label
+        self.choice = self.backends[0] if len(self.backends) == 1 else None
+
+        self._latencies = {backend.name: [] for backend in self.backends}
+        self._hits = {backend.name: 0 for backend in self.backends}
+        self._informative = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, image_gray):
+        choice = self.choice
+        if choice is not None:
+            return choice.decode(image_gray)
+        return self._calibrate(image_gray)
+
+    def _calibrate(self, image_gray):
+        best = []
+        timings = {}
+        for backend in self.backends:
+            start = time.perf_counter()
+            try:
+                results = backend.decode(image_gray)
+            except Exception as e:
+                print(f"[Tuner] {backend.name} failed: {e}")
+                results = []
+            timings[backend.name] = (time.perf_counter() - start, bool(results))
+            if len(results) > len(best):
+                best = results
+
+        with self._lock:
+            if self.choice is not None:
+                return best
+            if best:
+                for name, (seconds, hit) in timings.items():
+                    self._latencies[name].append(seconds)
+                    self._hits[name] += hit
+                self._informative += 1
+                if self._informative >= self.samples:
+                    self.choice = self._choose()
+                    print(f"[Tuner] {self.label or 'decoder'}: using {self.choice.name} "
+                          f"after {self._informative} samples {self.report()}")
+        return best
+
+    def _choose(self):
+        rates = {name: hits / self._informative for name, hits in self._hits.items()}
+        best_rate = max(rates.values())
+        reliable = [b for b in self.backends if rates[b.name] >= best_rate - self.tolerance]
+        return min(reliable, key=lambda b: _median(self._latencies[b.name]))
+
+    def report(self):
+        """{backend: {"hit_rate", "p50_ms"}} from the calibration run so far."""
+        informative = max(1, self._informative)
+        return {
+            name: {"hit_rate": round(self._hits[name] / informative, 3),
+                   "p50_ms": round(_median(self._latencies[name]) * 1000, 2) if self._latencies[name] else None}
+            for name in self._hits
+        }
+
+
+def _median(values):
+    if not values:
+        return float("inf")
+    ordered = sorted(values)
+    return ordered[len(ordered) // 2]
+
+
+def make_decoder(spec=None, label=None):
+    """Decoder callable for a backend name, "race", "auto" or None (preferred backend)."""
+    if spec == "race":
+        return RaceDecoder()
+    if spec == "auto":
+        return BackendTuner(label=label)
+    backend = get_backend(spec or scanner_name())
+    if backend is None:
+        raise ValueError(f"barcode backend {spec!r} is not available")
+    return backend.decode
@@ -0,0 +1,77 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# -----------------------------------------------------------------------
+# Background tasks for the Tk app — blocking work (network lookups) runs
+# on a thread pool, and results are handed back to the Tk thread via
+# root.after, so the mainloop never blocks and widgets are only touched
+# from the thread that owns them.
+#
+# Tasks are submitted on a named channel. Submitting again on the same
+# channel (or calling cancel) supersedes the previous task: it is
+# cancelled if it hasn't started, and its result is discarded otherwise.
+# A task that raises is handed to its on_error callback (also on the Tk
+# thread), so the caller can reset its widgets and show what went wrong.
+# -----------------------------------------------------------------------
+
+POLL_MS = 20
+
+
+class BackgroundRunner:
+    def __init__(self, root, max_workers=4):
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="background")
+        self._done = queue.Queue()
+        self._generations = {}   # channel -> latest generation number
+        self._futures = {}       # channel -> future of the latest task
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, channel, fn, *args, on_done=None, on_error=None):
+        """Runs fn(*args) in the background; on_done(result), or on_error(exception)
+        if it raised, is called on the Tk thread."""
+        self.cancel(channel)
+        generation = self._generations[channel]
+        future = self.executor.submit(fn, *args)
+        self._futures[channel] = future
+        self._pending += 1
+        future.add_done_callback(
+            lambda f: self._done.put((channel, generation, f, on_done, on_error))
+        )
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._poll)
+        return future
+
+    def cancel(self, channel):
+        self._generations[channel] = self._generations.get(channel, 0) + 1
+        future = self._futures.pop(channel, None)
+        if future is not None:
+            future.cancel()
+
+    def _poll(self):
+        while True:
+            try:
+                channel, generation, future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if future.cancelled() or generation != self._generations.get(channel):
+                continue  # Superseded
+            if self._futures.get(channel) is future:
+                del self._futures[channel]
+            error = future.exception()
+            if error is not None:
+                print(f"[Background] {channel} failed: {error}")
+                if on_error is not None:
+                    on_error(error)
+            elif on_done is not None:
+                on_done(future.result())
+
+        if self._pending > 0:
+            self.root.after(POLL_MS, self._poll)
+        else:
+            self._polling = False
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
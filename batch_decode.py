@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from scanner import SCANNER_AVAILABLE, VariantCascade
+
+# -----------------------------------------------------------------------
+# Offline batch decoding — re-process image folders or recorded video
+# (e.g. overnight returns-desk footage) on every core.
+#
+#   python batch_decode.py recordings/desk1.mp4 --output desk1.jsonl
+#   python batch_decode.py snapshots/ --workers 8
+#
+# Each frame becomes one JSONL line:
+#   {"source": ..., "frame": 0, "barcodes": [...], "variant": "roi_gray", "decode_ms": 3.1}
+# -----------------------------------------------------------------------
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+# Frames in flight per worker — bounds memory while keeping workers busy
+IN_FLIGHT_PER_WORKER = 4
+
+_cascade = None
+
+
+def _init_worker():
+    global _cascade
+    _cascade = VariantCascade()
+
+
+def decode_image(frame):
+    """Decodes one frame in a worker process. Returns (barcodes, variant, decode_ms)."""
+    start = time.perf_counter()
+    results, variant = _cascade.decode(frame)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    barcodes = [{"data": r["data"], "rect": list(r["rect"]) if r["rect"] else None}
+                for r in results]
+    return barcodes, variant, elapsed_ms
+
+
+def decode_image_file(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        raise ValueError(f"Could not read image: {path}")
+    return decode_image(frame)
+
+
+def iter_image_jobs(directory):
+    names = sorted(
+        name for name in os.listdir(directory)
+        if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+    )
+    for index, name in enumerate(names):
+        path = os.path.join(directory, name)
+        yield path, index, decode_image_file, path
+
+
+def iter_video_jobs(path, every=1):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open video: {path}")
+    index = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % every == 0:
+                yield path, index, decode_image, frame
+            index += 1
+    finally:
+        cap.release()
+
+
+def run_batch(input_path, out, workers=None, every=1):
+    """Decodes every frame of input_path, writing JSONL to out. Returns a summary dict."""
+    workers = workers or os.cpu_count() or 1
+    if os.path.isdir(input_path):
+        jobs = iter_image_jobs(input_path)
+    else:
+        jobs = iter_video_jobs(input_path, every=every)
+
+    frames = hits = errors = 0
+    start = time.perf_counter()
+    in_flight = deque()
+
+    def drain_one():
+        nonlocal frames, hits, errors
+        source, index, future = in_flight.popleft()
+        record = {"source": source, "frame": index}
+        try:
+            barcodes, variant, decode_ms = future.result()
+            record.update(barcodes=barcodes, variant=variant, decode_ms=round(decode_ms, 3))
+            hits += 1 if barcodes else 0
+        except Exception as e:
+            record["error"] = str(e)
+            errors += 1
+        frames += 1
+        out.write(json.dumps(record) + "\n")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for source, index, fn, arg in jobs:
+            in_flight.append((source, index, pool.submit(fn, arg)))
+            # Results are written in input order; wait on the oldest when the window is full
+            if len(in_flight) >= workers * IN_FLIGHT_PER_WORKER:
+                drain_one()
+        while in_flight:
+            drain_one()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "frames_with_barcodes": hits,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+        "workers": workers,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Decode barcodes from an image folder or video file.")
+    parser.add_argument("input", help="directory of images or a video file")
+    parser.add_argument("--output", "-o", help="JSONL output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="decode processes (default: all cores)")
+    parser.add_argument("--every", type=int, default=1, help="decode every Nth video frame")
+    args = parser.parse_args(argv)
+
+    if not SCANNER_AVAILABLE:
+        print("[ERROR] No barcode scanner library found! Install: pip install zxing-cpp")
+        return 1
+
+    out = open(args.output, mode='w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = run_batch(args.input, out, workers=args.workers, every=max(1, args.every))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(
+        f"[Batch] {summary['frames']} frames, {summary['frames_with_barcodes']} with barcodes, "
+        f"{summary['errors']} errors in {summary['seconds']}s "
+        f"({summary['fps']} frames/s on {summary['workers']} workers)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,287 @@
+import argparse
+import json
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from backends import RaceDecoder, make_decoder
+from isbn import isbn13_check_digit
+from scanner import AVAILABLE_BACKENDS, SHARPEN_KERNEL, VariantCascade, guide_box
+
+# -----------------------------------------------------------------------
+# Decode benchmark — synthetic EAN-13/ISBN corpus, generated offline.
+#
+#   python bench_decode.py --per-class 30 --output bench.json
+#   python bench_decode.py --baseline bench.json      # exit 1 on regression
+#
+# Every backend x strategy x distortion class is timed. p50/p95 latency,
+# frames/sec and detection rate (decoded text == encoded ISBN) are
+# reported. The corpus is seeded, so runs are comparable. --backends
+# also accepts "race" and "auto" (see backends.make_decoder); the
+# "pyramid" strategy is the cascade with half-resolution levels first.
+# -----------------------------------------------------------------------
+
+FRAME_SIZE = (1280, 720)
+
+# EAN-13 symbol tables
+L_CODES = ["0001101", "0011001", "0010011", "0111101", "0100011",
+           "0110001", "0101111", "0111011", "0110111", "0001011"]
+R_CODES = ["".join("1" if b == "0" else "0" for b in code) for code in L_CODES]
+G_CODES = [code[::-1] for code in R_CODES]
+PARITY = ["LLLLLL", "LLGLGG", "LLGGLG", "LLGGGL", "LGLLGG",
+          "LGGLLG", "LGGGLG", "LGLGGL", "LGLGLG", "LGGLGL"]
+QUIET_MODULES = 11
+
+
+def ean13_modules(code):
+    """Returns the 95-module bar pattern ("1" = bar) for a 13-digit EAN."""
+    digits = [int(d) for d in code]
+    parity = PARITY[digits[0]]
+    left = "".join((L_CODES if p == "L" else G_CODES)[d] for p, d in zip(parity, digits[1:7]))
+    right = "".join(R_CODES[d] for d in digits[7:])
+    return "101" + left + "01010" + right + "101"
+
+
+def render_ean13(code, module_px=3, height=90):
+    modules = np.array([0] * QUIET_MODULES + [int(b) for b in ean13_modules(code)] + [0] * QUIET_MODULES,
+                       dtype=np.uint8)
+    row = np.repeat(np.where(modules == 1, 0, 255).astype(np.uint8), module_px)
+    return np.tile(row, (height, 1))
+
+
+def random_isbn13(rng):
+    first12 = "978" + "".join(str(d) for d in rng.integers(0, 10, size=9))
+    return first12 + isbn13_check_digit(first12)
+
+
+# -----------------------------------------------------------------------
+# Distortion classes — each returns a grayscale barcode patch
+# -----------------------------------------------------------------------
+
+def _clean(code, rng):
+    return render_ean13(code)
+
+
+def _blur(code, rng):
+    patch = render_ean13(code)
+    return cv2.GaussianBlur(patch, (0, 0), float(rng.uniform(1.0, 2.0)))
+
+
+def _rotation(code, rng):
+    patch = render_ean13(code)
+    angle = float(rng.uniform(5, 25) * rng.choice([-1, 1]))
+    h, w = patch.shape
+    m = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    cos, sin = abs(m[0, 0]), abs(m[0, 1])
+    nw, nh = int(h * sin + w * cos), int(h * cos + w * sin)
+    m[0, 2] += nw / 2 - w / 2
+    m[1, 2] += nh / 2 - h / 2
+    return cv2.warpAffine(patch, m, (nw, nh), borderValue=255)
+
+
+def _low_contrast(code, rng):
+    patch = render_ean13(code).astype(np.float32)
+    low, high = float(rng.uniform(90, 110)), float(rng.uniform(150, 170))
+    return (low + patch / 255.0 * (high - low)).astype(np.uint8)
+
+
+def _noise(code, rng):
+    patch = render_ean13(code).astype(np.float32)
+    patch += rng.normal(0, 30, size=patch.shape)
+    return np.clip(patch, 0, 255).astype(np.uint8)
+
+
+def _scale(code, rng):
+    patch = render_ean13(code, module_px=4)
+    factor = float(rng.uniform(0.3, 0.45))
+    return cv2.resize(patch, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+
+
+DISTORTIONS = {
+    "clean": _clean,
+    "blur": _blur,
+    "rotation": _rotation,
+    "low_contrast": _low_contrast,
+    "noise": _noise,
+    "scale": _scale,
+}
+
+
+def place_in_frame(patch, rng):
+    """Pastes a patch at a random spot inside the guide box of a BGR frame."""
+    w_f, h_f = FRAME_SIZE
+    frame = np.full((h_f, w_f), 200, dtype=np.uint8)
+    frame += rng.integers(0, 20, size=frame.shape, dtype=np.uint8)
+    x1, y1, x2, y2 = guide_box(frame.shape)
+    ph, pw = patch.shape
+    x = int(rng.integers(x1, max(x1 + 1, x2 - pw)))
+    y = int(rng.integers(y1, max(y1 + 1, y2 - ph)))
+    ph, pw = min(ph, h_f - y), min(pw, w_f - x)
+    frame[y:y + ph, x:x + pw] = patch[:ph, :pw]
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+
+def build_corpus(per_class, seed=1234, classes=None):
+    """Returns [(distortion, isbn, frame)] — deterministic for a given seed."""
+    rng = np.random.default_rng(seed)
+    corpus = []
+    for name in classes or DISTORTIONS:
+        for _ in range(per_class):
+            code = random_isbn13(rng)
+            corpus.append((name, code, place_in_frame(DISTORTIONS[name](code, rng), rng)))
+    return corpus
+
+
+# -----------------------------------------------------------------------
+# Variant strategies
+# -----------------------------------------------------------------------
+
+def strategy_legacy(frame, decoder):
+    """The original get_preprocessed_variants: build all four, then decode in order."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    variants = [
+        gray,
+        cv2.equalizeHist(gray),
+        cv2.filter2D(gray, -1, SHARPEN_KERNEL),
+        cv2.resize(gray, (gray.shape[1] * 2, gray.shape[0] * 2), interpolation=cv2.INTER_LINEAR),
+    ]
+    for variant in variants:
+        results = decoder(variant)
+        if results:
+            return results
+    return []
+
+
+def strategy_gray_only(frame, decoder):
+    return decoder(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+
+
+def make_cascade_strategy(pyramid=False):
+    cascade = VariantCascade(pyramid=pyramid)
+
+    def strategy_cascade(frame, decoder):
+        results, _ = cascade.decode(frame, decoder=decoder)
+        return results
+
+    return strategy_cascade
+
+
+STRATEGIES = {
+    "legacy": lambda: strategy_legacy,
+    "gray_only": lambda: strategy_gray_only,
+    "cascade": make_cascade_strategy,
+    "pyramid": lambda: make_cascade_strategy(pyramid=True),
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    return float(np.percentile(np.asarray(values), pct))
+
+
+def run_benchmark(corpus, backends, strategies):
+    rows = []
+    for backend in backends:
+        # A library name, or "race"/"auto" to measure the combined decoders
+        decoder = make_decoder(backend)
+
+        for strategy_name in strategies:
+            strategy = STRATEGIES[strategy_name]()
+            per_class = {}
+            for distortion, code, frame in corpus:
+                start = time.perf_counter()
+                results = strategy(frame, decoder)
+                elapsed = time.perf_counter() - start
+                stats = per_class.setdefault(distortion, {"latencies": [], "hits": 0})
+                stats["latencies"].append(elapsed * 1000)
+                if any(r["data"] == code for r in results):
+                    stats["hits"] += 1
+
+            for distortion, stats in per_class.items():
+                lat = stats["latencies"]
+                total_s = sum(lat) / 1000
+                rows.append({
+                    "backend": backend,
+                    "strategy": strategy_name,
+                    "distortion": distortion,
+                    "frames": len(lat),
+                    "detection_rate": round(stats["hits"] / len(lat), 4),
+                    "p50_ms": round(percentile(lat, 50), 3),
+                    "p95_ms": round(percentile(lat, 95), 3),
+                    "fps": round(len(lat) / total_s, 2) if total_s else None,
+                })
+        if isinstance(decoder, RaceDecoder):
+            decoder.shutdown()
+    return rows
+
+
+def find_regressions(rows, baseline_rows, latency_tolerance, rate_tolerance):
+    """Compares against a previous run; returns human-readable regression messages."""
+    baseline = {(r["backend"], r["strategy"], r["distortion"]): r for r in baseline_rows}
+    problems = []
+    for row in rows:
+        key = (row["backend"], row["strategy"], row["distortion"])
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if row["p50_ms"] > old["p50_ms"] * (1 + latency_tolerance):
+            problems.append(f"{'/'.join(key)}: p50 {old['p50_ms']} -> {row['p50_ms']} ms")
+        if row["detection_rate"] < old["detection_rate"] - rate_tolerance:
+            problems.append(
+                f"{'/'.join(key)}: detection {old['detection_rate']} -> {row['detection_rate']}"
+            )
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark barcode decoders on a synthetic corpus.")
+    parser.add_argument("--per-class", type=int, default=20, help="images per distortion class")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--backends", nargs="+", default=AVAILABLE_BACKENDS,
+                        choices=AVAILABLE_BACKENDS + ["race", "auto"])
+    parser.add_argument("--strategies", nargs="+", default=list(STRATEGIES), choices=list(STRATEGIES))
+    parser.add_argument("--distortions", nargs="+", default=list(DISTORTIONS), choices=list(DISTORTIONS))
+    parser.add_argument("--output", "-o", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--latency-tolerance", type=float, default=0.15,
+                        help="allowed relative p50 slowdown before flagging")
+    parser.add_argument("--rate-tolerance", type=float, default=0.05,
+                        help="allowed absolute drop in detection rate before flagging")
+    args = parser.parse_args(argv)
+
+    if not args.backends:
+        print("[ERROR] No barcode scanner library found! Install: pip install zxing-cpp")
+        return 1
+
+    corpus = build_corpus(args.per_class, seed=args.seed, classes=args.distortions)
+    rows = run_benchmark(corpus, args.backends, args.strategies)
+
+    print(f"{'backend':10} {'strategy':10} {'distortion':13} {'rate':>6} {'p50 ms':>8} {'p95 ms':>8} {'fps':>8}")
+    for r in rows:
+        print(f"{r['backend']:10} {r['strategy']:10} {r['distortion']:13} "
+              f"{r['detection_rate']:6.2f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['fps'] or 0:8.1f}")
+
+    report = {
+        "corpus": {"per_class": args.per_class, "seed": args.seed, "frame_size": list(FRAME_SIZE)},
+        "results": rows,
+    }
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as f:
+            baseline_rows = json.load(f)["results"]
+        problems = find_regressions(rows, baseline_rows, args.latency_tolerance, args.rate_tolerance)
+        for problem in problems:
+            print(f"[REGRESSION] {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,508 @@
+import argparse
+import heapq
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import books_api
+import main as app_module
+from bench_decode import FRAME_SIZE, random_isbn13, render_ean13
+from metrics import METRICS
+from scanner import guide_box
+from stub_books_api import StubBooksAPI
+
+# -----------------------------------------------------------------------
+# End-to-end scan benchmark — from "Scan Barcode" to the result on
+# screen, headless.
+#
+#   python bench_scan.py --synthetic 10 --output scan.json
+#   python bench_scan.py --video desk1.mp4 --video desk2.mp4 --latency-ms 150 --error-rate 0.05
+#   python bench_scan.py --synthetic 10 --baseline scan.json   # exit 1 on regression
+#
+# The app's own start_scanning path runs unchanged: ScanPipeline, the
+# FrameGate, the decoder cascade, ScanConfirmer, the background lookup
+# (fetch_book_info_from_api + metadata cache), the catalog write and
+# fetch_recommendations_from_api. Only the edges are replaced:
+#
+#   camera        recorded videos, replayed at their frame rate in place
+#                 of cv2.VideoCapture (RecordedStream)
+#   Google Books  GOOGLE_BOOKS_API / GOOGLE_BOOKS_CATEGORY_API point at a
+#                 StubBooksAPI with the given latency and error rate
+#   Tk            a headless event loop; the result label is watched to
+#                 see when the final result is shown
+#
+# --synthetic N records N short videos (empty desk, then a book held
+# still) so the benchmark also runs without recordings. The catalog and
+# metadata cache live in a temp dir. For every stage below, p50/p95/p99
+# and max are reported in ms.
+# -----------------------------------------------------------------------
+
+STAGES = [
+    ("connect",         "start",      "first_frame"),  # button press -> first frame read
+    ("decode",          "hit_frame",  "decoded"),      # first readable frame captured -> decoded
+    ("confirm",         "decoded",    "confirmed"),    # -> enough agreeing reads on the Tk thread
+    ("lookup",          "confirmed",  "book_info"),    # -> book info back (cache / API)
+    ("recommendations", "book_info",  "result"),       # -> final result with recommendations
+    ("frame_to_result", "hit_frame",  "result"),
+    ("total",           "start",      "result"),
+]
+
+# Result label texts that are not the final result yet
+PENDING_TEXTS = ("Fetching from Google Books", "Looking for recommendations")
+
+LEAD_SECONDS = 0.5        # empty desk at the start of a synthetic recording
+DEFAULT_TIMEOUT = 15.0
+
+
+# -----------------------------------------------------------------------
+# Replaced edges — camera, Tk, HighGUI
+# -----------------------------------------------------------------------
+
+class RecordedStream:
+    """cv2.VideoCapture stand-in that replays a video file at its recorded frame rate."""
+
+    def __init__(self, path, realtime=True):
+        self.path = path
+        self.realtime = realtime
+        self._cap = cv2.VideoCapture(path)
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self.first_read = None
+        self._next = None
+        self._read_times = OrderedDict()   # id(frame) -> time it was delivered
+        self._lock = threading.Lock()
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def set(self, prop, value):
+        return False   # A recording has a fixed size and frame rate
+
+    def get(self, prop):
+        return self._cap.get(prop)
+
+    def read(self):
+        now = time.perf_counter()
+        if self._next is None:
+            self._next = now
+        elif self.realtime and self._next > now:
+            time.sleep(self._next - now)
+        self._next += 1.0 / self.fps
+        ret, frame = self._cap.read()
+        if ret:
+            delivered = time.perf_counter()
+            with self._lock:
+                if self.first_read is None:
+                    self.first_read = delivered
+                self._read_times[id(frame)] = delivered
+                while len(self._read_times) > 256:
+                    self._read_times.popitem(last=False)
+        return ret, frame
+
+    def frame_time(self, frame):
+        with self._lock:
+            return self._read_times.get(id(frame))
+
+    def release(self):
+        self._cap.release()
+
+
+class HeadlessRoot:
+    """Just enough of tk.Tk for the app: after() callbacks run on the thread calling run()."""
+
+    def __init__(self):
+        self._timers = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def after(self, ms, fn=None, *args):
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._timers, (time.perf_counter() + ms / 1000, self._seq, fn, args))
+            return f"after#{self._seq}"
+
+    def __getattr__(self, name):
+        return _ignore   # title, geometry, configure, update_idletasks, quit, ...
+
+    def run(self, until, timeout):
+        """Runs due callbacks until until() is true. Returns False on timeout."""
+        deadline = time.perf_counter() + timeout
+        while not until():
+            now = time.perf_counter()
+            if now > deadline:
+                return False
+            with self._lock:
+                due = heapq.heappop(self._timers) if self._timers and self._timers[0][0] <= now else None
+                wait = self._timers[0][0] - now if self._timers else 0.002
+            if due is None:
+                time.sleep(min(max(wait, 0), 0.002))
+                continue
+            _, _, fn, args = due
+            if fn is not None:
+                fn(*args)
+        return True
+
+
+def _ignore(*args, **kwargs):
+    return None
+
+
+class HeadlessWidget:
+    """Any tkinter/ttk widget, variable or style — accepts everything, shows nothing."""
+
+    def __init__(self, *args, **kwargs):
+        self.options = dict(kwargs)
+
+    def config(self, *args, **kwargs):
+        self.options.update(kwargs)   # ttk.Style().configure("TLabel", ...) passes a style name
+
+    configure = config
+
+    def get(self):
+        return self.options.get("value", "")
+
+    def __getattr__(self, name):
+        return _ignore
+
+
+class HeadlessToolkit:
+    """Stands in for the tkinter / ttk modules inside main."""
+
+    def __getattr__(self, name):
+        return HeadlessWidget
+
+
+class LabelProbe(HeadlessWidget):
+    """The scan result label; reports the first final text after a confirmed scan."""
+
+    def __init__(self, on_text):
+        super().__init__()
+        self.on_text = on_text
+
+    def config(self, *args, **kwargs):
+        super().config(*args, **kwargs)
+        if "text" in kwargs:
+            self.on_text(kwargs["text"])
+
+    configure = config
+
+
+class HeadlessMessages:
+    def __init__(self):
+        self.on_error = _ignore
+
+    def showerror(self, title, message):
+        self.on_error(f"{title}: {message}")
+
+    def showwarning(self, title, message):
+        print(f"[Bench] {title}: {message}")
+
+    def showinfo(self, title, message):
+        pass
+
+
+class HeadlessCV2:
+    """main's cv2 with the HighGUI calls turned into no-ops."""
+
+    def __init__(self, cv2_module):
+        self._cv2 = cv2_module
+
+    def imshow(self, name, frame):
+        pass
+
+    def waitKey(self, delay=0):
+        return -1
+
+    def destroyAllWindows(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._cv2, name)
+
+
+# -----------------------------------------------------------------------
+# Tracing one scan through the app
+# -----------------------------------------------------------------------
+
+class ScanTrace:
+    def __init__(self, video, stream, expected=None):
+        self.video = video
+        self.stream = stream
+        self.expected = expected
+        self.events = {}
+        self.barcode = None
+        self.found = None
+        self.save_ms = None
+        self.error = None
+
+    def mark(self, name, when=None):
+        self.events.setdefault(name, time.perf_counter() if when is None else when)
+
+    @property
+    def done(self):
+        return "result" in self.events or self.error is not None
+
+    def stages(self):
+        if self.stream.first_read is not None:
+            self.mark("first_frame", self.stream.first_read)
+        stages = {}
+        for name, start, end in STAGES:
+            if start in self.events and end in self.events:
+                stages[name] = round((self.events[end] - self.events[start]) * 1000, 3)
+        if self.save_ms is not None:
+            stages["save"] = round(self.save_ms, 3)
+        return stages
+
+
+def instrument(app, current):
+    """Wraps the app's scan-path methods; current[0] is the ScanTrace being recorded."""
+    decode_frame = app.decode_frame
+    show_scan_result = app.show_scan_result
+    on_book_info = app._on_scan_book_info
+    save_book = app.save_book_to_csv
+
+    def traced_decode_frame(frame):
+        results = decode_frame(frame)
+        trace = current[0]
+        if results and "decoded" not in trace.events:
+            trace.mark("hit_frame", trace.stream.frame_time(frame))
+            trace.mark("decoded")
+        return results
+
+    def traced_show_scan_result(detected_data):
+        current[0].mark("confirmed")
+        current[0].barcode = detected_data
+        return show_scan_result(detected_data)
+
+    def traced_on_book_info(book_info):
+        current[0].mark("book_info")
+        current[0].found = bool(book_info)
+        return on_book_info(book_info)
+
+    def traced_save(barcode, book_info):
+        start = time.perf_counter()
+        try:
+            return save_book(barcode, book_info)
+        finally:
+            current[0].save_ms = (time.perf_counter() - start) * 1000
+
+    def on_text(text):
+        trace = current[0]
+        if "confirmed" in trace.events and not any(marker in text for marker in PENDING_TEXTS):
+            trace.mark("result")
+
+    def on_error(message):
+        current[0].error = message
+
+    app.decode_frame = traced_decode_frame
+    app.show_scan_result = traced_show_scan_result
+    app._on_scan_book_info = traced_on_book_info
+    app.save_book_to_csv = traced_save
+    app.result_label = LabelProbe(on_text)
+    app_module.messagebox.on_error = on_error
+
+
+def build_app(workdir, stub, args):
+    """The real LibraryManagementApp on a headless root, wired to the stub and a temp catalog."""
+    app_module.tk = app_module.ttk = HeadlessToolkit()
+    app_module.messagebox = HeadlessMessages()
+    app_module.CATALOG_FILE = os.path.join(workdir, "books.csv")
+    app_module.METADATA_CACHE_FILE = os.path.join(workdir, "isbn_cache.sqlite3")
+    app_module.SCAN_BACKEND = args.backend
+    app_module.SCAN_ADAPTIVE = args.adaptive
+    books_api.GOOGLE_BOOKS_API = stub.isbn_url
+    books_api.GOOGLE_BOOKS_CATEGORY_API = stub.category_url
+    app_module.load_scanning_modules()
+    app_module.cv2 = HeadlessCV2(cv2)
+
+    root = HeadlessRoot()
+    app = app_module.LibraryManagementApp(root)
+    # Wait for the decoder probe, like a desk that has been open for a moment
+    if not root.run(lambda: app.scanner_name is not None, timeout=30):
+        raise RuntimeError("no barcode scanner library found (pip install zxing-cpp)")
+    return root, app
+
+
+def run_scan(root, app, current, video, expected, args):
+    stream = RecordedStream(video, realtime=not args.fast)
+    trace = current[0] = ScanTrace(video, stream, expected)
+    app.get_camera_source = lambda: stream
+    trace.mark("start")
+    app.start_scanning()
+    if not root.run(lambda: trace.done, timeout=args.timeout):
+        trace.error = "timeout"
+    if app.pipeline is not None:
+        app.stop_scanning()
+    return trace
+
+
+# -----------------------------------------------------------------------
+# Synthetic recordings
+# -----------------------------------------------------------------------
+
+def record_synthetic(path, code, rng, seconds=3.0, fps=30, module_px=4):
+    """Writes a video: LEAD_SECONDS of empty desk, then the barcode held (almost) still."""
+    w_f, h_f = FRAME_SIZE
+    patch = render_ean13(code, module_px=module_px, height=140)
+    x1, y1, x2, y2 = guide_box((h_f, w_f))
+    x = int(rng.integers(x1, max(x1 + 1, x2 - patch.shape[1])))
+    y = int(rng.integers(y1, max(y1 + 1, y2 - patch.shape[0])))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, FRAME_SIZE)
+    for n in range(int(seconds * fps)):
+        frame = np.full((h_f, w_f), 200, dtype=np.uint8)
+        frame += rng.integers(0, 20, size=frame.shape, dtype=np.uint8)
+        if n >= LEAD_SECONDS * fps:
+            # A hand never holds a book perfectly still
+            dx, dy = (int(d) for d in rng.integers(-2, 3, size=2))
+            ph, pw = patch.shape
+            frame[y + dy:y + dy + ph, x + dx:x + dx + pw] = patch
+        writer.write(cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR))
+    writer.release()
+
+
+def make_recordings(workdir, count, seed):
+    """Returns [(path, isbn)] for `count` synthetic recordings."""
+    rng = np.random.default_rng(seed)
+    recordings = []
+    for i in range(count):
+        code = random_isbn13(rng)
+        path = os.path.join(workdir, f"recording_{i:03d}.avi")
+        record_synthetic(path, code, rng)
+        recordings.append((path, code))
+    return recordings
+
+
+# -----------------------------------------------------------------------
+# Report
+# -----------------------------------------------------------------------
+
+def percentile(values, pct):
+    return round(float(np.percentile(np.asarray(values), pct)), 3)
+
+
+def summarize(traces):
+    per_stage = {}
+    for trace in traces:
+        for stage, ms in trace.stages().items():
+            per_stage.setdefault(stage, []).append(ms)
+    order = [name for name, _, _ in STAGES[:5]] + ["save"] + [name for name, _, _ in STAGES[5:]]
+    stages = {}
+    for stage in order:
+        values = per_stage.get(stage)
+        if values:
+            stages[stage] = {"n": len(values), "p50_ms": percentile(values, 50),
+                             "p95_ms": percentile(values, 95), "p99_ms": percentile(values, 99),
+                             "max_ms": round(max(values), 3)}
+    completed = [t for t in traces if "result" in t.events]
+    return {
+        "scans": len(traces),
+        "completed": len(completed),
+        "found": sum(1 for t in completed if t.found),
+        "misreads": sum(1 for t in completed if t.expected and t.barcode != t.expected),
+        "errors": [{"video": os.path.basename(t.video), "error": t.error} for t in traces if t.error],
+        "stages": stages,
+    }
+
+
+def find_regressions(report, baseline, tolerance, slack_ms):
+    """Compares against a previous run; returns human-readable regression messages."""
+    problems = []
+    for stage, row in report["stages"].items():
+        old = baseline["stages"].get(stage)
+        if old is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if row[key] > old[key] * (1 + tolerance) + slack_ms:
+                problems.append(f"{stage}: {key[:3]} {old[key]} -> {row[key]} ms")
+    if report["completed"] / report["scans"] < baseline["completed"] / baseline["scans"]:
+        problems.append(f"completed scans: {baseline['completed']}/{baseline['scans']} -> "
+                        f"{report['completed']}/{report['scans']}")
+    if report["misreads"] > baseline["misreads"]:
+        problems.append(f"misreads: {baseline['misreads']} -> {report['misreads']}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="End-to-end scan latency with recorded video and a stub Books API.")
+    parser.add_argument("--video", action="append", default=[], help="recorded camera video (repeatable)")
+    parser.add_argument("--synthetic", type=int, default=0, help="also record this many synthetic scans")
+    parser.add_argument("--repeat", type=int, default=1, help="scan every video this many times")
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="stub API delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="+/- random spread of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of API requests failing with 503")
+    parser.add_argument("--backend", default=None, help="decoder spec, as SCAN_BACKEND in main.py")
+    parser.add_argument("--adaptive", action="store_true", help="scan with SCAN_ADAPTIVE on")
+    parser.add_argument("--fast", action="store_true", help="replay videos as fast as they decode")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds allowed per scan")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", "-o", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="allowed absolute slowdown on top")
+    args = parser.parse_args(argv)
+
+    if not args.video and not args.synthetic:
+        parser.error("give --video and/or --synthetic N")
+
+    stub = StubBooksAPI(synthetic=True, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                        error_rate=args.error_rate, seed=args.seed).start()
+    with tempfile.TemporaryDirectory() as workdir:
+        recordings = [(path, None) for path in args.video]
+        recordings += make_recordings(workdir, args.synthetic, args.seed)
+        root, app = build_app(workdir, stub, args)
+        current = [None]
+        instrument(app, current)
+        traces = []
+        try:
+            for _ in range(args.repeat):
+                for path, expected in recordings:
+                    trace = run_scan(root, app, current, path, expected, args)
+                    stages = trace.stages()
+                    print(f"[Bench] {os.path.basename(path)}: {trace.barcode or '-'} "
+                          f"total {stages.get('total', '-')} ms" + (f" ({trace.error})" if trace.error else ""))
+                    traces.append(trace)
+        finally:
+            app.background.shutdown()
+            app.catalog.close()
+            app.metadata_cache.close()
+            stub.stop()
+
+    report = summarize(traces)
+    report["config"] = {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms,
+                        "error_rate": args.error_rate, "backend": args.backend,
+                        "adaptive": args.adaptive, "realtime": not args.fast}
+    report["api"] = {"requests": stub.requests, "errors": stub.errors}
+    report["metrics"] = METRICS.snapshot()
+    report["runs"] = [{"video": os.path.basename(t.video), "barcode": t.barcode, "found": t.found,
+                       "error": t.error, "stages": t.stages()} for t in traces]
+
+    print(f"\n{report['completed']}/{report['scans']} scans completed, {report['found']} found, "
+          f"{report['misreads']} misreads, API {stub.requests} requests / {stub.errors} errors")
+    print(f"{'stage':16} {'n':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for stage, row in report["stages"].items():
+        print(f"{stage:16} {row['n']:4d} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+              f"{row['p99_ms']:9.1f} {row['max_ms']:9.1f}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = find_regressions(report, baseline, args.tolerance, args.slack_ms)
+        for problem in problems:
+            print(f"[REGRESSION] {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,158 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# -----------------------------------------------------------------------
+# Startup benchmark — how long a kiosk takes from process start to a
+# painted window, and which imports that time goes to.
+#
+#   python bench_startup.py --runs 10 --output startup.json
+#   python bench_startup.py --baseline startup.json   # exit 1 on regression
+#   python bench_startup.py --window                  # also time the first paint (needs a display)
+#
+# Every run is a fresh interpreter started with `python -X importtime`.
+# Reported: median `import main` time, the slowest imports (self and
+# cumulative, as in the importtime tree), and any heavy module (OpenCV,
+# NumPy, decoder libraries) that got loaded before the first scan.
+# -----------------------------------------------------------------------
+
+HEAVY_MODULES = ("cv2", "numpy", "zxingcpp", "pyzbar")
+
+# Runs inside the child interpreter; prints one JSON line on stdout
+_CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter() - start
+result = {{"import_ms": imported * 1000,
+           "heavy": [m for m in {heavy!r} if m in sys.modules]}}
+if {window!r}:
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        result["window_error"] = str(e)
+    else:
+        app = main.LibraryManagementApp(root)
+        root.update()
+        result["window_ms"] = (time.perf_counter() - start) * 1000
+        app.background.shutdown()
+        root.destroy()
+print(json.dumps(result))
+"""
+
+
+def parse_importtime(stderr):
+    """Parses `-X importtime` output into [(module, self_us, cumulative_us, depth)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue
+        # One space after the "|", then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def run_once(window=False):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(heavy=HEAVY_MODULES, window=window)],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_importtime(proc.stderr)
+    return result
+
+
+def run_benchmark(runs, window=False, top=15):
+    results = [run_once(window) for _ in range(runs)]
+
+    # Median self/cumulative time per module across runs
+    per_module = {}
+    for result in results:
+        for name, self_us, cumulative_us, depth in result["imports"]:
+            per_module.setdefault(name, []).append((self_us, cumulative_us, depth))
+    modules = []
+    for name, samples in per_module.items():
+        modules.append({
+            "module": name,
+            "self_ms": round(statistics.median(s[0] for s in samples) / 1000, 2),
+            "cumulative_ms": round(statistics.median(s[1] for s in samples) / 1000, 2),
+            "depth": samples[0][2],
+        })
+
+    report = {
+        "runs": runs,
+        "import_ms": round(statistics.median(r["import_ms"] for r in results), 1),
+        "heavy_at_startup": sorted({m for r in results for m in r["heavy"]}),
+        "slowest_self": sorted(modules, key=lambda m: -m["self_ms"])[:top],
+        "slowest_cumulative": sorted(modules, key=lambda m: -m["cumulative_ms"])[:top],
+    }
+    windows = [r["window_ms"] for r in results if "window_ms" in r]
+    if windows:
+        report["window_ms"] = round(statistics.median(windows), 1)
+    elif window:
+        report["window_error"] = results[0].get("window_error")
+    return report
+
+
+def find_regressions(report, baseline, tolerance):
+    problems = []
+    for key in ("import_ms", "window_ms"):
+        if key in report and key in baseline and report[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key}: {baseline[key]} -> {report[key]} ms")
+    for module in report["heavy_at_startup"]:
+        if module not in baseline.get("heavy_at_startup", []):
+            problems.append(f"'{module}' is now imported at startup")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark cold-start time of the Tk app.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to start")
+    parser.add_argument("--window", action="store_true", help="also time until the window is painted")
+    parser.add_argument("--top", type=int, default=15, help="slowest imports to list")
+    parser.add_argument("--output", "-o", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="previous JSON result to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before flagging")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.runs, window=args.window, top=args.top)
+
+    print(f"import main: {report['import_ms']} ms (median of {args.runs})")
+    if "window_ms" in report:
+        print(f"window painted: {report['window_ms']} ms")
+    elif args.window:
+        print(f"window: not measured ({report.get('window_error')})")
+    print(f"heavy modules at startup: {', '.join(report['heavy_at_startup']) or 'none'}")
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  module")
+    for m in report["slowest_cumulative"]:
+        print(f"{m['cumulative_ms']:14.2f} {m['self_ms']:9.2f}  {'  ' * m['depth']}{m['module']}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, mode='r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        problems = find_regressions(report, baseline, args.tolerance)
+        for problem in problems:
+            print(f"[REGRESSION] {problem}", file=sys.stderr)
+        if problems:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from catalog import Catalog
+from storage import SqliteCatalog
+from write_buffer import DEFAULT_FLUSH_ROWS, DEFAULT_FLUSH_SECONDS, BufferedCatalog
+
+# -----------------------------------------------------------------------
+# Catalog write benchmark — sustained rows/sec while desks scan nonstop.
+#
+#   python bench_writes.py --seconds 5 --desks 4 --output writes.json
+#
+# Each desk thread adds one scanned book after another for --seconds
+# (a share of them re-scans of books already added). Every storage format
+# is run once with direct writes (one fsync'ed append / transaction per
+# book) and once through BufferedCatalog (group commits). Reported:
+# accepted rows/sec, rows/sec including the final flush, add() latency
+# and whether the file ended up with duplicate barcodes.
+# -----------------------------------------------------------------------
+
+FORMATS = {"csv": (".csv", Catalog), "sqlite": (".sqlite3", SqliteCatalog)}
+
+
+def make_row(rng, n):
+    return {
+        "title": f"Benchmark Book {n}",
+        "barcode": f"978{rng.randrange(10 ** 10):010d}",
+        "genre": rng.choice(["FICTION", "SCIENCE", "HISTORY", "ART"]),
+        "author": f"Author {n % 500}",
+        "publisher": "Bench Press (2024)",
+    }
+
+
+def run_desks(catalog, desks, seconds, rescan_rate, seed):
+    """Adds rows from `desks` threads until time runs out. Returns (added, latencies)."""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+    added = [0]
+    lock = threading.Lock()
+
+    def desk(index):
+        rng = random.Random(seed + index)
+        scanned = []
+        local, local_added = [], 0
+        n = 0
+        while time.perf_counter() < deadline:
+            if scanned and rng.random() < rescan_rate:
+                row = rng.choice(scanned)
+            else:
+                row = make_row(rng, n)
+                scanned.append(row)
+            n += 1
+            start = time.perf_counter()
+            local_added += catalog.add(row)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            added[0] += local_added
+
+    threads = [threading.Thread(target=desk, args=(i,)) for i in range(desks)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return added[0], latencies
+
+
+def bench_once(fmt, buffered, args, workdir):
+    ext, factory = FORMATS[fmt]
+    path = os.path.join(workdir, f"bench_{fmt}_{'buffered' if buffered else 'direct'}{ext}")
+    catalog = factory(path)
+    if buffered:
+        catalog = BufferedCatalog(catalog, flush_rows=args.flush_rows, flush_seconds=args.flush_seconds)
+
+    start = time.perf_counter()
+    added, latencies = run_desks(catalog, args.desks, args.seconds, args.rescan_rate, args.seed)
+    accepted_s = time.perf_counter() - start
+    if buffered:
+        catalog.flush()
+    durable_s = time.perf_counter() - start
+    stats = dict(catalog.stats) if buffered else None
+    if hasattr(catalog, "close"):
+        catalog.close()
+
+    rows = factory(path).rows()
+    latencies.sort()
+    result = {
+        "format": fmt,
+        "mode": "buffered" if buffered else "direct",
+        "added": added,
+        "rows_per_s": round(added / accepted_s, 1),
+        "durable_rows_per_s": round(added / durable_s, 1),
+        "add_p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "add_p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))] * 1000, 3),
+        "rows_in_file": len(rows),
+        "duplicate_barcodes": len(rows) - len({row["barcode"] for row in rows}),
+    }
+    if stats:
+        result["flushes"] = stats["flushes"]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark catalog appends under continuous scanning.")
+    parser.add_argument("--seconds", type=float, default=5.0, help="scanning time per run")
+    parser.add_argument("--desks", type=int, default=4, help="threads adding books at once")
+    parser.add_argument("--rescan-rate", type=float, default=0.1, help="share of scans that repeat a book")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=list(FORMATS))
+    parser.add_argument("--flush-rows", type=int, default=DEFAULT_FLUSH_ROWS)
+    parser.add_argument("--flush-seconds", type=float, default=DEFAULT_FLUSH_SECONDS)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--dir", help="where to create the benchmark catalogs (default: a temp dir)")
+    parser.add_argument("--output", "-o", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as workdir:
+        results = [bench_once(fmt, buffered, args, workdir)
+                   for fmt in args.formats for buffered in (False, True)]
+
+    print(f"{'format':7} {'mode':9} {'added':>8} {'rows/s':>10} {'durable/s':>10} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'dupes':>6}")
+    for r in results:
+        print(f"{r['format']:7} {r['mode']:9} {r['added']:8d} {r['rows_per_s']:10.1f} "
+              f"{r['durable_rows_per_s']:10.1f} {r['add_p50_ms']:8.3f} {r['add_p99_ms']:8.3f} "
+              f"{r['duplicate_barcodes']:6d}")
+
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
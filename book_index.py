@@ -0,0 +1,57 @@
+import threading
+
+# -----------------------------------------------------------------------
+# Book search index — the in-memory text index behind the List Books
+# window. Each row is reduced once to a lowercase "title author genre"
+# string; a query matches a row when every whitespace-separated term is a
+# substring of it.
+#
+# Typing is incremental: when the new query only narrows the previous
+# one (e.g. "harr" -> "harry p"), only the previous hits are re-checked
+# instead of the whole catalog.
+# -----------------------------------------------------------------------
+
+SEARCH_FIELDS = ('title', 'author', 'genre')
+
+
+def _terms(query):
+    return tuple(query.lower().split())
+
+
+def _narrows(terms, previous):
+    """True if every row matching `terms` must also match `previous`."""
+    return all(any(old in new for new in terms) for old in previous)
+
+
+class BookSearchIndex:
+    def __init__(self, rows, version=None):
+        self.rows = rows
+        # Catalog version the rows were taken from, so callers know when to rebuild
+        self.version = version
+        self._text = ["\n".join(row.get(key) or '' for key in SEARCH_FIELDS).lower() for row in rows]
+        self._lock = threading.Lock()
+        self._last = ((), range(len(rows)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query):
+        """Returns the positions (into .rows) of matching books, in catalog order."""
+        terms = _terms(query)
+        if not terms:
+            return range(len(self.rows))
+
+        with self._lock:
+            previous, previous_hits = self._last
+        candidates = previous_hits if _narrows(terms, previous) else range(len(self._text))
+
+        text = self._text
+        # Filter on the longest term first; it usually rejects the most rows
+        first, *rest = sorted(terms, key=len, reverse=True)
+        hits = [i for i in candidates if first in text[i]]
+        for term in rest:
+            hits = [i for i in hits if term in text[i]]
+
+        with self._lock:
+            self._last = (terms, hits)
+        return hits
@@ -0,0 +1,109 @@
+import urllib.parse
+
+from http_client import HttpClient
+from isbn import normalize_isbn
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Google Books API
+# -----------------------------------------------------------------------
+
+GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
+GOOGLE_BOOKS_CATEGORY_API = "https://www.googleapis.com/books/v1/volumes?q=subject:{category}&maxResults=10"
+API_TIMEOUT = 5
+
+# One keep-alive client shared by every lookup in the process
+HTTP_CLIENT = HttpClient(timeout=API_TIMEOUT)
+
+
+def parse_book_info(data):
+    """Turns a Google Books volumes response into our book_info dict (None if empty)."""
+    if data.get("totalItems", 0) == 0 or not data.get("items"):
+        return None
+
+    volume_info = data["items"][0]["volumeInfo"]
+
+    title       = volume_info.get("title", "Unknown Title")
+    authors     = volume_info.get("authors", ["Unknown Author"])
+    categories  = volume_info.get("categories", ["Unknown"])
+    publisher   = volume_info.get("publisher", "Unknown Publisher")
+    published   = volume_info.get("publishedDate", "N/A")
+    description = volume_info.get("description", "No description available.")
+    thumbnail   = volume_info.get("imageLinks", {}).get("thumbnail", None)
+
+    return {
+        "title":         title,
+        "authors":       ", ".join(authors),
+        "category":      categories[0] if categories else "Unknown",
+        "publisher":     publisher,
+        "publishedDate": published,
+        "description":   description,
+        "thumbnail":     thumbnail,
+    }
+
+
+def request_book_info(isbn):
+    """Queries the API directly. Raises on network/HTTP errors, returns None if not found."""
+    url = GOOGLE_BOOKS_API.format(isbn=urllib.parse.quote(str(isbn).strip()))
+    with METRICS.timer("api_isbn"):
+        return parse_book_info(HTTP_CLIENT.get_json(url))
+
+
+def fetch_book_info(isbn, cache=None):
+    """Cached ISBN lookup. Returns book_info or None; never raises."""
+    key = normalize_isbn(isbn)
+    if cache is not None:
+        hit, info = cache.get(key)
+        METRICS.count("metadata_cache_hits" if hit else "metadata_cache_misses")
+        if hit:
+            return info
+
+    try:
+        info = request_book_info(isbn)
+    except Exception as e:
+        print(f"[API Error] {e}")
+        if cache is not None:
+            # Offline: an expired answer is better than none
+            hit, info = cache.get(key, allow_stale=True)
+            if hit:
+                print(f"[Cache] Serving stale entry for '{key}'")
+                return info
+        return None
+
+    if cache is not None:
+        cache.put(key, info)
+    return info
+
+
+def request_category_volumes(category):
+    """Returns [{"title", "authors", "publisher"}] for a subject query. Raises on errors."""
+    url = GOOGLE_BOOKS_CATEGORY_API.format(category=urllib.parse.quote(category))
+    with METRICS.timer("api_category"):
+        data = HTTP_CLIENT.get_json(url)
+    volumes = []
+    for item in data.get("items", []):
+        volume_info = item.get("volumeInfo", {})
+        title = volume_info.get("title", "")
+        if title:
+            volumes.append({
+                "title":     title,
+                "authors":   ", ".join(volume_info.get("authors", [])),
+                "publisher": volume_info.get("publisher", ""),
+            })
+    return volumes
+
+
+def fetch_recommendations(category, current_title):
+    recommendations = []
+    try:
+        for volume in request_category_volumes(category):
+            rec_title = volume["title"]
+            if rec_title != current_title:
+                recommendations.append(rec_title)
+            if len(recommendations) >= 3:
+                break
+
+    except Exception as e:
+        print(f"[Recommendation API Error] {e}")
+
+    return recommendations
@@ -0,0 +1,272 @@
+import csv
+import os
+import threading
+
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Catalog — books.csv loaded once and kept in memory with hash indexes.
+# All reads and writes go through one Catalog object so that barcode
+# lookups, duplicate checks and the total count never rescan the file.
+# The file is only re-parsed when its mtime/size changes on disk
+# (e.g. edited by hand or by another desk).
+#
+# Appends are fsync'ed. A row torn by a crash mid-append (no trailing
+# newline, missing fields) is dropped on load, and the next write first
+# compacts the file. compact() rewrites it via a temp file + atomic
+# rename, keeping the first row per barcode.
+# -----------------------------------------------------------------------
+
+FIELDNAMES = ['title', 'barcode', 'genre', 'author', 'publisher']
+
+
+def book_info_to_row(barcode, book_info):
+    """Maps a Google Books book_info dict onto a catalog row."""
+    return {
+        'title':     book_info.get('title', ''),
+        'barcode':   barcode,
+        'genre':     book_info.get('category', ''),
+        'author':    book_info.get('authors', ''),
+        'publisher': f"{book_info.get('publisher', '')} ({book_info.get('publishedDate', '')})",
+    }
+
+
+class Catalog:
+    # add(..., allow_duplicate=True) really writes a second row for a barcode
+    allows_duplicates = True
+
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._torn = False
+        self._lock = threading.RLock()
+        self._rows = []
+        self._by_barcode = {}
+        self._by_genre = {}
+        self._signature = None
+        self._loaded = False
+        # Bumped on every reload/append so derived indexes know when to rebuild
+        self.version = 0
+
+    def close(self):
+        pass   # Nothing held open between writes
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _reset(self):
+        self._rows = []
+        self._by_barcode = {}
+        self._by_genre = {}
+
+    def _index_row(self, row):
+        self._rows.append(row)
+        # First occurrence wins, same as the old top-to-bottom scan
+        self._by_barcode.setdefault(row['barcode'], row)
+        self._by_genre.setdefault(row['genre'], []).append(row)
+
+    def _load(self, signature):
+        self._reset()
+        if signature is not None:
+            with open(self.path, mode='r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                # Header in older files is "title, barcode, genre, ..."
+                if reader.fieldnames:
+                    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+                last = None
+                for row in reader:
+                    if last is not None:
+                        self._index_row({key: (last.get(key) or '') for key in FIELDNAMES})
+                    last = row
+                self._torn = last is not None and self._is_torn(last)
+                if self._torn:
+                    print(f"[Catalog] Dropping torn last row in '{self.path}' (interrupted write)")
+                elif last is not None:
+                    self._index_row({key: (last.get(key) or '') for key in FIELDNAMES})
+        self._signature = signature
+        self._loaded = True
+        self.version += 1
+        print(f"[Catalog] Loaded {len(self._rows)} books from '{self.path}'")
+
+    def _is_torn(self, last_row):
+        """True if the file ends mid-row: no final newline and fields missing."""
+        with open(self.path, mode='rb') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return False
+        return any(last_row.get(key) is None for key in FIELDNAMES)
+
+    def refresh(self):
+        """Re-reads the file only if it changed on disk since the last load/write."""
+        with self._lock:
+            signature = self._stat_signature()
+            if not self._loaded or signature != self._signature:
+                self._load(signature)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def get(self, barcode):
+        with self._lock:
+            self.refresh()
+            row = self._by_barcode.get(barcode)
+            return dict(row) if row else None
+
+    def __contains__(self, barcode):
+        with self._lock:
+            self.refresh()
+            return barcode in self._by_barcode
+
+    def count(self):
+        with self._lock:
+            self.refresh()
+            return len(self._rows)
+
+    def rows(self):
+        with self._lock:
+            self.refresh()
+            return [dict(row) for row in self._rows]
+
+    def page(self, offset, limit):
+        """Rows [offset, offset + limit) in catalog order."""
+        with self._lock:
+            self.refresh()
+            return [dict(row) for row in self._rows[offset:offset + limit]]
+
+    def titles(self):
+        with self._lock:
+            self.refresh()
+            return [row['title'] for row in self._rows]
+
+    def books_in_genre(self, genre):
+        with self._lock:
+            self.refresh()
+            return [dict(row) for row in self._by_genre.get(genre, [])]
+
+    def books_by_author(self, author):
+        with self._lock:
+            self.refresh()
+            return [dict(row) for row in self._rows if row['author'] == author]
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def add(self, row, allow_duplicate=False):
+        """Appends one book. Returns False if the barcode exists and duplicates aren't allowed."""
+        return self.add_many([row], allow_duplicate=allow_duplicate) == 1
+
+    def add_many(self, rows, allow_duplicate=False):
+        """Appends several books in a single file write. Returns how many were written."""
+        with self._lock:
+            self.refresh()
+            new_rows = []
+            seen = set()
+            for row in rows:
+                clean = {key: str(row.get(key) or '') for key in FIELDNAMES}
+                barcode = clean['barcode']
+                if not allow_duplicate and (barcode in self._by_barcode or barcode in seen):
+                    continue
+                seen.add(barcode)
+                new_rows.append(clean)
+
+            if not new_rows:
+                return 0
+
+            if self._torn:
+                # Appending now would glue the new row onto the torn one
+                self._rewrite(self._rows)
+
+            file_exists = self._signature is not None
+            separator = file_exists and _missing_final_newline(self.path)
+            with METRICS.timer("catalog_write"), \
+                    open(self.path, mode='a', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+                if separator:
+                    # Last row is complete but has no newline; don't glue onto it
+                    file.write("\r\n")
+                if not file_exists:
+                    writer.writeheader()
+                writer.writerows(new_rows)
+                if self.fsync:
+                    file.flush()
+                    os.fsync(file.fileno())
+
+            for clean in new_rows:
+                self._index_row(clean)
+            self.version += 1
+            # Our own append must not trigger a full reload on the next query
+            self._signature = self._stat_signature()
+            return len(new_rows)
+
+    def compact(self, barcodes=None):
+        """Rewrites the file without duplicate barcodes (first row wins). Returns rows removed.
+
+        With `barcodes`, only duplicates of those barcodes are removed.
+        """
+        with self._lock:
+            self.refresh()
+            if self._signature is None:
+                return 0
+            keep = [row for row in self._rows
+                    if self._by_barcode[row['barcode']] is row
+                    or (barcodes is not None and row['barcode'] not in barcodes)]
+            removed = len(self._rows) - len(keep)
+            if removed or self._torn:
+                self._rewrite(keep)
+            return removed
+
+    def _rewrite(self, rows):
+        """Replaces the file with `rows` atomically (temp file, fsync, rename)."""
+        tmp_path = self.path + ".tmp"
+        with METRICS.timer("catalog_compact"), \
+                open(tmp_path, mode='w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+
+        self._reset()
+        for row in rows:
+            self._index_row(row)
+        self._torn = False
+        self.version += 1
+        self._signature = self._stat_signature()
+
+
+def _missing_final_newline(path):
+    """True if the file has content but does not end with a newline."""
+    try:
+        with open(path, mode='rb') as f:
+            if f.seek(0, os.SEEK_END) == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) != b"\n"
+    except FileNotFoundError:
+        return False
+
+
+def _fsync_dir(path):
+    """Makes a rename durable. Not possible on Windows, where it is skipped."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
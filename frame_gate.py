@@ -0,0 +1,107 @@
+import threading
+
+import cv2
+import numpy as np
+
+from scanner import guide_box
+
+# -----------------------------------------------------------------------
+# Frame gate — cheap checks that decide whether a frame is worth decoding.
+# All measurements run on a small grayscale copy (~160 px wide) of the
+# region the decoder will look at, so the gate costs a fraction of a
+# single decode. That region is the tracker's ROI while a RoiTracker
+# holds a track, otherwise the guide box (use_roi=True, the single-desk
+# scanner) or the full frame (use_roi=False: bulk mode, the station).
+#
+#   moving      large difference to the previous frame -> motion blur, skip
+#   static      scene unchanged since the previous frame -> skip,
+#               but let one through every static_recheck frames
+#   blurry      low Laplacian variance -> out of focus, skip
+#   no_barcode  weak directional gradient energy -> empty box, skip
+# -----------------------------------------------------------------------
+
+GATE_WIDTH = 160
+
+DEFAULT_MAX_MOTION = 18.0       # mean abs difference (0-255) to the previous frame
+DEFAULT_STILL_MOTION = 1.0      # below this the scene counts as unchanged
+DEFAULT_STATIC_RECHECK = 15     # decode every Nth unchanged frame anyway
+DEFAULT_MIN_SHARPNESS = 40.0    # Laplacian variance
+DEFAULT_MIN_GRADIENT = 6.0      # mean |(|Gx| - |Gy|)|
+
+
+class FrameGate:
+    def __init__(self, max_motion=DEFAULT_MAX_MOTION, still_motion=DEFAULT_STILL_MOTION,
+                 static_recheck=DEFAULT_STATIC_RECHECK, min_sharpness=DEFAULT_MIN_SHARPNESS,
+                 min_gradient=DEFAULT_MIN_GRADIENT, use_roi=True, tracker=None):
+        self.max_motion = max_motion
+        self.still_motion = still_motion
+        self.static_recheck = static_recheck
+        self.min_sharpness = min_sharpness
+        self.min_gradient = min_gradient
+        self.use_roi = use_roi
+        self.tracker = tracker
+
+        self.stats = {"passed": 0, "moving": 0, "static": 0, "blurry": 0, "no_barcode": 0}
+        self._previous = None   # (region, small gray) of the previous frame
+        self._static_run = 0
+        self._lock = threading.Lock()
+
+    def _region(self, shape):
+        """(x1, y1, x2, y2) the decoder will search next, or None for the full frame."""
+        if self.tracker is not None:
+            roi = self.tracker.roi(shape)
+            if roi is not None:
+                return roi
+        return guide_box(shape) if self.use_roi else None
+
+    def _small_gray(self, frame):
+        """Returns (region, small grayscale copy of it)."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        region = self._region(gray.shape)
+        if region is not None:
+            x1, y1, x2, y2 = region
+            gray = gray[y1:y2, x1:x2]
+        scale = GATE_WIDTH / gray.shape[1]
+        if scale < 1:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return region, gray
+
+    def reason(self, frame):
+        """Returns None if the frame should be decoded, otherwise the name of the gate that rejected it."""
+        region, small = self._small_gray(frame)
+
+        with self._lock:
+            previous, self._previous = self._previous, (region, small)
+            # Only the same region of consecutive frames can be compared
+            if previous is not None and previous[0] == region and previous[1].shape == small.shape:
+                motion = float(cv2.absdiff(small, previous[1]).mean())
+                if motion > self.max_motion:
+                    self._static_run = 0
+                    return "moving"
+                if motion < self.still_motion:
+                    self._static_run += 1
+                    if self._static_run % self.static_recheck:
+                        return "static"
+                else:
+                    self._static_run = 0
+
+        if cv2.Laplacian(small, cv2.CV_32F).var() < self.min_sharpness:
+            return "blurry"
+
+        gx = np.abs(cv2.Sobel(small, cv2.CV_32F, 1, 0, ksize=3))
+        gy = np.abs(cv2.Sobel(small, cv2.CV_32F, 0, 1, ksize=3))
+        # 1D barcodes: strong gradient across the bars, little along them
+        if float(np.abs(gx - gy).mean()) < self.min_gradient:
+            return "no_barcode"
+        return None
+
+    def check(self, frame):
+        """True if the frame should go to the decoder; updates the rejection counters."""
+        reason = self.reason(frame)
+        with self._lock:
+            self.stats[reason or "passed"] += 1
+        return reason is None
+
+    def snapshot_stats(self):
+        with self._lock:
+            return dict(self.stats)
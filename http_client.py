@@ -0,0 +1,210 @@
+import gzip
+import http.client
+import json
+import threading
+import urllib.error
+import urllib.parse
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------
+# Shared HTTP client — persistent keep-alive connections instead of a new
+# TCP+TLS handshake per urlopen() call.
+#
+#   * connections are pooled per (scheme, host, port), at most
+#     max_per_host open at once; callers beyond that wait their turn
+#   * responses are requested gzip-compressed
+#   * bodies with an ETag are remembered, and repeat GETs send
+#     If-None-Match; a 304 is served from the remembered body (a 304
+#     with nothing remembered is retried once without If-None-Match)
+#   * errors are raised as urllib.error.HTTPError / URLError, like urlopen
+#   * POST (no ETag handling) is used to talk to the local scan service
+# -----------------------------------------------------------------------
+
+DEFAULT_TIMEOUT = 5
+DEFAULT_MAX_PER_HOST = 4
+DEFAULT_ETAG_ENTRIES = 2048
+USER_AGENT = "library-book-scanner/1.0"
+
+# Errors that mean a pooled keep-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError)
+
+
+class Response:
+    def __init__(self, status, headers, body, revalidated=False):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.revalidated = revalidated
+
+    def json(self):
+        return json.loads(self.body.decode())
+
+
+class HostPool:
+    def __init__(self, scheme, host, port, max_connections, timeout):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def _new_connection(self):
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def acquire(self, fresh=False):
+        """Returns (connection, reused). fresh=True skips the idle connections."""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise urllib.error.URLError(f"timed out waiting for a connection to {self.host}")
+        if not fresh:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def release(self, conn, reusable):
+        if reusable:
+            with self._lock:
+                self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class HttpClient:
+    def __init__(self, max_per_host=DEFAULT_MAX_PER_HOST, timeout=DEFAULT_TIMEOUT,
+                 etag_entries=DEFAULT_ETAG_ENTRIES):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.etag_entries = etag_entries
+        self.stats = {"requests": 0, "connections": 0, "reused": 0, "not_modified": 0}
+
+        self._pools = {}
+        self._etags = OrderedDict()   # url -> (etag, headers, body)
+        self._lock = threading.Lock()
+
+    def _pool(self, scheme, host, port):
+        key = (scheme, host, port)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = HostPool(scheme, host, port, self.max_per_host, self.timeout)
+                self._pools[key] = pool
+            return pool
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _remembered(self, url):
+        with self._lock:
+            entry = self._etags.get(url)
+            if entry is not None:
+                self._etags.move_to_end(url)
+            return entry
+
+    def _remember(self, url, etag, headers, body):
+        with self._lock:
+            self._etags[url] = (etag, headers, body)
+            self._etags.move_to_end(url)
+            while len(self._etags) > self.etag_entries:
+                self._etags.popitem(last=False)
+
+    def _exchange(self, method, url, body=None, headers=None):
+        """Sends one request on a pooled connection. Returns (response, decoded body)."""
+        parts = urllib.parse.urlsplit(url)
+        scheme = parts.scheme or "http"
+        port = parts.port or (443 if scheme == "https" else 80)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        request_headers = {
+            "Host": parts.netloc,
+            "Accept-Encoding": "gzip",
+            "Connection": "keep-alive",
+            "User-Agent": USER_AGENT,
+        }
+        request_headers.update(headers or {})
+
+        pool = self._pool(scheme, parts.hostname, port)
+        self._count("requests")
+
+        # A reused connection may have been closed by the server while idle;
+        # retry once on a fresh one in that case (other idle ones may be stale too).
+        for attempt in range(2):
+            conn, reused = pool.acquire(fresh=attempt > 0)
+            self._count("reused" if reused else "connections")
+            reusable = False
+            try:
+                conn.request(method, path, body=body, headers=request_headers)
+                resp = conn.getresponse()
+                data = resp.read()
+                reusable = not resp.will_close
+            except STALE_CONNECTION_ERRORS as e:
+                if reused and attempt == 0:
+                    continue
+                raise urllib.error.URLError(e)
+            except (OSError, http.client.HTTPException) as e:
+                raise urllib.error.URLError(e)
+            finally:
+                pool.release(conn, reusable)
+            break
+
+        if resp.getheader("Content-Encoding", "").lower() == "gzip":
+            data = gzip.decompress(data)
+        return resp, data
+
+    def get(self, url, headers=None):
+        headers = dict(headers or {})
+        remembered = self._remembered(url)
+        if remembered is not None:
+            headers["If-None-Match"] = remembered[0]
+
+        resp, body = self._exchange("GET", url, headers=headers)
+
+        if resp.status == 304:
+            if remembered is not None:
+                self._count("not_modified")
+                return Response(200, remembered[1], remembered[2], revalidated=True)
+            # Nothing to serve it from (e.g. the caller sent its own If-None-Match)
+            headers = {k: v for k, v in headers.items() if k.lower() != "if-none-match"}
+            resp, body = self._exchange("GET", url, headers=headers)
+            if resp.status == 304:
+                raise urllib.error.HTTPError(url, 304, "Not Modified without a cached body", resp.headers, None)
+
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+
+        etag = resp.getheader("ETag")
+        if etag and resp.status == 200:
+            self._remember(url, etag, resp.headers, body)
+        return Response(resp.status, resp.headers, body)
+
+    def post(self, url, body, content_type="application/json", headers=None):
+        headers = dict(headers or {})
+        headers["Content-Type"] = content_type
+        resp, data = self._exchange("POST", url, body=body, headers=headers)
+        if resp.status >= 400:
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, None)
+        return Response(resp.status, resp.headers, data)
+
+    def get_json(self, url, headers=None):
+        return self.get(url, headers=headers).json()
+
+    def post_json(self, url, payload, headers=None):
+        return self.post(url, json.dumps(payload).encode(), headers=headers).json()
+
+    def close(self):
+        with self._lock:
+            pools = list(self._pools.values())
+        for pool in pools:
+            pool.close()
@@ -0,0 +1,205 @@
+import argparse
+import random
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import books_api
+from catalog import book_info_to_row
+from http_client import HttpClient
+from isbn import clean_code, normalize_isbn
+from metadata_cache import MetadataCache
+from storage import open_catalog
+
+# -----------------------------------------------------------------------
+# Batch ISBN ingestion — headless onboarding of a whole shelf.
+#
+#   python ingest.py isbns.txt --concurrency 16 --rate 20
+#
+# Reads one ISBN/barcode per line (blank lines and "# comments" ignored).
+# Metadata is fetched concurrently, with a token-bucket rate limit and
+# retry/backoff on throttling or transient errors. Found books are
+# written to the catalog in ONE bulk append at the end.
+# -----------------------------------------------------------------------
+
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RATE = 20.0        # requests/second across all workers
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 0.5      # seconds, doubled on every retry
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a request may be sent."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def read_codes(path):
+    """Returns the distinct cleaned codes from an ISBN list file, in file order."""
+    codes = []
+    seen = set()
+    with open(path, mode='r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            code = clean_code(line)
+            key = normalize_isbn(code)
+            if code and key not in seen:
+                seen.add(key)
+                codes.append(code)
+    return codes
+
+
+def fetch_with_retry(code, bucket, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF):
+    """Returns book_info or None (not found). Raises after the last failed attempt."""
+    for attempt in range(retries + 1):
+        bucket.acquire()
+        try:
+            return books_api.request_book_info(code)
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt == retries:
+                raise
+            retry_after = e.headers.get("Retry-After") if e.headers else None
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+        except (urllib.error.URLError, TimeoutError, ConnectionError):
+            if attempt == retries:
+                raise
+            delay = None
+        if delay is None:
+            delay = backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+        time.sleep(delay)
+
+
+def resolve_many(codes, cache=None, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE,
+                 retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, progress=None):
+    """Looks up many codes concurrently.
+
+    Returns {code: book_info or None}; codes whose lookup failed outright
+    are left out and reported in the second return value.
+    """
+    bucket = TokenBucket(rate)
+    results = {}
+    failures = {}
+    pending = []
+
+    for code in codes:
+        if cache is not None:
+            hit, info = cache.get(normalize_isbn(code))
+            if hit:
+                results[code] = info
+                continue
+        pending.append(code)
+
+    def work(code):
+        try:
+            info = fetch_with_retry(code, bucket, retries=retries, backoff=backoff)
+        except Exception as e:
+            return code, None, e
+        if cache is not None:
+            cache.put(normalize_isbn(code), info)
+        return code, info, None
+
+    done = len(results)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        for code, info, error in pool.map(work, pending):
+            if error is not None:
+                failures[code] = error
+            else:
+                results[code] = info
+            done += 1
+            if progress:
+                progress(done, len(codes))
+
+    return results, failures
+
+
+def ingest(codes, catalog, cache=None, **resolve_kwargs):
+    """Resolves codes not yet in the catalog and bulk-writes the found books."""
+    todo = [code for code in codes if code not in catalog]
+    skipped = len(codes) - len(todo)
+    results, failures = resolve_many(todo, cache=cache, **resolve_kwargs)
+
+    rows = [book_info_to_row(code, info) for code, info in results.items() if info]
+    written = catalog.add_many(rows)
+    return {
+        "requested": len(codes),
+        "skipped_existing": skipped,
+        "found": len(rows),
+        "not_found": sum(1 for info in results.values() if info is None),
+        "failed": len(failures),
+        "written": written,
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-import books from a file of ISBNs/barcodes.")
+    parser.add_argument("isbn_file", help="text file with one ISBN or barcode per line")
+    parser.add_argument("--catalog", "--csv", dest="catalog", default="books.csv",
+                        help="catalog to append to (.csv, or .sqlite3 for the SQLite backend)")
+    parser.add_argument("--cache", default="isbn_cache.sqlite3", help="ISBN metadata cache file")
+    parser.add_argument("--no-cache", action="store_true", help="always query the API")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help="max API requests per second (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES)
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF)
+    parser.add_argument("--api-url", help="override the ISBN lookup URL template (e.g. a local stub)")
+    args = parser.parse_args(argv)
+
+    if args.api_url:
+        books_api.GOOGLE_BOOKS_API = args.api_url
+    # Allow one keep-alive connection per worker
+    books_api.HTTP_CLIENT = HttpClient(max_per_host=args.concurrency, timeout=books_api.API_TIMEOUT)
+
+    codes = read_codes(args.isbn_file)
+    catalog = open_catalog(args.catalog)
+    cache = None if args.no_cache else MetadataCache(args.cache)
+
+    def progress(done, total):
+        if done % 100 == 0 or done == total:
+            print(f"[Ingest] {done}/{total}")
+
+    start = time.perf_counter()
+    summary = ingest(
+        codes, catalog, cache=cache,
+        concurrency=args.concurrency, rate=args.rate,
+        retries=args.retries, backoff=args.backoff, progress=progress,
+    )
+    elapsed = time.perf_counter() - start
+
+    for code, error in summary["failures"].items():
+        print(f"[Ingest] Failed: {code} — {error}")
+    print(
+        f"[Ingest] {summary['requested']} codes in {elapsed:.1f}s "
+        f"({summary['requested'] / elapsed if elapsed else 0:.1f}/s): "
+        f"{summary['written']} added, {summary['skipped_existing']} already in library, "
+        f"{summary['not_found']} not found, {summary['failed']} failed."
+    )
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
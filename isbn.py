@@ -0,0 +1,84 @@
+# -----------------------------------------------------------------------
+# ISBN helpers — scanned barcodes and typed ISBNs are normalized to a
+# single key (ISBN-13 where possible) so "0-446-67745-0", "0446677450"
+# and "9780446677455" all refer to the same book.
+# -----------------------------------------------------------------------
+
+# EAN-8, UPC-A and EAN-13/ISBN-13: the lengths with a mod-10 check digit
+EAN_LENGTHS = (8, 12, 13)
+
+
+def clean_code(code):
+    """Strips spaces/hyphens and keeps only digits and a trailing X."""
+    code = "".join(ch for ch in str(code).strip().upper() if ch.isdigit() or ch == "X")
+    if "X" in code[:-1]:
+        code = code[:-1].replace("X", "") + code[-1]
+    return code
+
+
+def canonical_code(code):
+    """Storage key for a scanned code: cleaned if it is an ISBN/EAN/UPC, else kept as read.
+
+    Library labels like "LIB-123A" must not lose their letters/punctuation.
+    """
+    code = str(code or "").strip()
+    return clean_code(code) if is_valid_barcode(code, strict=True) else code
+
+
+def isbn13_check_digit(first12):
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+
+def isbn10_to_isbn13(isbn10):
+    first12 = "978" + isbn10[:9]
+    return first12 + isbn13_check_digit(first12)
+
+
+def normalize_isbn(code):
+    """Returns the ISBN-13 form of an ISBN-10/13, or the cleaned code for anything else."""
+    code = clean_code(code)
+    if len(code) == 10 and code[:9].isdigit():
+        return isbn10_to_isbn13(code)
+    return code
+
+
+# -----------------------------------------------------------------------
+# Check digits — a misread almost always breaks the check digit, so
+# codes are validated before any network or disk I/O.
+# -----------------------------------------------------------------------
+
+def is_valid_isbn10(code):
+    if len(code) != 10 or not code[:9].isdigit() or not (code[9].isdigit() or code[9] == "X"):
+        return False
+    total = sum((10 - i) * int(d) for i, d in enumerate(code[:9]))
+    total += 10 if code[9] == "X" else int(code[9])
+    return total % 11 == 0
+
+
+def is_valid_ean(code):
+    """EAN-8, UPC-A (12) and EAN-13/ISBN-13 share the same mod-10 check."""
+    if len(code) not in EAN_LENGTHS or not code.isdigit():
+        return False
+    body, check = code[:-1], code[-1]
+    # Weights alternate 3,1,... starting from the digit next to the check digit
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(body)))
+    return str((10 - total % 10) % 10) == check
+
+
+def is_valid_barcode(code, strict=False):
+    """True for ISBN/EAN/UPC codes with a correct check digit.
+
+    Codes of EAN-8, UPC-A, EAN-13 or ISBN-10 length must have a correct
+    check digit, so misreads of those are rejected. Other codes (e.g.
+    14-digit Codabar library items or Code 128 labels) can't be checked
+    and are accepted unless strict is set.
+    """
+    code = str(code or "").strip().upper().replace("-", "").replace(" ", "")
+    if not code:
+        return False
+    if len(code) == 10 and code[:-1].isdigit() and (code[-1].isdigit() or code[-1] == "X"):
+        return is_valid_isbn10(code)
+    if len(code) in EAN_LENGTHS and code.isdigit():
+        return is_valid_ean(code)
+    return not strict
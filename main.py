@@ -1,57 +1,82 @@
+import threading
+import time
 import tkinter as tk
+import traceback
 from tkinter import messagebox, ttk
-import cv2
-import numpy as np
-import csv
-import os
-import urllib.request
-import urllib.parse
-import json
-
-# -----------------------------------------------------------------------
-# Scanner library — zxing-cpp works on Windows without extra DLLs
-# Install: pip install zxing-cpp
-# Fallback: pyzbar (may need extra DLLs on Windows)
-# -----------------------------------------------------------------------
-try:
-    import zxingcpp
-    SCANNER_AVAILABLE = True
-    SCANNER_NAME = "zxingcpp"
-    print("[INFO] Using zxingcpp for barcode scanning")
-except ImportError:
-    try:
-        from pyzbar.pyzbar import decode as pyzbar_decode
-        SCANNER_AVAILABLE = True
-        SCANNER_NAME = "pyzbar"
-        print("[INFO] Using pyzbar for barcode scanning")
-    except ImportError:
-        SCANNER_AVAILABLE = False
-        SCANNER_NAME = None
-        print("[WARNING] No barcode scanner library found! Install: pip install zxing-cpp")
-
-
-def decode_barcodes(image_gray):
-    results = []
-    if not SCANNER_AVAILABLE:
-        return results
-    if SCANNER_NAME == "zxingcpp":
-        detected = zxingcpp.read_barcodes(image_gray)
-        for barcode in detected:
-            text = barcode.text.strip()
-            if text:
-                results.append({"data": text, "rect": None})
-    elif SCANNER_NAME == "pyzbar":
-        detected = pyzbar_decode(image_gray)
-        for barcode in detected:
-            text = barcode.data.decode("utf-8").strip()
-            if text:
-                results.append({"data": text, "rect": barcode.rect})
-    return results
 
+from adaptive_capture import AdaptiveCapture
+from background import BackgroundRunner
+from backends import make_decoder, probe_backends
+from book_index import BookSearchIndex
+from books_api import fetch_book_info
+from catalog import book_info_to_row
+from ingest import ingest
+from isbn import normalize_isbn
+from metadata_cache import MetadataCache
+from metrics import METRICS
+from service_client import ServiceClient
+from storage import open_catalog
+from tracking import RoiTracker, ScanConfirmer
+from write_buffer import BufferedCatalog
+
+# OpenCV/NumPy and the modules built on them are imported on the first scan
+# (load_scanning_modules), not at startup, so the window paints first.
+cv2 = None
+FrameGate = ScanPipeline = VariantCascade = None
+draw_barcode_boxes = draw_guide_box = draw_text_overlay = None
+_scanning_lock = threading.Lock()
+
+
+def load_scanning_modules():
+    global cv2, FrameGate, ScanPipeline, VariantCascade
+    global draw_barcode_boxes, draw_guide_box, draw_text_overlay
+    with _scanning_lock:
+        if cv2 is not None:
+            return
+        from frame_gate import FrameGate
+        from pipeline import ScanPipeline
+        from scanner import VariantCascade, draw_barcode_boxes, draw_guide_box, draw_text_overlay
+        import cv2
 
 CSV_FILE = 'books.csv'
-GOOGLE_BOOKS_API = "https://www.googleapis.com/books/v1/volumes?q=isbn:{isbn}"
-GOOGLE_BOOKS_CATEGORY_API = "https://www.googleapis.com/books/v1/volumes?q=subject:{category}&maxResults=10"
+# Point at a .sqlite3 file (see `python storage.py migrate`) to use the SQLite backend
+CATALOG_FILE = CSV_FILE
+# Serve a CSV catalog from its memory-mapped snapshot (books.csv.snap, see snapshot.py)
+# instead of parsing it: instant startup and lookups for million-row catalogs
+CATALOG_SNAPSHOT = True
+METADATA_CACHE_FILE = 'isbn_cache.sqlite3'
+# Thin-client mode: URL of a running scan_service.py (e.g. 'http://127.0.0.1:8790').
+# Lookups, the metadata cache and the catalog are then shared through it.
+SCAN_SERVICE_URL = None
+# Group commit for catalog saves (write_buffer.py): queued rows are written
+# together once this many are waiting or the oldest is this old
+CATALOG_WRITE_BUFFER = True
+CATALOG_FLUSH_ROWS = 256
+CATALOG_FLUSH_SECONDS = 0.5
+
+# How often the Tk thread pulls the newest frame / decode result (ms)
+SCAN_POLL_MS = 15
+# Agreeing reads (within SCAN_CONFIRM_WINDOW seconds) needed before a scan is accepted
+SCAN_CONFIRM_READS = 2
+SCAN_CONFIRM_WINDOW = 1.0
+# Decoder library: None (first installed), "zxingcpp", "pyzbar", "opencv",
+# "race" (all at once, first answer wins) or "auto" (calibrated per camera)
+SCAN_BACKEND = None
+# Adaptive scanning: decode a half-resolution pyramid level first, and let the
+# capture resolution/fps follow the recent hit rate and CPU use (adaptive_capture.py)
+SCAN_ADAPTIVE = False
+# Bulk (cart) scan: stop collecting once no new barcode has appeared for
+# BULK_SETTLE_SECONDS, or after BULK_MAX_SECONDS in total
+BULK_SETTLE_SECONDS = 2.0
+BULK_MAX_SECONDS = 10.0
+# List Books window: rows per page, and how long typing must pause before searching (ms)
+LIST_PAGE_SIZE = 100
+LIST_SEARCH_DEBOUNCE_MS = 250
+# Stage timings/counters: live overlay on the preview (toggle with 'm'), and
+# optional export to a file (.prom = Prometheus text, else JSON) and/or a local port
+SHOW_METRICS_OVERLAY = False
+METRICS_FILE = None
+METRICS_PORT = None
 
 
 class LibraryManagementApp:
@@ -60,16 +85,31 @@ class LibraryManagementApp:
         self.root.title("Library Book Scanner System")
         self.root.geometry("600x700")
         self.root.configure(bg="#f9f9f9")
-
-        if not SCANNER_AVAILABLE:
-            messagebox.showwarning(
-                "Missing Dependency",
-                "Barcode scanner library not found!\n\n"
-                "Fix (Windows — Recommended):\n"
-                "  pip install zxing-cpp\n\n"
-                "Then restart the app.\n\n"
-                "Barcode scanning will NOT work without it."
+        self.root.report_callback_exception = self._report_error
+
+        self.service = ServiceClient(SCAN_SERVICE_URL) if SCAN_SERVICE_URL else None
+        # A missing/stale snapshot is built off the Tk thread; the CSV is served until then
+        self.catalog = open_catalog(SCAN_SERVICE_URL or CATALOG_FILE, snapshot=CATALOG_SNAPSHOT, background=True)
+        if CATALOG_WRITE_BUFFER and not SCAN_SERVICE_URL:   # the service batches its own writes
+            self.catalog = BufferedCatalog(
+                self.catalog, flush_rows=CATALOG_FLUSH_ROWS, flush_seconds=CATALOG_FLUSH_SECONDS
             )
+        self.metadata_cache = MetadataCache(METADATA_CACHE_FILE)
+        self._recommender = None
+        self.scanner_name = None
+        self.pipeline = None
+        self.cascade = None
+        self.decoder = None
+        self.decoders = {}   # camera source -> decoder, so "auto" calibrates once per camera
+        self.tracker = None
+        self.bulk_state = None
+        self.background = BackgroundRunner(root)
+        self.scan_state = None
+        self._book_index = None
+        self.show_metrics_overlay = SHOW_METRICS_OVERLAY
+        self.metrics_exporter = METRICS.start_file_exporter(METRICS_FILE) if METRICS_FILE else None
+        if METRICS_PORT:
+            METRICS.serve(METRICS_PORT)
 
         self.style = ttk.Style()
         self.style.configure("TLabel", font=("Arial", 12), background="#f9f9f9")
@@ -81,13 +121,14 @@ class LibraryManagementApp:
         )
         self.header.pack(pady=20)
 
-        scanner_info = f"Scanner: {SCANNER_NAME}" if SCANNER_AVAILABLE else "Scanner: NOT AVAILABLE"
         self.scanner_label = tk.Label(
-            root, text=scanner_info,
-            font=("Arial", 9), bg="#f9f9f9",
-            fg="green" if SCANNER_AVAILABLE else "red"
+            root, text="Scanner: detecting...",
+            font=("Arial", 9), bg="#f9f9f9", fg="#777777"
         )
         self.scanner_label.pack()
+        # Importing the decoder libraries is slow; do it after the window is up
+        self.background.submit("scanner-probe", probe_backends, on_done=self._on_scanner_probed,
+                               on_error=self._on_scanner_probe_failed)
 
         self.camera_frame = tk.LabelFrame(
             root, text="Camera Source",
@@ -129,7 +170,13 @@ class LibraryManagementApp:
             root, text="Scan Barcode",
             command=self.start_scanning, style="Custom.TButton"
         )
-        self.scan_button.pack(pady=20)
+        self.scan_button.pack(pady=(20, 5))
+
+        self.bulk_scan_button = ttk.Button(
+            root, text="Bulk Scan (Cart)",
+            command=lambda: self.start_scanning(bulk=True)
+        )
+        self.bulk_scan_button.pack(pady=(0, 15))
 
         self.result_label = tk.Label(
             root, text="", font=("Arial", 11), bg="#f9f9f9",
@@ -155,6 +202,32 @@ class LibraryManagementApp:
         self.close_button = ttk.Button(root, text="Close", command=root.quit)
         self.close_button.pack(pady=10)
 
+    @property
+    def recommender(self):
+        # Built on first use: the ranking code pulls in NumPy
+        if self._recommender is None:
+            from recommender import Recommender
+            self._recommender = Recommender(self.catalog)
+        return self._recommender
+
+    def _on_scanner_probed(self, backends):
+        if backends:
+            self.scanner_name = backends[0]
+            self.scanner_label.config(text=f"Scanner: {self.scanner_name}", fg="green")
+            return
+        self.scanner_label.config(text="Scanner: NOT AVAILABLE", fg="red")
+        messagebox.showwarning(
+            "Missing Dependency",
+            "Barcode scanner library not found!\n\n"
+            "Fix (Windows — Recommended):\n"
+            "  pip install zxing-cpp\n\n"
+            "Then restart the app.\n\n"
+            "Barcode scanning will NOT work without it."
+        )
+
+    def _on_scanner_probe_failed(self, error):
+        self.scanner_label.config(text=f"Scanner: detection failed ({error})", fg="red")
+
     def toggle_camera_options(self):
         if self.camera_source.get() == "webcam":
             self.webcam_index_entry.config(state="normal")
@@ -176,56 +249,16 @@ class LibraryManagementApp:
     # -------------------------------------------------------------------------
 
     def fetch_book_info_from_api(self, isbn):
-        try:
-            url = GOOGLE_BOOKS_API.format(isbn=isbn)
-            with urllib.request.urlopen(url, timeout=5) as response:
-                data = json.loads(response.read().decode())
-
-            if data.get("totalItems", 0) == 0:
+        if self.service is not None:
+            try:
+                return self.service.lookup(isbn)
+            except Exception as e:
+                print(f"[Service Error] {e}")
                 return None
+        return fetch_book_info(isbn, cache=self.metadata_cache)
 
-            volume_info = data["items"][0]["volumeInfo"]
-
-            title       = volume_info.get("title", "Unknown Title")
-            authors     = volume_info.get("authors", ["Unknown Author"])
-            categories  = volume_info.get("categories", ["Unknown"])
-            publisher   = volume_info.get("publisher", "Unknown Publisher")
-            published   = volume_info.get("publishedDate", "N/A")
-            description = volume_info.get("description", "No description available.")
-            thumbnail   = volume_info.get("imageLinks", {}).get("thumbnail", None)
-
-            return {
-                "title":         title,
-                "authors":       ", ".join(authors),
-                "category":      categories[0] if categories else "Unknown",
-                "publisher":     publisher,
-                "publishedDate": published,
-                "description":   description,
-                "thumbnail":     thumbnail,
-            }
-
-        except Exception as e:
-            print(f"[API Error] {e}")
-            return None
-
-    def fetch_recommendations_from_api(self, category, current_title):
-        recommendations = []
-        try:
-            url = GOOGLE_BOOKS_CATEGORY_API.format(category=urllib.parse.quote(category))
-            with urllib.request.urlopen(url, timeout=5) as response:
-                data = json.loads(response.read().decode())
-
-            for item in data.get("items", []):
-                rec_title = item["volumeInfo"].get("title", "")
-                if rec_title and rec_title != current_title:
-                    recommendations.append(rec_title)
-                if len(recommendations) >= 3:
-                    break
-
-        except Exception as e:
-            print(f"[Recommendation API Error] {e}")
-
-        return recommendations
+    def fetch_recommendations_from_api(self, category, current_title, book=None):
+        return self.recommender.remote(category, book or {"title": current_title})
 
     # -------------------------------------------------------------------------
     # ✅ NEW: Save scanned book to CSV (with duplicate check)
@@ -233,54 +266,27 @@ class LibraryManagementApp:
 
     def save_book_to_csv(self, barcode, book_info):
         """Saves a scanned book to the CSV file, skipping duplicates silently."""
-        # Check for duplicate barcode
-        if os.path.exists(CSV_FILE):
-            with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get('barcode') == barcode:
-                        print(f"[CSV] Barcode '{barcode}' already exists — skipping save.")
-                        return False  # Already exists, skip
-
-        file_exists = os.path.exists(CSV_FILE)
-        with open(CSV_FILE, mode='a', newline='', encoding='utf-8') as file:
-            fieldnames = ['title', 'barcode', 'genre', 'author', 'publisher']
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            if not file_exists:
-                writer.writeheader()
-            writer.writerow({
-                'title':     book_info.get('title', ''),
-                'barcode':   barcode,
-                'genre':     book_info.get('category', ''),
-                'author':    book_info.get('authors', ''),
-                'publisher': f"{book_info.get('publisher', '')} ({book_info.get('publishedDate', '')})",
-            })
+        saved = self.catalog.add(book_info_to_row(barcode, book_info))
+        if not saved:
+            print(f"[CSV] Barcode '{barcode}' already exists — skipping save.")
+            return False
 
         print(f"[CSV] Saved: '{book_info.get('title')}' with barcode '{barcode}'")
         return True
 
-    # -------------------------------------------------------------------------
-    # Preprocessing — multiple variants for better detection
-    # -------------------------------------------------------------------------
-
-    def get_preprocessed_variants(self, frame):
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        variants = [
-            gray,
-            cv2.equalizeHist(gray),
-            cv2.filter2D(gray, -1,
-                         np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])),
-            cv2.resize(gray, (gray.shape[1] * 2, gray.shape[0] * 2),
-                       interpolation=cv2.INTER_LINEAR),
-        ]
-        return variants
-
     # -------------------------------------------------------------------------
     # Main Scanning Loop
     # -------------------------------------------------------------------------
 
-    def start_scanning(self):
-        if not SCANNER_AVAILABLE:
+    def decode_frame(self, frame):
+        """Runs on a pipeline decode worker — must not touch Tk widgets."""
+        results, _ = self.cascade.decode(frame, decoder=self.decoder, tracker=self.tracker)
+        return results
+
+    def start_scanning(self, bulk=False):
+        # Returns at once if the startup probe already finished
+        backends = probe_backends()
+        if not backends:
             messagebox.showerror(
                 "Scanner Not Available",
                 "No barcode library installed!\n\n"
@@ -289,180 +295,512 @@ class LibraryManagementApp:
             )
             return
 
+        if self.pipeline is not None:
+            return  # A scan is already running
+        self.scanner_name = SCAN_BACKEND or backends[0]
+
         source = self.get_camera_source()
         if source is None:
             return
 
+        # A new scan supersedes lookups still running for the previous one
+        self.background.cancel("scan-lookup")
+        self.background.cancel("scan-peek")
+        self.background.cancel("scan-recs")
         self.result_label.config(text="Connecting to camera...")
-        self.root.update()
-
-        cap = cv2.VideoCapture(source)
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-
-        if not cap.isOpened():
-            messagebox.showerror(
-                "Camera Error",
-                f"Could not open camera source:\n{source}\n\n"
-                "Check camera index or RTSP URL."
+        if cv2 is None:
+            self.root.update_idletasks()  # Show the label while OpenCV loads
+            load_scanning_modules()
+        if source not in self.decoders:
+            self.decoders[source] = make_decoder(SCAN_BACKEND, label=f"camera {source}")
+        self.decoder = self.decoders[source]
+
+        if bulk:
+            # Every barcode on the cart must still be read twice, but is collected once
+            self.scan_confirmer = ScanConfirmer(
+                required_reads=SCAN_CONFIRM_READS, window=BULK_MAX_SECONDS, cooldown=BULK_MAX_SECONDS
+            )
+            self.tracker = None
+            self.bulk_state = {"codes": {}, "started": None, "last_new": None}
+            self.cascade = VariantCascade()
+            # Barcodes are spread over the whole frame, not held in the guide box
+            self.pipeline = ScanPipeline(
+                source, lambda frame: self.cascade.decode_all(frame, decoder=self.decoder),
+                gate=FrameGate(use_roi=False),
             )
+        else:
+            self.scan_confirmer = ScanConfirmer(
+                required_reads=SCAN_CONFIRM_READS, window=SCAN_CONFIRM_WINDOW, cooldown=0
+            )
+            self.tracker = RoiTracker()
+            self.cascade = VariantCascade(pyramid=SCAN_ADAPTIVE)
+            adaptive = AdaptiveCapture(label=f"camera {source}") if SCAN_ADAPTIVE else None
+            # Gate on the region the cascade will decode: the tracked ROI, else the guide box
+            self.pipeline = ScanPipeline(source, self.decode_frame, gate=FrameGate(tracker=self.tracker),
+                                         adaptive=adaptive)
+        self.pipeline.start()
+        self._scan_connected = False
+        self.root.after(SCAN_POLL_MS, self._poll_scan)
+
+    def stop_scanning(self, close_windows=True):
+        if self.pipeline is not None:
+            self.pipeline.stop()
+            print(f"[SCAN] Pipeline: {self.pipeline.stats} | Gate rejections: {self.pipeline.gate.snapshot_stats()}")
+            if self.pipeline.adaptive is not None:
+                print(f"[SCAN] Adaptive capture: {self.pipeline.adaptive.snapshot_stats()}")
+            if self.tracker is not None:
+                print(f"[SCAN] Tracker: {self.tracker.snapshot_stats()}")
+            print("[SCAN] Metrics:\n  " + "\n  ".join(METRICS.overlay_lines()))
+            self.pipeline = None
+        self.scan_state = None
+        self.bulk_state = None
+        if close_windows and cv2 is not None:
+            cv2.destroyAllWindows()
+
+    def _poll_scan(self):
+        """Display stage: runs on the Tk thread every SCAN_POLL_MS and never blocks."""
+        pipeline = self.pipeline
+        if pipeline is None:
+            return
+
+        if pipeline.error:
+            self.stop_scanning()
             self.result_label.config(text="")
+            messagebox.showerror("Camera Error", pipeline.error)
             return
 
-        self.result_label.config(
-            text=f"Camera connected [{SCANNER_NAME}]. Hold barcode steady...\nPress 'q' to cancel."
-        )
-        self.root.update()
+        if not pipeline.connected.is_set():
+            self.root.after(SCAN_POLL_MS, self._poll_scan)
+            return
+
+        if self.bulk_state is not None:
+            self._poll_bulk_scan(pipeline)
+            return
+
+        if not self._scan_connected:
+            self._scan_connected = True
+            self.result_label.config(
+                text=f"Camera connected [{self.scanner_name}]. Hold barcode steady...\nPress 'q' to cancel."
+            )
 
-        output_shown = False
+        hit = pipeline.poll_result()
+        confirmed = self.scan_confirmer.observe_all(hit[1]) if hit else []
+        if confirmed:
+            frame = hit[0]
+            detected_data = confirmed[0]["data"]
+            print(f"[SCAN] Detected: {detected_data}")
+            draw_barcode_boxes(frame, [(detected_data, confirmed[0]["rect"])])
 
-        while not output_shown:
-            ret, frame = cap.read()
-            if not ret:
-                messagebox.showerror("Camera Error", "Failed to read frame. Stream disconnected.")
-                break
+            self.stop_scanning(close_windows=False)
+            cv2.imshow("Barcode Scanner", frame)
+            cv2.waitKey(1)
+            self.root.after(600, cv2.destroyAllWindows)
 
-            detected_data = None
-            detected_rect = None
+            self.result_label.config(
+                text=f"Barcode: {detected_data}\nFetching from Google Books..."
+            )
+            self.show_scan_result(detected_data)
+            return
 
-            for variant in self.get_preprocessed_variants(frame):
-                results = decode_barcodes(variant)
-                if results:
-                    detected_data = results[0]["data"]
-                    detected_rect = results[0]["rect"]
-                    break
+        frame = pipeline.latest_frame()
+        if frame is not None:
+            draw_guide_box(frame)
+            if self.show_metrics_overlay:
+                draw_text_overlay(frame, METRICS.overlay_lines())
+            cv2.imshow("Barcode Scanner", frame)
 
-            if detected_data:
-                print(f"[SCAN] Detected: {detected_data}")
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            self.stop_scanning()
+            self.result_label.config(text="Scan cancelled.")
+            return
+        if key == ord('m'):
+            self.show_metrics_overlay = not self.show_metrics_overlay
 
-                if detected_rect:
-                    x, y, w, h = detected_rect
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 3)
-                    cv2.putText(frame, detected_data, (x, y - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+        self.root.after(SCAN_POLL_MS, self._poll_scan)
 
-                cv2.imshow("Barcode Scanner", frame)
-                cv2.waitKey(600)
+    # -------------------------------------------------------------------------
+    # Bulk (cart) scan — collects every distinct barcode seen over a short
+    # burst, then resolves them in one batch and writes one catalog append.
+    # -------------------------------------------------------------------------
 
-                self.result_label.config(
-                    text=f"Barcode: {detected_data}\nFetching from Google Books..."
-                )
-                self.root.update()
-
-                book_info = self.fetch_book_info_from_api(detected_data)
-
-                if book_info:
-                    # ✅ FIX: Save to CSV after successful API fetch
-                    saved = self.save_book_to_csv(detected_data, book_info)
-                    save_status = "📁 Saved to library." if saved else "📁 Already in library (not duplicated)."
-
-                    result_text = (
-                        f"✅ Found: '{book_info['title']}'\n"
-                        f"👤 Author(s): {book_info['authors']}\n"
-                        f"🏷️ Category: {book_info['category']}\n"
-                        f"🏢 Publisher: {book_info['publisher']} ({book_info['publishedDate']})\n"
-                        f"📖 {book_info['description'][:200]}...\n"
-                        f"{save_status}"
-                    )
-                    recs = self.fetch_recommendations_from_api(
-                        book_info['category'], book_info['title']
-                    )
-                    if recs:
-                        result_text += "\n\n📚 You might also like:"
-                        for rec in recs:
-                            result_text += f"\n  • {rec}"
-                    else:
-                        result_text += "\n\nNo recommendations found."
-                else:
-                    csv_title, csv_genre = self.get_book_info_from_csv(detected_data)
-                    if csv_title:
-                        result_text = f"✅ Found in local DB: '{csv_title}' (Genre: {csv_genre})"
-                        recs = self.recommend_books_from_csv(csv_genre, csv_title)
-                        if recs:
-                            result_text += "\n\n📚 You might also like:"
-                            for rec in recs:
-                                result_text += f"\n  • {rec}"
-                    else:
-                        result_text = (
-                            f"❌ Book not found for barcode: {detected_data}\n"
-                            "Not in Google Books API or local database."
-                        )
-
-                self.result_label.config(text=result_text)
-                output_shown = True
-                break
-
-            h_f, w_f = frame.shape[:2]
-            cx, cy = w_f // 2, h_f // 2
-            bw, bh = int(w_f * 0.6), int(h_f * 0.35)
-            cv2.rectangle(
-                frame,
-                (cx - bw // 2, cy - bh // 2),
-                (cx + bw // 2, cy + bh // 2),
-                (0, 255, 255), 2
+    def _poll_bulk_scan(self, pipeline):
+        state = self.bulk_state
+        now = time.monotonic()
+        if state["started"] is None:
+            state["started"] = now
+            self.result_label.config(
+                text=f"Camera connected [{self.scanner_name}]. Show the cart's barcodes...\n"
+                     "Press 'd' when done, 'q' to cancel."
             )
-            cv2.putText(frame,
-                        "Hold barcode STEADY inside the box | Press 'q' to quit",
-                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
 
+        hit = pipeline.poll_result()
+        if hit:
+            for result in hit[1]:
+                if result["data"] in state["codes"]:
+                    state["codes"][result["data"]] = result["rect"]  # Follow the cart as it moves
+            for result in self.scan_confirmer.observe_all(hit[1]):
+                state["codes"][result["data"]] = result["rect"]
+                state["last_new"] = now
+                print(f"[BULK] Collected: {result['data']}")
+
+        frame = pipeline.latest_frame()
+        if frame is not None:
+            draw_barcode_boxes(frame, state["codes"].items())
+            draw_text_overlay(frame, [f"Collected {len(state['codes'])} barcodes | 'd' done, 'q' cancel"],
+                              origin=(10, 10))
+            if self.show_metrics_overlay:
+                draw_text_overlay(frame, METRICS.overlay_lines())
             cv2.imshow("Barcode Scanner", frame)
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                self.result_label.config(text="Scan cancelled.")
-                break
+        key = cv2.waitKey(1) & 0xFF
+        if key == ord('q'):
+            self.stop_scanning()
+            self.result_label.config(text="Bulk scan cancelled.")
+            return
+        if key == ord('m'):
+            self.show_metrics_overlay = not self.show_metrics_overlay
 
-        cap.release()
-        cv2.destroyAllWindows()
+        settled = state["last_new"] is not None and now - state["last_new"] >= BULK_SETTLE_SECONDS
+        if key == ord('d') or settled or now - state["started"] >= BULK_MAX_SECONDS:
+            self._finish_bulk_scan()
+            return
+
+        self.root.after(SCAN_POLL_MS, self._poll_scan)
+
+    def _finish_bulk_scan(self):
+        codes = list(self.bulk_state["codes"])
+        self.stop_scanning()
+        if not codes:
+            self.result_label.config(text="Bulk scan: no barcodes collected.")
+            return
+        self.result_label.config(text=f"Collected {len(codes)} barcodes. Resolving metadata...")
+        if self.service is not None:
+            self.background.submit("bulk-ingest", self.service.ingest, codes,
+                                   on_done=self._on_bulk_ingested, on_error=self._on_bulk_ingest_failed)
+            return
+        self.background.submit(
+            "bulk-ingest", ingest, codes, self.catalog, self.metadata_cache,
+            on_done=self._on_bulk_ingested, on_error=self._on_bulk_ingest_failed,
+        )
+
+    def _on_bulk_ingest_failed(self, error):
+        self.result_label.config(text=f"❌ Cart check-in failed: {error}\nScan the cart again to retry.")
+        messagebox.showerror("Bulk Check-in", f"Resolving the collected barcodes failed:\n{error}")
+
+    def _on_bulk_ingested(self, summary):
+        print(f"[BULK] {summary['written']} added, {summary['skipped_existing']} already in catalog, "
+              f"{summary['not_found']} not found, {summary['failed']} failed")
+        self.result_label.config(
+            text=f"Cart check-in: {summary['requested']} barcodes\n"
+                 f"✅ {summary['written']} added  •  {summary['skipped_existing']} already in catalog\n"
+                 f"{summary['not_found']} not found  •  {summary['failed']} lookups failed"
+        )
+
+    # -------------------------------------------------------------------------
+    # Scan result — lookups run in the background, the label fills in as
+    # results arrive. When the category is already known locally (catalog
+    # row or cached metadata), recommendations start in parallel with the
+    # ISBN lookup. Catalog reads and saves run in the background as well:
+    # in thin-client mode every one of them is an HTTP call.
+    # -------------------------------------------------------------------------
+
+    def peek_known_book(self, barcode):
+        """Returns a book_info-like dict from the catalog or metadata cache, without
+        calling Google Books. Runs off the Tk thread."""
+        row = self.catalog.get(barcode)
+        if row is not None and row['genre']:
+            return {
+                "title":     row['title'],
+                "authors":   row['author'],
+                "publisher": row['publisher'],
+                "category":  row['genre'],
+            }
+        hit, info = self.metadata_cache.get(normalize_isbn(barcode), allow_stale=True)
+        if hit and info:
+            return info
+        return None
+
+    def show_scan_result(self, detected_data):
+        self.background.cancel("scan-recs")
+        self.scan_state = {
+            "barcode": detected_data,
+            "book_info": None,
+            "save_status": "",
+            "recs_category": None,
+            "recs": None,
+        }
+
+        self.background.submit(
+            "scan-lookup", self._resolve_scan, detected_data,
+            on_done=self._on_scan_book_info, on_error=self._on_scan_lookup_failed,
+        )
+        self.background.submit("scan-peek", self.peek_known_book, detected_data, on_done=self._on_scan_peek)
+
+    def _resolve_scan(self, barcode):
+        """(book_info, saved, local result text) for a scan. Runs off the Tk thread."""
+        book_info = self.fetch_book_info_from_api(barcode)
+        if not book_info:
+            return None, False, self._local_scan_result(barcode)
+        # ✅ FIX: Save to CSV after successful API fetch
+        return book_info, self.save_book_to_csv(barcode, book_info), None
+
+    def _on_scan_peek(self, known):
+        # The lookup may have finished first and started recommendations itself
+        if known and self.scan_state["recs_category"] is None and not self.scan_state["book_info"]:
+            self._request_scan_recommendations(known['category'], known)
+
+    def _request_scan_recommendations(self, category, book):
+        self.scan_state["recs_category"] = category
+        self.scan_state["recs"] = self.recommender.cached_remote(category, book)
+        if self.scan_state["recs"] is not None:
+            self.background.cancel("scan-recs")
+            return
+        self.background.submit(
+            "scan-recs", self.fetch_recommendations_from_api, category, book['title'], book,
+            on_done=lambda recs: self._on_scan_recommendations(category, recs),
+            on_error=lambda _: self._on_scan_recommendations(category, []),
+        )
+
+    def _on_scan_book_info(self, result):
+        book_info, saved, local_text = result
+        state = self.scan_state
+        state["book_info"] = book_info
+
+        if not book_info:
+            self.background.cancel("scan-peek")
+            self.background.cancel("scan-recs")
+            self.result_label.config(text=local_text)
+            return
+
+        state["save_status"] = "📁 Saved to library." if saved else "📁 Already in library (not duplicated)."
+
+        if state["recs_category"] != book_info['category']:
+            self._request_scan_recommendations(book_info['category'], book_info)
+        self._render_scan_result()
+
+    def _on_scan_lookup_failed(self, error):
+        self.background.cancel("scan-peek")
+        self.background.cancel("scan-recs")
+        self.result_label.config(
+            text=f"⚠️ Lookup failed for barcode {self.scan_state['barcode']}: {error}"
+        )
+
+    def _on_scan_recommendations(self, category, recs):
+        state = self.scan_state
+        if state["recs_category"] != category:
+            return
+        state["recs"] = recs
+        if state["book_info"]:
+            self._render_scan_result()
+
+    def _render_scan_result(self):
+        state = self.scan_state
+        book_info = state["book_info"]
+        result_text = (
+            f"✅ Found: '{book_info['title']}'\n"
+            f"👤 Author(s): {book_info['authors']}\n"
+            f"🏷️ Category: {book_info['category']}\n"
+            f"🏢 Publisher: {book_info['publisher']} ({book_info['publishedDate']})\n"
+            f"📖 {book_info['description'][:200]}...\n"
+            f"{state['save_status']}"
+        )
+        recs = [rec for rec in (state["recs"] or []) if rec != book_info['title']]
+        if state["recs"] is None:
+            result_text += "\n\n📚 Looking for recommendations..."
+        elif recs:
+            result_text += "\n\n📚 You might also like:"
+            for rec in recs:
+                result_text += f"\n  • {rec}"
+        else:
+            result_text += "\n\nNo recommendations found."
+        self.result_label.config(text=result_text)
+
+    def _local_scan_result(self, detected_data):
+        csv_title, csv_genre = self.get_book_info_from_csv(detected_data)
+        if csv_title:
+            result_text = f"✅ Found in local DB: '{csv_title}' (Genre: {csv_genre})"
+            recs = self.recommend_books_from_csv(csv_genre, csv_title, self.catalog.get(detected_data))
+            if recs:
+                result_text += "\n\n📚 You might also like:"
+                for rec in recs:
+                    result_text += f"\n  • {rec}"
+            return result_text
+        return (
+            f"❌ Book not found for barcode: {detected_data}\n"
+            "Not in Google Books API or local database."
+        )
+
+    def _report_error(self, exc_type, exc, tb):
+        """Tk callback errors: a down scan service gets a message box, anything else a traceback."""
+        if isinstance(exc, ConnectionError):
+            messagebox.showerror("Scan Service", str(exc))
+            return
+        traceback.print_exception(exc_type, exc, tb)
 
     # -------------------------------------------------------------------------
     # CSV Methods
     # -------------------------------------------------------------------------
 
     def get_book_info_from_csv(self, barcode_data):
-        if not os.path.exists(CSV_FILE):
+        row = self.catalog.get(barcode_data)
+        if row is None:
             return None, None
-        with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['barcode'] == barcode_data:
-                    return row['title'], row['genre']
-        return None, None
-
-    def recommend_books_from_csv(self, genre, current_book_title):
-        recommendations = []
-        if not os.path.exists(CSV_FILE):
-            return recommendations
-        with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['genre'] == genre and row['title'] != current_book_title:
-                    recommendations.append(row['title'])
-                if len(recommendations) >= 3:
-                    break
-        return recommendations
+        return row['title'], row['genre']
+
+    def recommend_books_from_csv(self, genre, current_book_title, book=None):
+        return self.recommender.local(genre, book or {"title": current_book_title})
 
     # -------------------------------------------------------------------------
     # UI Buttons
     # -------------------------------------------------------------------------
 
     def view_total_books(self):
-        total_books = 0
-        if os.path.exists(CSV_FILE):
-            with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                total_books = sum(1 for row in reader)
-        messagebox.showinfo("Total Books", f"Total number of books: {total_books}")
+        # count() may flush queued saves or ask the scan service; not on the Tk thread
+        self.background.submit(
+            "total-books", self.catalog.count,
+            on_done=lambda total: messagebox.showinfo("Total Books", f"Total number of books: {total}"),
+            on_error=lambda error: messagebox.showerror("Total Books", f"Could not count the books:\n{error}"),
+        )
+
+    def _catalog_page(self, page):
+        """(total, page, rows) of the unfiltered book list, page clamped. Runs off the Tk thread."""
+        total = self.catalog.count()
+        pages = max(1, -(-total // LIST_PAGE_SIZE))
+        page = max(0, min(page, pages - 1))
+        return total, page, self.catalog.page(page * LIST_PAGE_SIZE, LIST_PAGE_SIZE)
+
+    def _load_book_index(self):
+        """Search index for the current catalog version, rebuilt only after changes. Runs off the Tk thread."""
+        self.catalog.refresh()
+        index = self._book_index
+        if index is None or index.version != self.catalog.version:
+            version = self.catalog.version
+            index = BookSearchIndex(self.catalog.rows(), version=version)
+            self._book_index = index
+        return index
 
     def list_books(self):
-        books = []
-        if os.path.exists(CSV_FILE):
-            with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                books = [row['title'] for row in reader]
-        if books:
-            messagebox.showinfo("List of Books", "Books:\n" + "\n".join(books))
-        else:
-            messagebox.showinfo("List of Books", "No books found.")
+        list_window = tk.Toplevel(self.root)
+        list_window.title("List of Books")
+        list_window.geometry("760x520")
+        list_window.configure(bg="#f9f9f9")
+
+        # hits is None while browsing the whole catalog, else positions into index.rows
+        state = {"index": None, "hits": None, "page": 0, "debounce": None}
+        search_channel = f"list-search{list_window}"
+        page_channel = f"list-page{list_window}"
+
+        search_frame = tk.Frame(list_window, bg="#f9f9f9")
+        search_frame.pack(padx=15, pady=(15, 5), fill="x")
+        tk.Label(search_frame, text="Search title / author / genre:", bg="#f9f9f9",
+                 font=("Arial", 10)).pack(side="left")
+        search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=search_var, width=40, font=("Arial", 11))
+        search_entry.pack(side="left", padx=8, fill="x", expand=True)
+
+        tree_frame = tk.Frame(list_window, bg="#f9f9f9")
+        tree_frame.pack(padx=15, pady=5, fill="both", expand=True)
+        columns = (("title", "Title", 260), ("author", "Author", 170),
+                   ("genre", "Genre", 130), ("barcode", "Barcode", 120))
+        tree = ttk.Treeview(tree_frame, columns=[c[0] for c in columns], show="headings")
+        for key, heading, width in columns:
+            tree.heading(key, text=heading)
+            tree.column(key, width=width, anchor="w")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        nav_frame = tk.Frame(list_window, bg="#f9f9f9")
+        nav_frame.pack(pady=(5, 10))
+        prev_button = ttk.Button(nav_frame, text="◀ Prev", command=lambda: go(-1))
+        prev_button.grid(row=0, column=0, padx=8)
+        page_label = tk.Label(nav_frame, text="", bg="#f9f9f9", font=("Arial", 10))
+        page_label.grid(row=0, column=1, padx=8)
+        next_button = ttk.Button(nav_frame, text="Next ▶", command=lambda: go(1))
+        next_button.grid(row=0, column=2, padx=8)
+        status_label = tk.Label(list_window, text="", bg="#f9f9f9", fg="#555555", font=("Arial", 9))
+        status_label.pack(pady=(0, 8))
+
+        def show_page():
+            if state["hits"] is None:
+                # The catalog may be behind the scan service; fetch the page in the background
+                status_label.config(text="Loading...")
+                self.background.submit(page_channel, self._catalog_page, state["page"],
+                                       on_done=render_page, on_error=on_list_error)
+                return
+            self.background.cancel(page_channel)
+            total = len(state["hits"])
+            pages = max(1, -(-total // LIST_PAGE_SIZE))
+            page = max(0, min(state["page"], pages - 1))
+            rows = state["index"].rows
+            start = page * LIST_PAGE_SIZE
+            render_page((total, page, [rows[i] for i in state["hits"][start:start + LIST_PAGE_SIZE]]))
+
+        def render_page(result):
+            # Only one page of rows is ever in the Treeview, whatever the catalog size
+            if not list_window.winfo_exists():
+                return
+            total, state["page"], rows = result
+            pages = max(1, -(-total // LIST_PAGE_SIZE))
+            tree.delete(*tree.get_children())
+            for row in rows:
+                tree.insert("", "end", values=(row['title'], row['author'], row['genre'], row['barcode']))
+            page_label.config(text=f"Page {state['page'] + 1} of {pages}")
+            prev_button.state(["!disabled"] if state["page"] > 0 else ["disabled"])
+            next_button.state(["!disabled"] if state["page"] < pages - 1 else ["disabled"])
+            if state["hits"] is None:
+                status_label.config(text=f"{total} books" if total else "No books found.")
+            else:
+                status_label.config(text=f"{total} matching books")
+
+        def go(delta):
+            state["page"] += delta
+            show_page()
+
+        def run_search():
+            state["debounce"] = None
+            if not list_window.winfo_exists():
+                return
+            query = search_var.get().strip()
+            if not query:
+                self.background.cancel(search_channel)
+                state["hits"] = None
+                state["page"] = 0
+                show_page()
+            elif state["index"] is None:
+                status_label.config(text="Indexing catalog...")  # on_index_ready searches
+            else:
+                status_label.config(text="Searching...")
+                self.background.submit(search_channel, state["index"].search, query,
+                                       on_done=on_search_results, on_error=on_list_error)
+
+        def on_search_results(hits):
+            if list_window.winfo_exists():
+                state["hits"] = hits
+                state["page"] = 0
+                show_page()
+
+        def on_list_error(error):
+            if list_window.winfo_exists():
+                status_label.config(text=f"❌ {error}")
+
+        def on_index_ready(index):
+            state["index"] = index
+            if search_var.get().strip():
+                run_search()
+
+        def on_type(*_):
+            if state["debounce"] is not None:
+                list_window.after_cancel(state["debounce"])
+            state["debounce"] = list_window.after(LIST_SEARCH_DEBOUNCE_MS, run_search)
+
+        search_var.trace_add("write", on_type)
+        show_page()
+        self.background.submit(f"list-index{list_window}", self._load_book_index,
+                               on_done=on_index_ready, on_error=on_list_error)
+        search_entry.focus_set()
 
     def add_book(self):
         add_book_window = tk.Toplevel(self.root)
@@ -519,9 +857,21 @@ class LibraryManagementApp:
                 return
 
             status_label.config(text="🔍 Fetching from Google Books API...", fg="#007bff")
-            add_book_window.update()
 
-            book_info = self.fetch_book_info_from_api(isbn)
+            # A newer Fetch Details click supersedes this one
+            self.background.submit(
+                "add-book-lookup", self.fetch_book_info_from_api, isbn,
+                on_done=lambda book_info: fill_fields(isbn, book_info),
+                on_error=lookup_failed,
+            )
+
+        def lookup_failed(error):
+            if add_book_window.winfo_exists():
+                status_label.config(text=f"❌ Lookup failed: {error}. Fill details manually.", fg="red")
+
+        def fill_fields(isbn, book_info):
+            if not add_book_window.winfo_exists():
+                return
 
             if book_info:
                 fields["title"].delete(0, tk.END)
@@ -556,6 +906,7 @@ class LibraryManagementApp:
         fetch_btn.grid(row=0, column=2, padx=6, pady=4)
 
         isbn_entry.bind("<Return>", lambda e: fetch_by_isbn())
+        save_channel = f"add-book-save{add_book_window}"
 
         def save_book():
             title     = fields["title"].get().strip()
@@ -569,34 +920,52 @@ class LibraryManagementApp:
                                      "Title, Barcode/ISBN and Genre are required (marked with *).")
                 return
 
-            if os.path.exists(CSV_FILE):
-                with open(CSV_FILE, mode='r', newline='', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if row.get('barcode') == barcode:
-                            if not messagebox.askyesno(
-                                "Duplicate Found",
-                                f"A book with barcode '{barcode}' already exists:\n'{row['title']}'\n\nAdd anyway?"
-                            ):
-                                return
-                            break
-
-            file_exists = os.path.exists(CSV_FILE)
-            with open(CSV_FILE, mode='a', newline='', encoding='utf-8') as file:
-                fieldnames = ['title', 'barcode', 'genre', 'author', 'publisher']
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                if not file_exists:
-                    writer.writeheader()
-                writer.writerow({
-                    'title':     title,
-                    'barcode':   barcode,
-                    'genre':     genre,
-                    'author':    author,
-                    'publisher': publisher,
-                })
-
-            messagebox.showinfo("Success", f"✅ '{title}' added successfully!")
-            add_book_window.destroy()
+            row = {
+                'title':     title,
+                'barcode':   barcode,
+                'genre':     genre,
+                'author':    author,
+                'publisher': publisher,
+            }
+            # Catalog reads/writes can be HTTP calls (thin client); keep them off the Tk thread
+            self.background.submit(
+                save_channel, self.catalog.get, barcode,
+                on_done=lambda existing: confirm_and_add(row, existing), on_error=save_failed,
+            )
+
+        def confirm_and_add(row, existing):
+            if not add_book_window.winfo_exists():
+                return
+            barcode = row['barcode']
+            if existing is not None and not getattr(self.catalog, "allows_duplicates", False):
+                messagebox.showinfo(
+                    "Duplicate Found",
+                    f"A book with barcode '{barcode}' already exists:\n'{existing['title']}'\n\n"
+                    "This catalog keeps one book per barcode."
+                )
+                return
+            if existing is not None:
+                if not messagebox.askyesno(
+                    "Duplicate Found",
+                    f"A book with barcode '{barcode}' already exists:\n'{existing['title']}'\n\nAdd anyway?"
+                ):
+                    return
+            self.background.submit(
+                save_channel, self.catalog.add, row, True,
+                on_done=lambda added: on_added(row, added), on_error=save_failed,
+            )
+
+        def on_added(row, added):
+            if not added:
+                messagebox.showinfo("Duplicate Found",
+                                    f"This catalog keeps one book per barcode; '{row['barcode']}' was not added again.")
+                return
+            messagebox.showinfo("Success", f"✅ '{row['title']}' added successfully!")
+            if add_book_window.winfo_exists():
+                add_book_window.destroy()
+
+        def save_failed(error):
+            messagebox.showerror("Add Book", f"Could not save the book:\n{error}")
 
         btn_frame = tk.Frame(add_book_window, bg="#f9f9f9")
         btn_frame.pack(pady=10)
@@ -627,4 +996,9 @@ if __name__ == "__main__":
     root.style.configure('Custom.TButton', background='#007bff', foreground='#ffffff',
                           font=('Arial', 12, 'bold'))
 
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    app.background.shutdown()
+    app.catalog.close()   # Writes any queued books
+    if app.metrics_exporter is not None:
+        app.metrics_exporter.set()
+        METRICS.write_file(METRICS_FILE)
\ No newline at end of file
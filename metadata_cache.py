@@ -0,0 +1,112 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# -----------------------------------------------------------------------
+# ISBN metadata cache — Google Books results persisted in SQLite with an
+# in-memory LRU in front of it.
+#
+#   * positive results live for DEFAULT_TTL
+#   * "not found" results are cached too, but only for DEFAULT_NEGATIVE_TTL
+#   * the table is trimmed to max_entries (least recently fetched first)
+#   * expired entries are still served when the API is unreachable
+# -----------------------------------------------------------------------
+
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MEMORY_ENTRIES = 2048
+
+# How many writes between size checks of the on-disk table
+EVICT_CHECK_INTERVAL = 256
+
+
+class MetadataCache:
+    def __init__(self, path, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # isbn -> (info or None, fetched_at)
+        self._writes_since_check = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS isbn_cache ("
+            " isbn TEXT PRIMARY KEY,"
+            " payload TEXT,"
+            " fetched_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS isbn_cache_fetched_at ON isbn_cache (fetched_at)"
+        )
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _is_fresh(self, info, fetched_at, now):
+        ttl = self.ttl if info is not None else self.negative_ttl
+        return now - fetched_at < ttl
+
+    def _remember(self, isbn, entry):
+        self._memory[isbn] = entry
+        self._memory.move_to_end(isbn)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, isbn, allow_stale=False):
+        """Returns (hit, info). info is None for a cached "not found" result."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(isbn)
+            if entry is None:
+                row = self._conn.execute(
+                    "SELECT payload, fetched_at FROM isbn_cache WHERE isbn = ?", (isbn,)
+                ).fetchone()
+                if row is None:
+                    return False, None
+                payload, fetched_at = row
+                entry = (json.loads(payload) if payload is not None else None, fetched_at)
+            self._remember(isbn, entry)
+
+        info, fetched_at = entry
+        if allow_stale or self._is_fresh(info, fetched_at, now):
+            return True, info
+        return False, None
+
+    def put(self, isbn, info):
+        now = time.time()
+        payload = json.dumps(info) if info is not None else None
+        with self._lock:
+            self._remember(isbn, (info, now))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO isbn_cache (isbn, payload, fetched_at) VALUES (?, ?, ?)",
+                (isbn, payload, now),
+            )
+            self._conn.commit()
+            self._writes_since_check += 1
+            if self._writes_since_check >= EVICT_CHECK_INTERVAL:
+                self._writes_since_check = 0
+                self._evict()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM isbn_cache").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM isbn_cache WHERE isbn IN ("
+                " SELECT isbn FROM isbn_cache ORDER BY fetched_at LIMIT ?)",
+                (excess,),
+            )
+            self._conn.commit()
+            print(f"[Cache] Evicted {excess} old ISBN entries")
@@ -0,0 +1,188 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# -----------------------------------------------------------------------
+# Metrics — per-stage timers and counters for finding which stage limits
+# a desk (capture, gate, each cascade variant, API calls, catalog writes).
+#
+#   with METRICS.timer("api_isbn"): ...
+#   METRICS.count("frames_dropped")
+#
+# Timers keep count/sum plus a window of recent samples for
+# p50/p95/p99. Recording is a perf_counter call and a short lock, cheap
+# enough for every frame. Snapshots export as JSON or Prometheus text,
+# either to a file (write_file / start_file_exporter) or over HTTP
+# (serve: /metrics and /metrics.json).
+# -----------------------------------------------------------------------
+
+QUANTILES = (0.5, 0.95, 0.99)
+# Recent samples kept per stage for the quantiles
+DEFAULT_WINDOW = 2048
+PROMETHEUS_PREFIX = "library_scanner"
+
+_NAME_RE = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Metrics:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}   # stage -> [count, total_seconds, deque of recent samples]
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            timer = self._timers.get(stage)
+            if timer is None:
+                timer = self._timers[stage] = [0, 0.0, deque(maxlen=self.window)]
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2].append(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        """{"uptime", "counters": {name: n}, "stages": {stage: {count, total_s, mean_ms, p50_ms, ...}}}"""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {stage: (t[0], t[1], list(t[2])) for stage, t in self._timers.items()}
+            uptime = time.time() - self.started
+
+        stages = {}
+        for stage, (count, total, samples) in timers.items():
+            samples.sort()
+            stats = {"count": count, "total_s": round(total, 6),
+                     "mean_ms": round(total / count * 1000, 3) if count else 0.0}
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}_ms"] = round(_quantile(samples, q) * 1000, 3)
+            stages[stage] = stats
+        return {"uptime": round(uptime, 1), "counters": counters, "stages": stages}
+
+    # -------------------------------------------------------------------------
+    # Export
+    # -------------------------------------------------------------------------
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            metric = f"{PROMETHEUS_PREFIX}_{_NAME_RE.sub('_', name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+
+        metric = f"{PROMETHEUS_PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {metric} summary")
+        for stage, stats in sorted(snap["stages"].items()):
+            for q in QUANTILES:
+                seconds = stats[f"p{int(q * 100)}_ms"] / 1000
+                lines.append(f'{metric}{{stage="{stage}",quantile="{q}"}} {seconds:.6f}')
+            lines.append(f'{metric}_count{{stage="{stage}"}} {stats["count"]}')
+            lines.append(f'{metric}_sum{{stage="{stage}"}} {stats["total_s"]:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write_file(self, path):
+        """Writes a snapshot atomically: Prometheus text for .prom/.txt, JSON otherwise."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def start_file_exporter(self, path, interval=5.0):
+        """Rewrites `path` every `interval` seconds. Returns an Event that stops it."""
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.write_file(path)
+
+        threading.Thread(target=run, name="metrics-export", daemon=True).start()
+        return stop
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics (Prometheus) and /metrics.json in a daemon thread. Returns the server."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = metrics.to_json(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"[Metrics] Serving http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+    # -------------------------------------------------------------------------
+    # Overlay
+    # -------------------------------------------------------------------------
+
+    def overlay_lines(self, stages=("capture", "gate", "decode", "api_isbn")):
+        """Short text lines for drawing on the preview window."""
+        snap = self.snapshot()
+        counters = snap["counters"]
+        # cap.read() blocks until the next frame, so its mean is the frame interval
+        capture_ms = snap["stages"].get("capture", {}).get("mean_ms")
+        fps = 1000 / capture_ms if capture_ms else 0.0
+        lines = [
+            f"fps {fps:.1f}  captured {counters.get('frames_captured', 0)}"
+            f"  decoded {counters.get('frames_decoded', 0)}  gated {counters.get('frames_gated', 0)}"
+            f"  dropped {counters.get('frames_dropped', 0)}"
+        ]
+        for stage in stages:
+            stats = snap["stages"].get(stage)
+            if stats:
+                lines.append(f"{stage:<9} p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f}"
+                             f"  p99 {stats['p99_ms']:.1f} ms  n={stats['count']}")
+        return lines
+
+
+# Process-wide registry shared by the pipeline, scanner, API and catalog
+METRICS = Metrics()
@@ -0,0 +1,190 @@
+import os
+import queue
+import threading
+
+import cv2
+
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Scan pipeline — capture, decode and display run as separate stages.
+#
+#   capture thread ──► decode queue ──► N decode workers ──► result queue
+#         └──────────► display queue ──► Tk thread (imshow via root.after)
+#
+# Every queue is bounded and drops the OLDEST item when full, so a slow
+# decoder never backs up the camera and the preview always shows the
+# newest frame. RTSP buffers are drained continuously, so frames don't go
+# stale while a decode is in flight. An optional FrameGate drops
+# blurry/idle/empty frames before they ever reach the decode queue, and an
+# optional AdaptiveCapture (adaptive_capture.py) caps the decoded frame
+# rate and changes the capture resolution/fps between reads.
+# Stage timings (capture/gate/decode) and frame counters go to METRICS.
+# -----------------------------------------------------------------------
+
+
+def default_worker_count():
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
+
+
+def open_capture(source, frame_size=(1280, 720)):
+    if hasattr(source, "read"):
+        # Already a capture object (e.g. bench_scan.RecordedStream replaying a video)
+        return source
+    cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+    # Keep the driver-side buffer short so reads return fresh frames
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    return cap
+
+
+def apply_capture_settings(cap, frame_size, fps):
+    """Requests a new resolution/frame rate; returns the frame size the source actually gives."""
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, frame_size[0])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, frame_size[1])
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    return int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+
+def put_latest(q, item):
+    """Puts item on a bounded queue, discarding the oldest entry if it is full.
+    Returns True if something had to be dropped."""
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+class ScanPipeline:
+    def __init__(self, source, decode_fn, workers=None, frame_size=(1280, 720), gate=None, adaptive=None):
+        self.source = source
+        self.decode_fn = decode_fn
+        self.gate = gate
+        self.adaptive = adaptive
+        self.workers = workers or default_worker_count()
+        self.frame_size = frame_size
+
+        self.decode_queue = queue.Queue(maxsize=self.workers)
+        self.display_queue = queue.Queue(maxsize=1)
+        self.result_queue = queue.Queue(maxsize=self.workers)
+
+        self.connected = threading.Event()
+        self.error = None
+        self.stats = {"captured": 0, "throttled": 0, "gated": 0, "decoded": 0, "dropped": 0}
+
+        self._stop_event = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self.stats[key] += n
+        METRICS.count(f"frames_{key}", n)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        capture = threading.Thread(target=self._capture_loop, name="scan-capture", daemon=True)
+        self._threads.append(capture)
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._decode_loop, name=f"scan-decode-{i}", daemon=True)
+            )
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    # -------------------------------------------------------------------------
+    # Stages
+    # -------------------------------------------------------------------------
+
+    def _capture_loop(self):
+        cap = open_capture(self.source, self.frame_size)
+
+        if not cap.isOpened():
+            cap.release()
+            self.error = (
+                f"Could not open camera source:\n{self.source}\n\n"
+                "Check camera index or RTSP URL."
+            )
+            self._stop_event.set()
+            return
+
+        self.connected.set()
+        try:
+            while not self._stop_event.is_set():
+                with METRICS.timer("capture"):
+                    ret, frame = cap.read()
+                if not ret:
+                    self.error = "Failed to read frame. Stream disconnected."
+                    self._stop_event.set()
+                    break
+                self._count("captured")
+                put_latest(self.display_queue, frame)
+                if self.adaptive is not None:
+                    change = self.adaptive.pending_change()
+                    if change is not None:
+                        apply_capture_settings(cap, *change)
+                    if not self.adaptive.should_decode():
+                        self._count("throttled")
+                        continue
+                if self.gate is not None:
+                    with METRICS.timer("gate"):
+                        passed = self.gate.check(frame)
+                    if not passed:
+                        self._count("gated")
+                        continue
+                if put_latest(self.decode_queue, frame):
+                    self._count("dropped")
+        finally:
+            cap.release()
+
+    def _decode_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                frame = self.decode_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                with METRICS.timer("decode"):
+                    results = self.decode_fn(frame)
+            except Exception as e:
+                print(f"[Pipeline] Decode error: {e}")
+                continue
+            self._count("decoded")
+            if self.adaptive is not None:
+                self.adaptive.record(bool(results))
+            if results:
+                put_latest(self.result_queue, (frame, results))
+
+    # -------------------------------------------------------------------------
+    # Non-blocking accessors for the Tk thread
+    # -------------------------------------------------------------------------
+
+    def latest_frame(self):
+        try:
+            return self.display_queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def poll_result(self):
+        try:
+            return self.result_queue.get_nowait()
+        except queue.Empty:
+            return None
@@ -0,0 +1,197 @@
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from books_api import request_category_volumes
+
+# -----------------------------------------------------------------------
+# Recommendations — "You might also like" for a scanned book.
+#
+#   local   books of the same genre in our catalog, from a per-genre index
+#           built once per catalog version
+#   remote  Google Books subject: results, kept in an LRU with a TTL so a
+#           category seen a second ago costs no network call
+#
+# Both rank candidates the same way, vectorized in NumPy:
+#   score = AUTHOR_WEIGHT   * (shares an author)
+#         + PUBLISHER_WEIGHT * (same publisher)
+#         + cosine similarity of hashed TF-IDF title vectors
+# Ties keep catalog/API order.
+# -----------------------------------------------------------------------
+
+AUTHOR_WEIGHT = 1.0
+PUBLISHER_WEIGHT = 0.5
+# Hashed feature space for titles — keeps big genres at n x 512 floats
+TITLE_FEATURES = 512
+
+DEFAULT_CATEGORY_TTL = 6 * 3600
+DEFAULT_MAX_CATEGORIES = 512
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(title):
+    return _TOKEN_RE.findall(title.lower())
+
+
+def _feature(token):
+    return zlib.crc32(token.encode()) % TITLE_FEATURES
+
+
+def _split_authors(authors):
+    return {a.strip().lower() for a in (authors or "").split(",") if a.strip()}
+
+
+def _publisher_key(publisher):
+    # Catalog rows store "Publisher (date)"; compare on the name only
+    return (publisher or "").split(" (")[0].strip().lower()
+
+
+class CandidateIndex:
+    """Precomputed ranking data for one list of candidate books."""
+
+    def __init__(self, books):
+        self.titles = [book["title"] for book in books]
+        n = len(books)
+
+        counts = np.zeros((n, TITLE_FEATURES), dtype=np.float32)
+        for i, title in enumerate(self.titles):
+            for token in _tokens(title):
+                counts[i, _feature(token)] += 1
+        df = np.count_nonzero(counts, axis=0)
+        self.idf = (np.log((1 + n) / (1 + df)) + 1).astype(np.float32)
+        weighted = counts * self.idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        # Column-major: ranking only reads the few columns a query title hits
+        self.title_vectors = np.asfortranarray(weighted / np.where(norms == 0, 1, norms))
+
+        self.by_author = {}
+        self.by_publisher = {}
+        for i, book in enumerate(books):
+            for author in _split_authors(book.get("authors", book.get("author"))):
+                self.by_author.setdefault(author, []).append(i)
+            publisher = _publisher_key(book.get("publisher"))
+            if publisher:
+                self.by_publisher.setdefault(publisher, []).append(i)
+
+    def rank(self, book, limit=3):
+        if not self.titles:
+            return []
+        title = book.get("title") or ""
+
+        query = np.zeros(TITLE_FEATURES, dtype=np.float32)
+        for token in _tokens(title):
+            query[_feature(token)] += 1
+        query *= self.idf
+        norm = np.linalg.norm(query)
+        active = np.flatnonzero(query)
+        if norm:
+            scores = self.title_vectors[:, active] @ (query[active] / norm)
+        else:
+            scores = np.zeros(len(self.titles), np.float32)
+
+        for author in _split_authors(book.get("authors", book.get("author"))):
+            ids = self.by_author.get(author)
+            if ids:
+                scores[ids] += AUTHOR_WEIGHT
+        ids = self.by_publisher.get(_publisher_key(book.get("publisher")))
+        if ids:
+            scores[ids] += PUBLISHER_WEIGHT
+
+        picked = []
+        seen = {title}
+        for i in self._top(scores, limit):
+            candidate = self.titles[i]
+            if candidate not in seen:
+                seen.add(candidate)
+                picked.append(candidate)
+                if len(picked) >= limit:
+                    break
+        return picked
+
+    @staticmethod
+    def _top(scores, limit):
+        """Indices of the best scores, highest first, earliest first among ties.
+
+        Takes a few extra so duplicates/the current title can be skipped,
+        without sorting the whole genre.
+        """
+        k = min(len(scores), limit * 4 + 1)
+        if k == len(scores):
+            return np.argsort(-scores, kind="stable")
+        threshold = np.partition(scores, len(scores) - k)[len(scores) - k]
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:max(0, k - len(above))]
+        candidates = np.concatenate([above, tied])
+        order = np.lexsort((candidates, -scores[candidates]))
+        return candidates[order]
+
+
+class Recommender:
+    def __init__(self, catalog, category_ttl=DEFAULT_CATEGORY_TTL,
+                 max_categories=DEFAULT_MAX_CATEGORIES, fetch_volumes=request_category_volumes):
+        self.catalog = catalog
+        self.category_ttl = category_ttl
+        self.max_categories = max_categories
+        self.fetch_volumes = fetch_volumes
+
+        self._lock = threading.Lock()
+        self._genre_version = None
+        self._genres = {}                 # genre -> CandidateIndex
+        self._categories = OrderedDict()  # category -> (CandidateIndex, fetched_at)
+
+    # -------------------------------------------------------------------------
+    # Local catalog
+    # -------------------------------------------------------------------------
+
+    def _genre_index(self, genre):
+        self.catalog.refresh()
+        with self._lock:
+            if self._genre_version != self.catalog.version:
+                self._genres = {}
+                self._genre_version = self.catalog.version
+            index = self._genres.get(genre)
+        if index is None:
+            index = CandidateIndex(self.catalog.books_in_genre(genre))
+            with self._lock:
+                if self._genre_version == self.catalog.version:
+                    self._genres[genre] = index
+        return index
+
+    def local(self, genre, book, limit=3):
+        return self._genre_index(genre).rank(book, limit)
+
+    # -------------------------------------------------------------------------
+    # Google Books categories
+    # -------------------------------------------------------------------------
+
+    def cached_remote(self, category, book, limit=3):
+        """Ranked recommendations if the category is cached and fresh, else None. No I/O."""
+        with self._lock:
+            entry = self._categories.get(category)
+            if entry is None or time.time() - entry[1] >= self.category_ttl:
+                return None
+            self._categories.move_to_end(category)
+            index = entry[0]
+        return index.rank(book, limit)
+
+    def remote(self, category, book, limit=3):
+        cached = self.cached_remote(category, book, limit)
+        if cached is not None:
+            return cached
+        try:
+            volumes = self.fetch_volumes(category)
+        except Exception as e:
+            print(f"[Recommendation API Error] {e}")
+            return []
+        index = CandidateIndex(volumes)
+        with self._lock:
+            self._categories[category] = (index, time.time())
+            self._categories.move_to_end(category)
+            while len(self._categories) > self.max_categories:
+                self._categories.popitem(last=False)
+        return index.rank(book, limit)
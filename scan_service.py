@@ -0,0 +1,496 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from backends import make_decoder, scanner_name
+from books_api import fetch_book_info
+from catalog import book_info_to_row
+from isbn import canonical_code, normalize_isbn
+from metadata_cache import MetadataCache
+from metrics import METRICS
+from pipeline import default_worker_count
+from scanner import VariantCascade
+from storage import open_catalog
+
+# -----------------------------------------------------------------------
+# Scan service — one local process that serves many desks: shared decoder
+# pool, shared metadata cache, one writer to the catalog.
+#
+#   python scan_service.py --catalog library.sqlite3 --port 8790
+#
+# Desks talk to it over HTTP (JSON) or a WebSocket on /ws:
+#   POST /scan         {"barcodes": [...], "save": true}  -> book records
+#   POST /frame        JPEG/PNG body, ?desk=ID&save=1      -> decoded + records
+#   GET  /lookup/ISBN                                      -> {"book": ...}
+#   GET  /books[?offset=&limit=|genre=|author=], /books/BARCODE,
+#        /books/count; POST /books {"rows": [...]}         (catalog API)
+#   GET  /health                                           -> stats
+# On /ws, send the /scan JSON as a text message or a frame as a binary
+# message; each is answered with one JSON text message.
+#
+# Lookups for the same ISBN that overlap in time share one API call.
+# Catalog writes are queued and flushed by a single writer every
+# WRITE_BATCH_DELAY seconds (or WRITE_BATCH_SIZE rows), in one
+# transaction / file append. Catalog reads run on a worker thread, never
+# on the event loop. ISBN/EAN codes are cleaned (hyphens, spaces) before
+# use; any other code is kept exactly as scanned. Set SCAN_SERVICE_URL in main.py (or pass the
+# URL as --catalog) to use the Tk app as a thin client.
+# -----------------------------------------------------------------------
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8790
+WRITE_BATCH_SIZE = 200
+WRITE_BATCH_DELAY = 0.05   # seconds the writer waits for more rows
+LOOKUP_WORKERS = 8
+MAX_BODY_BYTES = 16 * 1024 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ScanService:
+    def __init__(self, catalog, cache=None, backend=None, decode_workers=None,
+                 batch_size=WRITE_BATCH_SIZE, batch_delay=WRITE_BATCH_DELAY):
+        self.catalog = catalog
+        self.cache = cache
+        self.backend = backend
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.started = time.time()
+        self.stats = {"lookups": 0, "coalesced": 0, "frames": 0, "writes": 0, "batches": 0, "clients": 0}
+
+        self._lookups = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="service-lookup")
+        self._decoders = ThreadPoolExecutor(
+            max_workers=decode_workers or default_worker_count(), thread_name_prefix="service-decode"
+        )
+        # One thread owns every catalog write
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="service-writer")
+        # Per-desk cascade and decoder, like the station's per-camera ones
+        self._desks = {}
+        self._desks_lock = threading.Lock()
+        self._inflight = {}   # normalized ISBN -> future of the running lookup
+        self._write_queue = None
+        self._writer_task = None
+        self._server = None
+
+    # -------------------------------------------------------------------------
+    # Lookups, decoding and batched writes
+    # -------------------------------------------------------------------------
+
+    async def lookup(self, code):
+        """book_info or None. Concurrent lookups of the same ISBN share one fetch."""
+        key = normalize_isbn(code)
+        future = self._inflight.get(key)
+        if future is None:
+            self.stats["lookups"] += 1
+            METRICS.count("service_lookups")
+            future = asyncio.get_running_loop().run_in_executor(
+                self._lookups, fetch_book_info, code, self.cache
+            )
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+            METRICS.count("service_lookups_coalesced")
+        return await asyncio.shield(future)
+
+    async def write(self, row):
+        """Queues a catalog row for the next batch. Returns True if it was new."""
+        done = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((row, done))
+        return await done
+
+    async def _write_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._write_queue.get()]
+            deadline = loop.time() + self.batch_delay
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._write_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                saved = await loop.run_in_executor(self._writer, self._write_batch, [row for row, _ in batch])
+            except Exception as e:
+                print(f"[Service] Catalog write failed: {e}")
+                for _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+                continue
+            else:
+                self.stats["batches"] += 1
+                self.stats["writes"] += sum(saved)
+                for (_, done), ok in zip(batch, saved):
+                    if not done.done():
+                        done.set_result(ok)
+            finally:
+                # stop() waits on join() until every queued row has been handled
+                for _ in batch:
+                    self._write_queue.task_done()
+
+    def _write_batch(self, rows):
+        """Runs on the writer thread. Returns one saved flag per row."""
+        self.catalog.refresh()
+        saved = []
+        fresh = []
+        seen = set()
+        for row in rows:
+            barcode = str(row.get('barcode') or '')
+            ok = bool(barcode) and barcode not in seen and barcode not in self.catalog
+            seen.add(barcode)
+            saved.append(ok)
+            if ok:
+                fresh.append(row)
+        if fresh:
+            self.catalog.add_many(fresh)
+        return saved
+
+    async def _read_catalog(self, fn, *args):
+        """Runs a (possibly disk- or network-bound) catalog read off the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(self._lookups, fn, *args)
+
+    async def scan(self, code, save=True):
+        """Book record for one scanned barcode; saves new books to the catalog."""
+        code = canonical_code(code)
+        in_catalog = await self._read_catalog(self.catalog.__contains__, code)
+        info = await self.lookup(code)
+        saved = False
+        if info and save and not in_catalog:
+            saved = await self.write(book_info_to_row(code, info))
+        record = {"barcode": code, "book": info, "in_catalog": in_catalog, "saved": saved}
+        if info is None and in_catalog:
+            record["row"] = await self._read_catalog(self.catalog.get, code)
+        return record
+
+    async def scan_many(self, codes, save=True):
+        return await asyncio.gather(*(self.scan(code, save=save) for code in codes))
+
+    def _desk(self, desk):
+        with self._desks_lock:
+            entry = self._desks.get(desk)
+            if entry is None:
+                entry = self._desks[desk] = (VariantCascade(), make_decoder(self.backend, label=f"desk {desk}"))
+            return entry
+
+    def _decode_image(self, data, desk):
+        """Runs on a decode worker. Returns the distinct barcodes in an encoded image."""
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("body is not a decodable image")
+        cascade, decoder = self._desk(desk)
+        results, _ = cascade.decode(frame, decoder=decoder)
+        return list(dict.fromkeys(r["data"] for r in results))
+
+    async def scan_frame(self, data, desk="default", save=True):
+        self.stats["frames"] += 1
+        with METRICS.timer("service_frame"):
+            codes = await asyncio.get_running_loop().run_in_executor(
+                self._decoders, self._decode_image, data, desk
+            )
+        return {"barcodes": codes, "results": await self.scan_many(codes, save=save)}
+
+    def health(self):
+        return {
+            "uptime": round(time.time() - self.started, 1),
+            "backend": self.backend or scanner_name(),
+            "books": self.catalog.count(),
+            "inflight_lookups": len(self._inflight),
+            "queued_writes": self._write_queue.qsize() if self._write_queue else 0,
+            **self.stats,
+        }
+
+    # -------------------------------------------------------------------------
+    # HTTP / WebSocket
+    # -------------------------------------------------------------------------
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._write_loop())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        # Every queued row, including a batch being written right now, reaches the
+        # catalog before the writer stops: those writes were already acknowledged
+        if self._write_queue is not None:
+            await self._write_queue.join()
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+        for pool in (self._lookups, self._decoders, self._writer):
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def _handle_connection(self, reader, writer):
+        self.stats["clients"] += 1
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                path = urllib.parse.urlsplit(target).path
+                if path == "/ws" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._serve_websocket(reader, writer, headers)
+                    break
+                try:
+                    status, payload = await self._route(method, target, body)
+                except ValueError as e:
+                    status, payload = 400, {"error": str(e)}
+                except Exception as e:
+                    print(f"[Service] {method} {target} failed: {e}")
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                _write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, target, body):
+        parts = urllib.parse.urlsplit(target)
+        path = parts.path.rstrip("/")
+        query = {k: v[-1] for k, v in urllib.parse.parse_qs(parts.query).items()}
+
+        if method == "GET":
+            if path == "/health":
+                return 200, await self._read_catalog(self.health)
+            if path.startswith("/lookup/"):
+                code = canonical_code(urllib.parse.unquote(path[len("/lookup/"):]))
+                return 200, {"barcode": code, "book": await self.lookup(code)}
+            if path == "/books/count":
+                return 200, await self._read_catalog(self._count)
+            if path.startswith("/books/"):
+                row = await self._read_catalog(self.catalog.get, urllib.parse.unquote(path[len("/books/"):]))
+                return (200, row) if row is not None else (404, {"error": "not in catalog"})
+            if path == "/books":
+                # Full listings can be large; keep them off the event loop
+                return 200, await self._read_catalog(self._books, query)
+        elif method == "POST":
+            if path == "/scan":
+                request = _json_body(body)
+                codes = request.get("barcodes") or [request.get("barcode")]
+                return 200, {"results": await self.scan_many([c for c in codes if c],
+                                                             save=request.get("save", True))}
+            if path == "/frame":
+                return 200, await self.scan_frame(body, desk=query.get("desk", "default"),
+                                                  save=query.get("save", "1") != "0")
+            if path == "/books":
+                rows = _json_body(body).get("rows", [])
+                saved = await asyncio.gather(*(self.write(row) for row in rows))
+                return 200, {"written": sum(saved)}
+        else:
+            return 405, {"error": f"method {method} not allowed"}
+        return 404, {"error": f"no route for {path}"}
+
+    def _count(self):
+        self.catalog.refresh()
+        return {"count": self.catalog.count(), "version": self.catalog.version}
+
+    def _books(self, query):
+        self.catalog.refresh()
+        if "genre" in query:
+            rows = self.catalog.books_in_genre(query["genre"])
+        elif "author" in query:
+            rows = self.catalog.books_by_author(query["author"])
+        elif "limit" in query:
+            rows = self.catalog.page(int(query.get("offset", 0)), int(query["limit"]))
+        else:
+            rows = self.catalog.rows()
+        return {"rows": rows, "count": self.catalog.count(), "version": self.catalog.version}
+
+    async def _serve_websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(
+            "HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+        while True:
+            opcode, data = await _read_ws_message(reader)
+            if opcode == 0x8:   # close
+                writer.write(_ws_frame(0x8, data[:2]))
+                await writer.drain()
+                return
+            if opcode == 0x9:   # ping
+                writer.write(_ws_frame(0xA, data))
+                await writer.drain()
+                continue
+            try:
+                if opcode == 0x2:
+                    reply = await self.scan_frame(data)
+                else:
+                    request = _json_body(data)
+                    if "frame" in request:   # base64 image in a text message
+                        reply = await self.scan_frame(base64.b64decode(request["frame"]),
+                                                      desk=request.get("desk", "default"),
+                                                      save=request.get("save", True))
+                    else:
+                        codes = request.get("barcodes") or [request.get("barcode")]
+                        reply = {"results": await self.scan_many([c for c in codes if c],
+                                                                 save=request.get("save", True))}
+                    if "id" in request:
+                        reply["id"] = request["id"]
+            except ValueError as e:
+                reply = {"error": str(e)}
+            writer.write(_ws_frame(0x1, json.dumps(reply).encode()))
+            await writer.drain()
+
+
+# -----------------------------------------------------------------------
+# Minimal HTTP/1.1 and WebSocket (RFC 6455) framing on asyncio streams
+# -----------------------------------------------------------------------
+
+def _json_body(body):
+    try:
+        request = json.loads(body or b"{}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(request, dict):
+        raise ValueError("expected a JSON object")
+    return request
+
+
+async def _read_request(reader):
+    """Returns (method, target, headers, body), or None when the client hung up."""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ConnectionError("malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY_BYTES:
+        raise ConnectionError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+
+
+async def _read_ws_message(reader):
+    """Reads one (possibly fragmented) message. Returns (opcode, payload)."""
+    message_opcode, chunks = None, []
+    while True:
+        head = await reader.readexactly(2)
+        fin, opcode = head[0] & 0x80, head[0] & 0x0F
+        masked, length = head[1] & 0x80, head[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", await reader.readexactly(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", await reader.readexactly(8))[0]
+        if length > MAX_BODY_BYTES:
+            raise ConnectionError("websocket message too large")
+        mask = await reader.readexactly(4) if masked else None
+        data = await reader.readexactly(length)
+        if mask:
+            data = (np.frombuffer(data, np.uint8) ^ np.resize(np.frombuffer(mask, np.uint8), length)).tobytes()
+        if opcode >= 0x8:   # control frames are never fragmented
+            return opcode, data
+        if opcode != 0x0:
+            message_opcode = opcode
+        chunks.append(data)
+        if fin:
+            return message_opcode, b"".join(chunks)
+
+
+def _ws_frame(opcode, data):
+    length = len(data)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shared scan service for several desks.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--catalog", default="books.csv", help="catalog to serve (.csv or .sqlite3)")
+    parser.add_argument("--cache", default="isbn_cache.sqlite3", help="shared ISBN metadata cache")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="serve a CSV catalog from its memory-mapped snapshot (see snapshot.py)")
+    parser.add_argument("--backend", default=None,
+                        help="decoder: zxingcpp, pyzbar, opencv, race or auto (default: first installed)")
+    parser.add_argument("--workers", type=int, default=None, help="frame decode threads")
+    parser.add_argument("--batch-size", type=int, default=WRITE_BATCH_SIZE, help="max rows per catalog write")
+    parser.add_argument("--batch-delay", type=float, default=WRITE_BATCH_DELAY,
+                        help="seconds to wait for more rows before writing")
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics and /metrics.json on this local port")
+    args = parser.parse_args(argv)
+
+    catalog = open_catalog(args.catalog, snapshot=args.snapshot)
+    cache = MetadataCache(args.cache)
+    service = ScanService(catalog, cache, backend=args.backend,
+                          decode_workers=args.workers, batch_size=args.batch_size,
+                          batch_delay=args.batch_delay)
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+
+    async def run():
+        await service.start(args.host, args.port)
+        print(f"[Service] Listening on http://{args.host}:{service.port} (WebSocket: /ws). Ctrl+C to stop.")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        catalog.close()   # e.g. folds the snapshot tail, checkpoints SQLite
+        cache.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,272 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from backends import get_backend, probe_backends, scanner_name
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Scanner library — zxing-cpp works on Windows without extra DLLs
+# Install: pip install zxing-cpp
+# Fallback: pyzbar (may need extra DLLs on Windows), then OpenCV's detector
+# Detection is deferred to backends.probe_backends().
+# -----------------------------------------------------------------------
+
+
+def __getattr__(name):
+    # AVAILABLE_BACKENDS / SCANNER_AVAILABLE / SCANNER_NAME probe on first access
+    if name == "AVAILABLE_BACKENDS":
+        return probe_backends()
+    if name == "SCANNER_AVAILABLE":
+        return bool(probe_backends())
+    if name == "SCANNER_NAME":
+        return scanner_name()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def decode_barcodes(image_gray, backend=None):
+    """Returns [{"data", "rect"}] with rect = (x, y, w, h) in image coordinates."""
+    decoder = get_backend(backend or scanner_name())
+    if decoder is None:
+        return []
+    return decoder.decode(image_gray)
+
+
+# -----------------------------------------------------------------------
+# Guide box — the yellow rectangle the user is asked to hold the barcode in
+# -----------------------------------------------------------------------
+
+def guide_box(shape):
+    """Returns (x1, y1, x2, y2) of the guide box for a frame of the given shape."""
+    h_f, w_f = shape[:2]
+    cx, cy = w_f // 2, h_f // 2
+    bw, bh = int(w_f * 0.6), int(h_f * 0.35)
+    return cx - bw // 2, cy - bh // 2, cx + bw // 2, cy + bh // 2
+
+
+def draw_guide_box(frame):
+    x1, y1, x2, y2 = guide_box(frame.shape)
+    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 255), 2)
+    cv2.putText(frame,
+                "Hold barcode STEADY inside the box | 'q' quit, 'm' metrics",
+                (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+
+def draw_barcode_boxes(frame, boxes, color=(0, 255, 0)):
+    """Outlines each (data, rect) on the frame and labels it with its data."""
+    for data, rect in boxes:
+        if not rect:
+            continue
+        x, y, w, h = rect
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, 3)
+        cv2.putText(frame, data, (x, max(15, y - 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
+
+
+def draw_text_overlay(frame, lines, origin=(10, 50)):
+    """Draws lines of small text on a dark panel (e.g. live metrics)."""
+    if not lines:
+        return
+    x, y = origin
+    line_height = 18
+    width = max(cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, 0.45, 1)[0][0] for line in lines)
+    cv2.rectangle(frame, (x - 5, y - 5), (x + width + 5, y + line_height * len(lines) + 3), (0, 0, 0), -1)
+    for i, line in enumerate(lines):
+        cv2.putText(frame, line, (x, y + line_height * (i + 1) - 4),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1)
+
+
+# -----------------------------------------------------------------------
+# Preprocessing cascade — variants are built lazily, cheapest first,
+# and decoding stops at the first one that yields a barcode. The guide
+# box ROI (~21% of the pixels) is tried before the full frame, and the
+# 2x upscale of the full frame is only reached when everything else
+# failed. Variants that keep succeeding are promoted to the front.
+#
+# Pyramid mode (VariantCascade(pyramid=True)) puts half-resolution
+# levels of the ROI and the full frame in front of the cascade — a quarter
+# of the pixels per decode. Full resolution and the 2x upscales are only
+# reached when the half levels fail, or skipped to directly while the last
+# barcode read was narrower than PYRAMID_MIN_WIDTH (too few pixels per
+# bar at half size).
+# -----------------------------------------------------------------------
+
+SHARPEN_KERNEL = np.array([[0, -1, 0], [-1, 5, -1], [0, -1, 0]])
+
+
+def _plain(gray):
+    return gray
+
+
+def _equalized(gray):
+    return cv2.equalizeHist(gray)
+
+
+def _sharpened(gray):
+    return cv2.filter2D(gray, -1, SHARPEN_KERNEL)
+
+
+def _upscaled(gray):
+    return cv2.resize(gray, (gray.shape[1] * 2, gray.shape[0] * 2),
+                      interpolation=cv2.INTER_LINEAR)
+
+
+def _downscaled(gray):
+    return cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2),
+                      interpolation=cv2.INTER_AREA)
+
+
+# (name, region, transform, scale) — listed in order of increasing cost
+CASCADE_VARIANTS = [
+    ("roi_gray",       "roi",  _plain,     1),
+    ("roi_equalized",  "roi",  _equalized, 1),
+    ("roi_sharpened",  "roi",  _sharpened, 1),
+    ("roi_upscaled",   "roi",  _upscaled,  2),
+    ("full_gray",      "full", _plain,     1),
+    ("full_equalized", "full", _equalized, 1),
+    ("full_sharpened", "full", _sharpened, 1),
+    ("full_upscaled",  "full", _upscaled,  2),
+]
+
+# Pyramid mode: the half-resolution levels come first
+PYRAMID_VARIANTS = [
+    ("roi_half",  "roi",  _downscaled, 0.5),
+    ("full_half", "full", _downscaled, 0.5),
+] + CASCADE_VARIANTS
+
+# Barcode width (frame pixels) below which the half levels are skipped — an
+# EAN-13 (95 modules) needs ~2.5 px per module to read reliably at half size
+PYRAMID_MIN_WIDTH = 475
+
+# Older hits fade out so the order follows the current lighting/camera
+HIT_DECAY = 0.98
+
+# Bulk (cart) mode: every one of these runs on the full frame and the hits are
+# merged, since a single variant rarely reads all 20-40 spines at once
+BULK_VARIANTS = ("full_gray", "full_equalized")
+
+# Tried on the tracked ROI (see tracking.RoiTracker) instead of the cascade
+TRACK_VARIANTS = [
+    ("track_gray",      _plain,     1),
+    ("track_equalized", _equalized, 1),
+]
+TRACK_PYRAMID_VARIANTS = [("track_half", _downscaled, 0.5)] + TRACK_VARIANTS
+
+
+class VariantCascade:
+    def __init__(self, variants=None, pyramid=False):
+        self.pyramid = pyramid
+        self._variants = {v[0]: v for v in (variants or (PYRAMID_VARIANTS if pyramid else CASCADE_VARIANTS))}
+        self._base_order = list(self._variants)
+        self._order = list(self._base_order)
+        self.hits = {name: 0.0 for name in self._base_order}
+        self.last_width = None  # width of the last barcode read, in frame pixels
+        self._lock = threading.Lock()
+
+    def order(self):
+        with self._lock:
+            return list(self._order)
+
+    def record_hit(self, name):
+        with self._lock:
+            for key in self.hits:
+                self.hits[key] *= HIT_DECAY
+            self.hits[name] += 1.0
+            # Stable sort: ties keep the cheapest-first base order
+            self._order = sorted(self._base_order, key=lambda n: -self.hits[n])
+
+    def _use_half(self):
+        return self.pyramid and (self.last_width is None or self.last_width >= PYRAMID_MIN_WIDTH)
+
+    def _remember_width(self, results):
+        widths = [max(r["rect"][2], r["rect"][3]) for r in results if r["rect"]]
+        if widths:
+            self.last_width = max(widths)
+
+    def variants(self, frame):
+        """Yields (name, image, (offset_x, offset_y), scale) one variant at a time."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        x1, y1, x2, y2 = guide_box(gray.shape)
+        regions = {
+            "roi":  (gray[y1:y2, x1:x2], (x1, y1)),
+            "full": (gray, (0, 0)),
+        }
+        skip_half = not self._use_half()
+        for name in self.order():
+            _, region, transform, scale = self._variants[name]
+            if skip_half and scale < 1:
+                continue
+            image, offset = regions[region]
+            yield name, transform(image), offset, scale
+
+    def tracked_variants(self, frame, roi):
+        """Like variants(), but only for the tracked ROI (x1, y1, x2, y2)."""
+        x1, y1, x2, y2 = roi
+        crop = frame[y1:y2, x1:x2]
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+        for name, transform, scale in (TRACK_PYRAMID_VARIANTS if self._use_half() else TRACK_VARIANTS):
+            yield name, transform(gray), (x1, y1), scale
+
+    def _first_hit(self, variants, decoder):
+        start = time.perf_counter()
+        tried_half = False
+        for name, image, (ox, oy), scale in variants:
+            results = decoder(image)
+            # Preprocessing for this variant happens inside the generator step
+            now = time.perf_counter()
+            METRICS.observe(f"variant_{name}", now - start)
+            start = now
+            if results:
+                for result in results:
+                    if result["rect"]:
+                        x, y, w, h = result["rect"]
+                        result["rect"] = (int(x / scale) + ox, int(y / scale) + oy,
+                                          int(w / scale), int(h / scale))
+                if tried_half and scale >= 1:
+                    METRICS.count("pyramid_escalated")
+                return results, name
+            tried_half = tried_half or scale < 1
+        return [], None
+
+    def decode_all(self, frame, decoder=decode_barcodes, names=BULK_VARIANTS):
+        """Runs every named full-frame variant and returns the distinct barcodes found."""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        merged = {}
+        for name in names:
+            start = time.perf_counter()
+            _, _, transform, scale = self._variants[name]
+            for result in decoder(transform(gray)):
+                if result["data"] in merged:
+                    continue
+                if result["rect"]:
+                    x, y, w, h = result["rect"]
+                    result["rect"] = (int(x / scale), int(y / scale), int(w / scale), int(h / scale))
+                merged[result["data"]] = result
+            METRICS.observe(f"variant_{name}", time.perf_counter() - start)
+        return list(merged.values())
+
+    def decode(self, frame, decoder=decode_barcodes, tracker=None):
+        """Returns (results, variant_name); rects are mapped back to frame coordinates.
+
+        With a tracker that holds a track, only the padded ROI around the last
+        hit is decoded; the full cascade runs again once the track is lost.
+        """
+        roi = tracker.roi(frame.shape) if tracker is not None else None
+        if roi is not None:
+            results, name = self._first_hit(self.tracked_variants(frame, roi), decoder)
+            if results:
+                self._remember_width(results)
+                tracker.update(results)
+            else:
+                tracker.miss()
+            return results, name
+
+        results, name = self._first_hit(self.variants(frame), decoder)
+        if results:
+            self.record_hit(name)
+            self._remember_width(results)
+            if tracker is not None:
+                tracker.update(results)
+        return results, name
@@ -0,0 +1,152 @@
+import threading
+import urllib.error
+import urllib.parse
+
+from http_client import HttpClient
+
+# -----------------------------------------------------------------------
+# Client side of scan_service.py — lets a desk act as a thin client.
+#
+# ServiceClient wraps the lookup/scan endpoints. RemoteCatalog exposes
+# the service's catalog through the same methods as Catalog and
+# SqliteCatalog, so open_catalog("http://127.0.0.1:8790") works anywhere
+# a catalog file path does. Writes go through the service's single
+# batched writer. Nothing is sent until the first call, so a desk starts
+# even while the service is down; calls then raise ServiceUnavailable.
+#
+# Kept free of OpenCV/NumPy imports so the Tk app can load it at startup.
+# -----------------------------------------------------------------------
+
+SERVICE_TIMEOUT = 10
+
+
+class ServiceUnavailable(ConnectionError):
+    """The scan service could not be reached (not started, wrong URL, network down)."""
+
+
+def is_service_url(path):
+    return str(path).startswith(("http://", "https://"))
+
+
+class ServiceClient:
+    def __init__(self, base_url, timeout=SERVICE_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.http = HttpClient(timeout=timeout)
+
+    def _url(self, path, **query):
+        query = {k: v for k, v in query.items() if v is not None}
+        return self.base_url + path + ("?" + urllib.parse.urlencode(query) if query else "")
+
+    def _call(self, fn, *args):
+        try:
+            return fn(*args)
+        except urllib.error.HTTPError:
+            raise
+        except urllib.error.URLError as e:
+            raise ServiceUnavailable(f"scan service at {self.base_url} is not reachable: {e.reason}") from e
+
+    def get(self, path, **query):
+        return self._call(self.http.get_json, self._url(path, **query))
+
+    def post(self, path, payload):
+        return self._call(self.http.post_json, self._url(path), payload)
+
+    def lookup(self, isbn):
+        """book_info or None, from the service's shared cache / coalesced API calls."""
+        return self.get(f"/lookup/{urllib.parse.quote(str(isbn).strip())}")["book"]
+
+    def scan(self, barcodes, save=True):
+        """[{"barcode", "book", "in_catalog", "saved"}] for each barcode."""
+        return self.post("/scan", {"barcodes": list(barcodes), "save": save})["results"]
+
+    def scan_frame(self, image_bytes, desk="default", save=True, content_type="image/jpeg"):
+        url = self._url("/frame", desk=desk, save="1" if save else "0")
+        return self._call(self.http.post, url, image_bytes, content_type).json()
+
+    def ingest(self, codes):
+        """Same summary shape as ingest.ingest(), resolved and written by the service."""
+        results = self.scan(codes, save=True)
+        return {
+            "requested": len(codes),
+            "skipped_existing": sum(1 for r in results if r["in_catalog"]),
+            "found": sum(1 for r in results if r["book"] and not r["in_catalog"]),
+            "not_found": sum(1 for r in results if not r["book"] and not r["in_catalog"]),
+            "failed": 0,
+            "written": sum(1 for r in results if r["saved"]),
+            "failures": {},
+        }
+
+    def health(self):
+        return self.get("/health")
+
+
+class RemoteCatalog:
+    """Catalog interface backed by a running scan service."""
+
+    # The service never writes a second row for a barcode
+    allows_duplicates = False
+
+    def __init__(self, base_url, client=None):
+        self.path = base_url
+        self.client = client or ServiceClient(base_url)
+        self.version = 0
+        self._count = None
+        self._lock = threading.Lock()
+        # No request here: the app must start even if the service is down
+        print(f"[Catalog] Using scan service at '{base_url}'")
+
+    def _remember(self, response):
+        with self._lock:
+            self._count = response["count"]
+            self.version = response["version"]
+
+    def refresh(self):
+        self._remember(self.client.get("/books/count"))
+
+    def close(self):
+        self.client.http.close()
+
+    def get(self, barcode):
+        try:
+            return self.client.get(f"/books/{urllib.parse.quote(str(barcode))}")
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def __contains__(self, barcode):
+        return self.get(barcode) is not None
+
+    def count(self):
+        self.refresh()
+        return self._count
+
+    def _rows(self, **query):
+        response = self.client.get("/books", **query)
+        self._remember(response)
+        return response["rows"]
+
+    def rows(self):
+        return self._rows()
+
+    def page(self, offset, limit):
+        return self._rows(offset=offset, limit=limit)
+
+    def titles(self):
+        return [row['title'] for row in self.rows()]
+
+    def books_in_genre(self, genre):
+        return self._rows(genre=genre)
+
+    def books_by_author(self, author):
+        return self._rows(author=author)
+
+    def add(self, row, allow_duplicate=False):
+        """Returns False if the barcode already exists (the service never writes duplicates)."""
+        return self.add_many([row]) == 1
+
+    def add_many(self, rows, allow_duplicate=False):
+        written = self.client.post("/books", {"rows": list(rows)})["written"]
+        if written:
+            self.refresh()
+        return written
@@ -0,0 +1,724 @@
+import argparse
+import csv
+import io
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_left
+
+from catalog import FIELDNAMES, Catalog, _fsync_dir, _missing_final_newline
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Catalog snapshot — books.csv compiled into a binary file that is
+# memory-mapped instead of parsed, for catalogs with millions of rows.
+#
+#   python snapshot.py build books.csv      # writes books.csv.snap
+#   python snapshot.py info books.csv.snap
+#
+# Layout (little-endian, after a 64-byte header):
+#   string offsets  u64[n_strings + 1]   every distinct field value once
+#   columns         i32[5][n_rows]       string ids, FIELDNAMES order
+#   barcode hashes  u64[n_rows]          FNV-1a, sorted
+#   hash rows       i32[n_rows]          row id of each sorted hash
+#   string blob     UTF-8
+#
+# A barcode lookup is a binary search over the mapped hashes plus one
+# string compare, so opening the catalog, count() and get() cost the same
+# for 1,000 or 10,000,000 books, and only the pages touched are read.
+#
+# The header records how many CSV bytes the snapshot covers, with CRCs of
+# the first and last 4 KiB of that range. Rows appended to the CSV after
+# it (by this or any other desk) are parsed into a small in-memory tail.
+# Once the tail is large, or on close, the snapshot is rebuilt
+# incrementally: only the new rows are parsed and the old columns are
+# copied over. If the covered range changed (compaction, hand edits),
+# the snapshot is rebuilt from scratch.
+#
+# Building needs NumPy and parses the CSV; mapping a current snapshot
+# needs neither. BackgroundSnapshotCatalog (used by the Tk app) serves the
+# CSV through a plain Catalog while a missing or stale snapshot is built
+# on another thread, then switches over.
+# -----------------------------------------------------------------------
+
+SNAPSHOT_SUFFIX = ".snap"
+MAGIC = b"BKSNAP01"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sIIQQQII")   # magic, format, reserved, rows, strings, covered, head/tail CRC
+HEADER_SIZE = 64
+CHECK_BYTES = 4096
+# Tail rows kept in memory before the snapshot is rebuilt on refresh
+REBUILD_TAIL_ROWS = 50_000
+
+FNV_OFFSET = 0xCBF29CE484222325
+FNV_PRIME = 0x100000001B3
+_MASK64 = (1 << 64) - 1
+
+# Columns with few distinct values; their strings are reused across incremental rebuilds
+_LOW_CARDINALITY = ('genre', 'author', 'publisher')
+
+
+def snapshot_path_for(csv_path):
+    return csv_path + SNAPSHOT_SUFFIX
+
+
+def barcode_hash(barcode):
+    """64-bit FNV-1a of the UTF-8 barcode; matches _hash_column."""
+    h = FNV_OFFSET
+    for byte in barcode.encode('utf-8'):
+        h = ((h ^ byte) * FNV_PRIME) & _MASK64
+    return h
+
+
+def _hash_column(barcodes, np):
+    """Vectorized barcode_hash over a list of strings."""
+    encoded = np.array([b.encode('utf-8') for b in barcodes], dtype=bytes)
+    width = encoded.dtype.itemsize
+    hashes = np.full(len(barcodes), FNV_OFFSET, dtype=np.uint64)
+    if not len(barcodes) or not width:
+        return hashes
+    data = encoded.view(np.uint8).reshape(len(barcodes), width)
+    prime = np.uint64(FNV_PRIME)
+    for j in range(width):
+        byte = data[:, j]
+        # Shorter barcodes are NUL-padded; padding must not change the hash
+        hashes = np.where(byte != 0, (hashes ^ byte.astype(np.uint64)) * prime, hashes)
+    return hashes
+
+
+def _crc(f, start, end):
+    f.seek(start)
+    return zlib.crc32(f.read(end - start))
+
+
+def _region_crcs(f, covered):
+    return _crc(f, 0, min(CHECK_BYTES, covered)), _crc(f, max(0, covered - CHECK_BYTES), covered)
+
+
+def read_tail(csv_path, start):
+    """Parses complete CSV lines from byte `start` on. Returns (rows as FIELDNAMES tuples, end offset).
+
+    Starting at 0 (or inside the header) skips the header. A final line
+    without a newline is kept if it has every field (same rule as
+    Catalog._is_torn); with fields missing it is a torn or in-progress
+    write and is left out.
+    """
+    try:
+        f = open(csv_path, mode='rb')
+    except FileNotFoundError:
+        return [], 0
+    with f:
+        header_line = f.readline()
+        header_end = f.tell()
+        if not header_line.endswith(b"\n"):
+            return [], 0
+        start = max(start, header_end)
+        f.seek(start)
+        data = f.read()
+    cut = data.rfind(b"\n") + 1
+    fieldnames = [name.strip() for name in next(csv.reader([header_line.decode('utf-8-sig')]))]
+    if data[cut:].strip() and not _is_torn_line(data[cut:], len(fieldnames)):
+        cut = len(data)
+    positions = [fieldnames.index(key) if key in fieldnames else None for key in FIELDNAMES]
+
+    rows = []
+    for record in csv.reader(io.StringIO(data[:cut].decode('utf-8'), newline='')):
+        if record:
+            rows.append(tuple(record[i] if i is not None and i < len(record) else '' for i in positions))
+    return rows, start + cut
+
+
+def _is_torn_line(line, n_fields):
+    try:
+        record = next(csv.reader([line.decode('utf-8')]), [])
+    except (UnicodeDecodeError, csv.Error):
+        return True
+    return len(record) < n_fields
+
+
+class Snapshot:
+    """Read-only view of a snapshot file."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, mode='rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, fmt, _, self.n_rows, self.n_strings, self.covered, self.head_crc, self.tail_crc = \
+            HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"'{path}' is not a catalog snapshot (version {FORMAT_VERSION})")
+
+        view = memoryview(self._mm)
+        self._views = [view]
+        offset = HEADER_SIZE
+
+        def section(count, code, size):
+            nonlocal offset
+            part = view[offset:offset + count * size].cast(code)
+            self._views.append(part)
+            offset += count * size
+            offset += -offset % 8
+            return part
+
+        self.string_offsets = section(self.n_strings + 1, 'Q', 8)
+        self.columns = {key: section(self.n_rows, 'i', 4) for key in FIELDNAMES}
+        self.hashes = section(self.n_rows, 'Q', 8)
+        self.hash_rows = section(self.n_rows, 'i', 4)
+        self._blob = view[offset:offset + self.string_offsets[self.n_strings]]
+        self._views.append(self._blob)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def matches(self, csv_path):
+        """True if the CSV still starts with exactly the bytes this snapshot was built from."""
+        try:
+            with open(csv_path, mode='rb') as f:
+                if os.fstat(f.fileno()).st_size < self.covered:
+                    return False
+                return _region_crcs(f, self.covered) == (self.head_crc, self.tail_crc)
+        except FileNotFoundError:
+            return self.covered == 0
+
+    def string(self, i):
+        offsets = self.string_offsets
+        return str(self._blob[offsets[i]:offsets[i + 1]], 'utf-8')
+
+    def value(self, key, r):
+        return self.string(self.columns[key][r])
+
+    def row(self, r):
+        return {key: self.string(self.columns[key][r]) for key in FIELDNAMES}
+
+    def find(self, barcode):
+        """Row id of the first row with this barcode, or None."""
+        h = barcode_hash(barcode)
+        hashes = self.hashes
+        i = bisect_left(hashes, h)
+        while i < self.n_rows and hashes[i] == h:
+            r = self.hash_rows[i]
+            if self.value('barcode', r) == barcode:
+                return r
+            i += 1
+        return None
+
+    def duplicate_rows(self):
+        """Row ids whose barcode already appeared in an earlier row.
+
+        Equal neighbours in the sorted hash array are found with NumPy; only
+        those rows (duplicates and the rare collision) have their barcodes read.
+        """
+        import numpy as np   # Only needed to compact
+        if self.n_rows < 2:
+            return []
+        hashes = np.frombuffer(self.hashes, dtype=np.uint64)
+        equal = np.flatnonzero(hashes[1:] == hashes[:-1])
+        candidates = np.union1d(equal, equal + 1).tolist()
+        del hashes   # A live export of the mapping would block close()
+        seen = set()
+        duplicates = []
+        # Equal hashes are in row order, so the first one seen is the first row
+        for k in candidates:
+            r = self.hash_rows[k]
+            key = (self.hashes[k], self.value('barcode', r))
+            if key in seen:
+                duplicates.append(r)
+            seen.add(key)
+        return duplicates
+
+
+def build_snapshot(csv_path, snapshot_path, base=None):
+    """Writes a snapshot of csv_path atomically. Returns the number of rows.
+
+    With `base` (an open Snapshot that still matches the CSV), only the rows
+    after base.covered are parsed; the rest is copied from `base`.
+    """
+    import numpy as np   # Only needed to build; reading is stdlib-only
+
+    started = time.perf_counter()
+    tail, covered = read_tail(csv_path, base.covered if base else 0)
+    n_old = base.n_rows if base else 0
+    n_old_strings = base.n_strings if base else 0
+
+    # Intern the new values. Low-cardinality columns reuse the base's strings.
+    ids = {}
+    if base is not None:
+        for key in _LOW_CARDINALITY:
+            for i in set(base.columns[key]):
+                ids.setdefault(base.string(i), i)
+    new_strings = []
+
+    def intern(value):
+        i = ids.get(value)
+        if i is None:
+            i = ids[value] = n_old_strings + len(new_strings)
+            new_strings.append(value.encode('utf-8'))
+        return i
+
+    new_columns = {key: np.fromiter((intern(row[k]) for row in tail), dtype=np.int32, count=len(tail))
+                   for k, key in enumerate(FIELDNAMES)}
+    new_lengths = np.fromiter((len(s) for s in new_strings), dtype=np.uint64, count=len(new_strings))
+
+    if base is not None:
+        old_offsets = np.frombuffer(base.string_offsets, dtype=np.uint64)
+        blob_start = old_offsets[-1]
+        offsets = np.concatenate([old_offsets, blob_start + np.cumsum(new_lengths, dtype=np.uint64)])
+        columns = {key: np.concatenate([np.frombuffer(base.columns[key], dtype=np.int32), new_columns[key]])
+                   for key in FIELDNAMES}
+        row_hashes = np.empty(n_old, dtype=np.uint64)
+        row_hashes[np.frombuffer(base.hash_rows, dtype=np.int32)] = np.frombuffer(base.hashes, dtype=np.uint64)
+        old_blob = base._blob
+    else:
+        offsets = np.concatenate([np.zeros(1, dtype=np.uint64), np.cumsum(new_lengths, dtype=np.uint64)])
+        columns = new_columns
+        row_hashes = np.empty(0, dtype=np.uint64)
+        old_blob = b""
+    row_hashes = np.concatenate([row_hashes, _hash_column([row[1] for row in tail], np)])
+    # Stable, so equal hashes stay in row order and find() returns the first row
+    order = np.argsort(row_hashes, kind='stable')
+
+    n_rows = n_old + len(tail)
+    n_strings = n_old_strings + len(new_strings)
+    with open(csv_path, mode='rb') if os.path.exists(csv_path) else io.BytesIO() as f:
+        head_crc, tail_crc = _region_crcs(f, covered)
+
+    tmp_path = snapshot_path + ".tmp"
+    with open(tmp_path, mode='wb') as out:
+        out.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, n_rows, n_strings, covered, head_crc, tail_crc)
+                  .ljust(HEADER_SIZE, b"\0"))
+
+        def write(data):
+            out.write(data)
+            out.write(b"\0" * (-out.tell() % 8))
+
+        write(offsets.astype('<u8').tobytes())
+        for key in FIELDNAMES:
+            write(columns[key].astype('<i4').tobytes())
+        write(row_hashes[order].astype('<u8').tobytes())
+        write(order.astype('<i4').tobytes())
+        out.write(old_blob)
+        out.write(b"".join(new_strings))
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, snapshot_path)
+    _fsync_dir(os.path.dirname(os.path.abspath(snapshot_path)))
+    elapsed = time.perf_counter() - started
+    METRICS.observe("snapshot_build", elapsed)
+    print(f"[Snapshot] Wrote {n_rows} books to '{snapshot_path}' ({len(tail)} parsed, {elapsed:.2f}s)")
+    return n_rows
+
+
+# -----------------------------------------------------------------------
+# Catalog backed by a snapshot
+# -----------------------------------------------------------------------
+
+class SnapshotCatalog:
+    """books.csv served from its memory-mapped snapshot plus an in-memory tail.
+
+    Same methods as Catalog. Appends go to the CSV (fsync'ed) and to the tail.
+    """
+
+    allows_duplicates = True
+
+    def __init__(self, path, snapshot_path=None, rebuild_tail_rows=REBUILD_TAIL_ROWS):
+        self.path = path
+        self.snapshot_path = snapshot_path or snapshot_path_for(path)
+        self.rebuild_tail_rows = rebuild_tail_rows
+        self.version = 0
+        self._lock = threading.RLock()
+        self._snap = None
+        self._tail = []              # row dicts after the snapshot's covered bytes
+        self._tail_by_barcode = {}
+        self._parsed_to = 0          # CSV offset up to which rows are known
+        self._signature = None
+        self._groups = {}            # column -> {value: [row ids]}, built on first use
+        self._open()
+        print(f"[Catalog] Mapped {self.count()} books from '{self.snapshot_path}'")
+
+    # -------------------------------------------------------------------------
+    # Loading
+    # -------------------------------------------------------------------------
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _map(self):
+        try:
+            snap = Snapshot(self.snapshot_path)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not snap.matches(self.path):
+            snap.close()
+            return None
+        return snap
+
+    def _swap(self):
+        """Rebuilds the snapshot from scratch and maps it."""
+        if self._snap is not None:
+            self._snap.close()
+            self._snap = None
+        build_snapshot(self.path, self.snapshot_path)
+        self._snap = self._map()
+
+    def _open(self):
+        """(Re)maps the snapshot, rebuilding it if it is missing or stale."""
+        with self._lock:
+            if self._snap is not None:
+                self._snap.close()
+            self._snap = self._map()
+            if self._snap is None:
+                self._swap()
+            self._reset_tail()
+            self._read_tail()
+            if len(self._tail) >= self.rebuild_tail_rows:
+                self.rebuild()
+
+    def _reset_tail(self):
+        self._tail = []
+        self._tail_by_barcode = {}
+        self._parsed_to = self._snap.covered
+        self._groups = {}
+        self.version += 1
+
+    def _read_tail(self):
+        rows, self._parsed_to = read_tail(self.path, self._parsed_to)
+        for values in rows:
+            self._append_tail(dict(zip(FIELDNAMES, values)))
+        self._signature = self._stat_signature()
+        if rows:
+            self.version += 1
+
+    def _append_tail(self, row):
+        self._tail.append(row)
+        self._tail_by_barcode.setdefault(row['barcode'], row)
+        self._groups = {}
+
+    def rebuild(self):
+        """Folds the tail into the snapshot file (parsing only the tail)."""
+        with self._lock:
+            if not self._tail and self._snap.matches(self.path):
+                return
+            base = self._snap if self._snap.matches(self.path) else None
+            try:
+                build_snapshot(self.path, self.snapshot_path, base=base)
+            except PermissionError as e:
+                # Windows: another process still maps the old snapshot; keep the tail
+                print(f"[Snapshot] Rebuild skipped: {e}")
+                return
+            self._snap.close()
+            self._snap = self._map()
+            self._reset_tail()
+            self._read_tail()
+
+    def refresh(self):
+        """Picks up rows other desks appended; remaps if the CSV was rewritten."""
+        with self._lock:
+            signature = self._stat_signature()
+            if signature == self._signature:
+                return
+            if signature is not None and signature[1] >= self._parsed_to and self._snap.matches(self.path):
+                self._read_tail()
+                if len(self._tail) >= self.rebuild_tail_rows:
+                    self.rebuild()
+            else:
+                self._open()
+
+    def close(self):
+        with self._lock:
+            if self._tail:
+                self.rebuild()   # Next start maps everything without parsing
+            self._snap.close()
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def _row(self, r):
+        n = self._snap.n_rows
+        return self._snap.row(r) if r < n else dict(self._tail[r - n])
+
+    def get(self, barcode):
+        with self._lock:
+            self.refresh()
+            r = self._snap.find(barcode)
+            if r is not None:
+                return self._snap.row(r)
+            row = self._tail_by_barcode.get(barcode)
+            return dict(row) if row else None
+
+    def __contains__(self, barcode):
+        with self._lock:
+            self.refresh()
+            return barcode in self._tail_by_barcode or self._snap.find(barcode) is not None
+
+    def count(self):
+        with self._lock:
+            self.refresh()
+            return self._snap.n_rows + len(self._tail)
+
+    def rows(self):
+        with self._lock:
+            self.refresh()
+            return self.page(0, self._snap.n_rows + len(self._tail))
+
+    def page(self, offset, limit):
+        """Rows [offset, offset + limit) in catalog order; only those rows are decoded."""
+        with self._lock:
+            self.refresh()
+            end = min(offset + limit, self._snap.n_rows + len(self._tail))
+            return [self._row(r) for r in range(offset, end)]
+
+    def titles(self):
+        with self._lock:
+            self.refresh()
+            column = self._snap.columns['title']
+            return [self._snap.string(i) for i in column] + [row['title'] for row in self._tail]
+
+    def _group(self, key, value):
+        """Row ids whose `key` equals `value`; the column is grouped once, then cached."""
+        groups = self._groups.get(key)
+        if groups is None:
+            import numpy as np   # Loaded by the recommender anyway
+            ids = np.frombuffer(self._snap.columns[key], dtype=np.int32)
+            order = np.argsort(ids, kind='stable')
+            values, starts = np.unique(ids[order], return_index=True)
+            ends = list(starts[1:]) + [len(order)]
+            groups = {self._snap.string(int(i)): order[start:end].tolist()
+                      for i, start, end in zip(values, starts, ends)}
+            n = self._snap.n_rows
+            for r, row in enumerate(self._tail):
+                groups.setdefault(row[key], []).append(n + r)
+            self._groups[key] = groups
+        return groups.get(value, [])
+
+    def books_in_genre(self, genre):
+        with self._lock:
+            self.refresh()
+            return [self._row(r) for r in self._group('genre', genre)]
+
+    def books_by_author(self, author):
+        with self._lock:
+            self.refresh()
+            return [self._row(r) for r in self._group('author', author)]
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def add(self, row, allow_duplicate=False):
+        """Appends one book. Returns False if the barcode exists and duplicates aren't allowed."""
+        return self.add_many([row], allow_duplicate=allow_duplicate) == 1
+
+    def add_many(self, rows, allow_duplicate=False):
+        """Appends several books in a single fsync'ed write. Returns how many were written."""
+        with self._lock:
+            self.refresh()
+            new_rows = []
+            seen = set()
+            for row in rows:
+                clean = {key: str(row.get(key) or '') for key in FIELDNAMES}
+                barcode = clean['barcode']
+                if not allow_duplicate and (barcode in seen or barcode in self):
+                    continue
+                seen.add(barcode)
+                new_rows.append(clean)
+            if not new_rows:
+                return 0
+
+            text = io.StringIO(newline='')
+            writer = csv.DictWriter(text, fieldnames=FIELDNAMES)
+            if self._signature is None or os.path.getsize(self.path) == 0:
+                writer.writeheader()
+            elif _missing_final_newline(self.path):
+                # A complete row without newline, or a torn one; either way not ours to cut
+                text.write("\r\n")
+            writer.writerows(new_rows)
+            # Append only: rows another desk wrote after _parsed_to must survive
+            with METRICS.timer("catalog_write"), open(self.path, mode='ab') as file:
+                file.write(text.getvalue().encode('utf-8'))
+                file.flush()
+                os.fsync(file.fileno())
+
+            # Picks up our rows and anything appended before them
+            self._read_tail()
+            return len(new_rows)
+
+    def compact(self, barcodes=None):
+        """Rewrites the CSV without duplicate barcodes (first row wins). Returns rows removed.
+
+        With `barcodes`, only duplicates of those barcodes are removed.
+        """
+        with self._lock:
+            self.refresh()
+            n = self._snap.n_rows
+            drop = set(self._snap.duplicate_rows())
+            drop.update(
+                n + i for i, row in enumerate(self._tail)
+                if self._snap.find(row['barcode']) is not None or self._tail_by_barcode[row['barcode']] is not row
+            )
+            if barcodes is not None:
+                drop = {r for r in drop if self._row(r)['barcode'] in barcodes}
+            if not drop:
+                return 0
+            tmp_path = self.path + ".tmp"
+            with METRICS.timer("catalog_compact"), \
+                    open(tmp_path, mode='w', newline='', encoding='utf-8') as file:
+                writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+                writer.writeheader()
+                for r in range(n + len(self._tail)):
+                    if r not in drop:
+                        writer.writerow(self._row(r))
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.path)
+            _fsync_dir(os.path.dirname(os.path.abspath(self.path)))
+            self._swap()
+            self._reset_tail()
+            self._read_tail()
+            return len(drop)
+
+
+def snapshot_is_current(csv_path, snapshot_path):
+    """True if snapshot_path exists and still matches the CSV (stdlib-only, no build)."""
+    try:
+        snap = Snapshot(snapshot_path)
+    except (FileNotFoundError, ValueError):
+        return False
+    try:
+        return snap.matches(csv_path)
+    finally:
+        snap.close()
+
+
+class BackgroundSnapshotCatalog:
+    """SnapshotCatalog whose build runs off the caller's thread.
+
+    A current snapshot is mapped right away. Otherwise a plain Catalog
+    serves the file until the snapshot is ready; both re-read the CSV when
+    it changes, so rows added meanwhile are not lost.
+    """
+
+    allows_duplicates = True
+
+    def __init__(self, path, snapshot_path=None):
+        self.path = path
+        self.snapshot_path = snapshot_path or snapshot_path_for(path)
+        self._version_base = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        if snapshot_is_current(path, self.snapshot_path):
+            self._catalog = SnapshotCatalog(path, self.snapshot_path)
+            return
+        self._catalog = Catalog(path)
+        print(f"[Snapshot] Building '{self.snapshot_path}' in the background")
+        threading.Thread(target=self._open_snapshot, name="catalog-snapshot", daemon=True).start()
+
+    def _open_snapshot(self):
+        try:
+            snapshot = SnapshotCatalog(self.path, self.snapshot_path)
+        except Exception as e:
+            print(f"[Snapshot] Build failed, staying on the CSV: {e}")
+            return
+        with self._lock:
+            if self._closed:
+                snapshot.close()
+                return
+            previous, self._catalog = self._catalog, snapshot
+            # Keep version increasing across the switch
+            self._version_base += previous.version + 1
+
+    @property
+    def version(self):
+        with self._lock:
+            return self._version_base + self._catalog.version
+
+    def refresh(self):
+        self._catalog.refresh()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._catalog.close()
+
+    def compact(self, barcodes=None):
+        return self._catalog.compact(barcodes)
+
+    def get(self, barcode):
+        return self._catalog.get(barcode)
+
+    def __contains__(self, barcode):
+        return barcode in self._catalog
+
+    def count(self):
+        return self._catalog.count()
+
+    def rows(self):
+        return self._catalog.rows()
+
+    def page(self, offset, limit):
+        return self._catalog.page(offset, limit)
+
+    def titles(self):
+        return self._catalog.titles()
+
+    def books_in_genre(self, genre):
+        return self._catalog.books_in_genre(genre)
+
+    def books_by_author(self, author):
+        return self._catalog.books_by_author(author)
+
+    def add(self, row, allow_duplicate=False):
+        return self._catalog.add(row, allow_duplicate=allow_duplicate)
+
+    def add_many(self, rows, allow_duplicate=False):
+        return self._catalog.add_many(rows, allow_duplicate=allow_duplicate)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect memory-mapped catalog snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="(re)build the snapshot of a books.csv")
+    build.add_argument("csv_file")
+    build.add_argument("--output", help=f"snapshot file (default: CSV path + '{SNAPSHOT_SUFFIX}')")
+    build.add_argument("--full", action="store_true", help="ignore the existing snapshot and reparse everything")
+    info = sub.add_parser("info", help="print a snapshot's header")
+    info.add_argument("snapshot_file")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        output = args.output or snapshot_path_for(args.csv_file)
+        base = None
+        if not args.full and os.path.exists(output):
+            try:
+                base = Snapshot(output)
+            except ValueError:
+                base = None
+            if base is not None and not base.matches(args.csv_file):
+                base.close()
+                base = None
+        try:
+            build_snapshot(args.csv_file, output, base=base)
+        finally:
+            if base is not None:
+                base.close()
+    else:
+        snap = Snapshot(args.snapshot_file)
+        print(f"[Snapshot] {snap.n_rows} books, {snap.n_strings} distinct strings, "
+              f"covers {snap.covered} CSV bytes, {os.path.getsize(args.snapshot_file)} bytes on disk")
+        snap.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,360 @@
+import argparse
+import functools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_capture import AdaptiveCapture
+from backends import BackendTuner, RaceDecoder, make_decoder
+from books_api import fetch_book_info
+from catalog import book_info_to_row
+from frame_gate import FrameGate
+from metrics import METRICS
+from metadata_cache import MetadataCache
+from pipeline import apply_capture_settings, default_worker_count, open_capture
+from scanner import SCANNER_AVAILABLE, VariantCascade
+from storage import open_catalog
+from tracking import DEFAULT_COOLDOWN, DEFAULT_REQUIRED_READS, DEFAULT_WINDOW, RoiTracker, ScanConfirmer
+from write_buffer import BufferedCatalog
+
+# -----------------------------------------------------------------------
+# Scanning station — many webcams/RTSP streams in one process.
+#
+#   python station.py --camera desk1=0 --camera desk2=rtsp://host/stream
+#
+# Every camera has its own capture thread that reconnects with backoff
+# when the stream fails. A per-camera FrameGate discards blurry, idle
+# and empty frames. Each camera keeps only its newest frame. One
+# shared pool of decode workers serves the cameras round-robin, so
+# decode throughput scales with cores rather than with the number of
+# cameras. The station runs until stopped. Reads go through a per-camera
+# ScanConfirmer, and only confirmed barcodes are emitted, tagged with the
+# camera id.
+#
+# --backend picks the decoder library: a name (zxingcpp, pyzbar, opencv),
+# "race" (all of them on the same frame, first answer wins) or "auto"
+# (each camera calibrates on its own frames and keeps the fastest
+# backend that reads as reliably as the best).
+#
+# --adaptive decodes on a half-resolution pyramid level first and lets
+# each camera's AdaptiveCapture lower or raise its resolution and frame
+# rate from its recent hit rate and the CPU in use.
+# -----------------------------------------------------------------------
+
+RECONNECT_DELAY = 1.0
+MAX_RECONNECT_DELAY = 30.0
+STATS_INTERVAL = 10.0
+
+
+class CameraReader(threading.Thread):
+    def __init__(self, camera_id, source, station, frame_size=(1280, 720)):
+        super().__init__(name=f"camera-{camera_id}", daemon=True)
+        self.camera_id = camera_id
+        self.source = source
+        self.station = station
+        self.frame_size = frame_size
+        self.connected = False
+        self.adaptive = station.adaptive.get(camera_id)
+
+    def run(self):
+        stop = self.station.stop_event
+        delay = RECONNECT_DELAY
+        while not stop.is_set():
+            cap = open_capture(self.source, self.frame_size)
+            if not cap.isOpened():
+                cap.release()
+                print(f"[Station] {self.camera_id}: could not open {self.source}, retrying in {delay:.0f}s")
+                stop.wait(delay)
+                delay = min(delay * 2, MAX_RECONNECT_DELAY)
+                continue
+
+            print(f"[Station] {self.camera_id}: connected")
+            if self.adaptive is not None:
+                # A reconnect starts from the controller's current level
+                apply_capture_settings(cap, self.adaptive.frame_size, self.adaptive.fps)
+                self.adaptive.pending_change()
+            self.connected = True
+            delay = RECONNECT_DELAY
+            try:
+                while not stop.is_set():
+                    with METRICS.timer(f"capture:{self.camera_id}"):
+                        ret, frame = cap.read()
+                    if not ret:
+                        print(f"[Station] {self.camera_id}: stream lost, reconnecting")
+                        break
+                    if self.adaptive is not None:
+                        change = self.adaptive.pending_change()
+                        if change is not None:
+                            apply_capture_settings(cap, *change)
+                        if not self.adaptive.should_decode():
+                            self.station.count(self.camera_id, "captured")
+                            self.station.count(self.camera_id, "throttled")
+                            continue
+                    self.station.submit(self.camera_id, frame)
+            finally:
+                cap.release()
+                self.connected = False
+            if not stop.is_set():
+                self.station.count(self.camera_id, "reconnects")
+                stop.wait(delay)
+
+
+class ScanStation:
+    def __init__(self, sources, on_result, decode_fn=None, workers=None, frame_size=(1280, 720),
+                 confirmer_factory=ScanConfirmer, gate_factory=FrameGate, backend=None, adaptive=False):
+        """sources: {camera_id: webcam index or RTSP URL}
+        backend: decoder spec for backends.make_decoder (None = preferred library)
+        adaptive: pyramid decoding plus per-camera resolution/fps control
+        on_result(camera_id, frame, results) is called from a decode worker thread
+        with confirmed results only (pass confirmer_factory=None to get every read)."""
+        self.sources = dict(sources)
+        self.on_result = on_result
+        self.workers = workers or default_worker_count()
+        self.frame_size = frame_size
+        # One adaptive cascade per camera — lighting and distance differ per desk
+        self.cascades = {camera_id: VariantCascade(pyramid=adaptive) for camera_id in self.sources}
+        self.adaptive = (
+            {camera_id: AdaptiveCapture(frame_size, label=camera_id) for camera_id in self.sources}
+            if adaptive else {}
+        )
+        # ...and one ROI tracker, so a book held at a desk is only searched for where it was
+        self.trackers = {camera_id: RoiTracker() for camera_id in self.sources}
+        # "auto" calibrates per camera; any other decoder is shared
+        shared = None if backend == "auto" else make_decoder(backend)
+        self.decoders = {
+            camera_id: shared or make_decoder(backend, label=camera_id) for camera_id in self.sources
+        }
+        self.decode_fn = decode_fn or (
+            lambda camera_id, frame: self.cascades[camera_id].decode(
+                frame, decoder=self.decoders[camera_id], tracker=self.trackers[camera_id])[0]
+        )
+        self.confirmers = (
+            {camera_id: confirmer_factory() for camera_id in self.sources} if confirmer_factory else {}
+        )
+        # No guide box to aim at here: gate on the whole frame, or on the tracked ROI
+        self.gates = (
+            {camera_id: gate_factory(use_roi=False, tracker=self.trackers[camera_id]) for camera_id in self.sources}
+            if gate_factory else {}
+        )
+
+        self.stop_event = threading.Event()
+        self.stats = {
+            camera_id: {"captured": 0, "throttled": 0, "gated": 0, "decoded": 0, "dropped": 0, "hits": 0, "reconnects": 0}
+            for camera_id in self.sources
+        }
+        self._stats_lock = threading.Lock()
+
+        # Newest undecoded frame per camera; workers take them round-robin
+        self._slots = {}
+        self._order = list(self.sources)
+        self._next = 0
+        self._ready = threading.Condition()
+        self._threads = []
+
+    def count(self, camera_id, key, n=1):
+        with self._stats_lock:
+            self.stats[camera_id][key] += n
+        METRICS.count(f"station_{key}", n)
+
+    # -------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------
+
+    def start(self):
+        for camera_id, source in self.sources.items():
+            self._threads.append(CameraReader(camera_id, source, self, self.frame_size))
+        for i in range(self.workers):
+            self._threads.append(
+                threading.Thread(target=self._decode_loop, name=f"station-decode-{i}", daemon=True)
+            )
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self.stop_event.set()
+        with self._ready:
+            self._ready.notify_all()
+        for decoder in set(self.decoders.values()):
+            if isinstance(decoder, RaceDecoder):
+                decoder.shutdown()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    # -------------------------------------------------------------------------
+    # Frame hand-off
+    # -------------------------------------------------------------------------
+
+    def submit(self, camera_id, frame):
+        """Called by capture threads; replaces the camera's pending frame if any."""
+        self.count(camera_id, "captured")
+        gate = self.gates.get(camera_id)
+        if gate is not None:
+            with METRICS.timer(f"gate:{camera_id}"):
+                passed = gate.check(frame)
+            if not passed:
+                self.count(camera_id, "gated")
+                return
+        with self._ready:
+            if camera_id in self._slots:
+                self.count(camera_id, "dropped")
+            self._slots[camera_id] = frame
+            self._ready.notify()
+
+    def _take_frame(self, timeout=0.2):
+        with self._ready:
+            if not self._slots:
+                self._ready.wait(timeout)
+            if not self._slots:
+                return None, None
+            for _ in range(len(self._order)):
+                camera_id = self._order[self._next]
+                self._next = (self._next + 1) % len(self._order)
+                if camera_id in self._slots:
+                    return camera_id, self._slots.pop(camera_id)
+            return None, None
+
+    def _decode_loop(self):
+        while not self.stop_event.is_set():
+            camera_id, frame = self._take_frame()
+            if frame is None:
+                continue
+            try:
+                with METRICS.timer(f"decode:{camera_id}"):
+                    results = self.decode_fn(camera_id, frame)
+            except Exception as e:
+                print(f"[Station] {camera_id}: decode error: {e}")
+                continue
+            self.count(camera_id, "decoded")
+            if camera_id in self.adaptive:
+                self.adaptive[camera_id].record(bool(results))
+            confirmer = self.confirmers.get(camera_id)
+            if results and confirmer is not None:
+                results = confirmer.observe_all(results)
+            if results:
+                self.count(camera_id, "hits")
+                self.on_result(camera_id, frame, results)
+
+    def snapshot_stats(self):
+        with self._stats_lock:
+            snapshot = {camera_id: dict(stats) for camera_id, stats in self.stats.items()}
+        for camera_id, confirmer in self.confirmers.items():
+            snapshot[camera_id]["confirm"] = dict(confirmer.stats)
+        for camera_id, gate in self.gates.items():
+            snapshot[camera_id]["gate"] = gate.snapshot_stats()
+        for camera_id, tracker in self.trackers.items():
+            snapshot[camera_id]["track"] = tracker.snapshot_stats()
+        for camera_id, controller in self.adaptive.items():
+            snapshot[camera_id]["adaptive"] = controller.snapshot_stats()
+        for camera_id, decoder in self.decoders.items():
+            if isinstance(decoder, BackendTuner):
+                snapshot[camera_id]["backend"] = {
+                    "choice": decoder.choice.name if decoder.choice else None,
+                    "calibration": decoder.report(),
+                }
+        return snapshot
+
+
+def parse_camera(spec):
+    """'desk1=0' -> ('desk1', 0); 'rtsp://...' -> ('rtsp://...', 'rtsp://...')."""
+    camera_id, sep, source = spec.partition("=")
+    if not sep or "://" in camera_id:
+        camera_id, source = spec, spec
+    return camera_id, int(source) if source.isdigit() else source
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Continuously scan barcodes from several cameras.")
+    parser.add_argument("--camera", action="append", required=True, metavar="ID=SOURCE",
+                        help="camera id and webcam index / RTSP URL (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="shared decode threads")
+    parser.add_argument("--reads", type=int, default=DEFAULT_REQUIRED_READS,
+                        help="agreeing reads needed before a barcode is emitted")
+    parser.add_argument("--window", type=float, default=DEFAULT_WINDOW,
+                        help="seconds within which the agreeing reads must happen")
+    parser.add_argument("--cooldown", type=float, default=DEFAULT_COOLDOWN,
+                        help="seconds before the same barcode may be emitted again")
+    parser.add_argument("--backend", default=None,
+                        help="decoder: zxingcpp, pyzbar, opencv, race or auto (default: first installed)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="pyramid decoding and per-camera resolution/fps control")
+    parser.add_argument("--no-gate", action="store_true",
+                        help="decode every frame (disable the motion/sharpness/barcode gate)")
+    parser.add_argument("--save", action="store_true",
+                        help="look up confirmed barcodes and add them to the catalog")
+    parser.add_argument("--catalog", "--csv", dest="catalog", default="books.csv",
+                        help="catalog used with --save (.csv or .sqlite3)")
+    parser.add_argument("--cache", default="isbn_cache.sqlite3", help="ISBN metadata cache used with --save")
+    parser.add_argument("--metrics-file",
+                        help="rewrite stage metrics here every few seconds (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--metrics-port", type=int, help="serve /metrics and /metrics.json on this local port")
+    args = parser.parse_args(argv)
+
+    if not SCANNER_AVAILABLE:
+        print("[ERROR] No barcode scanner library found! Install: pip install zxing-cpp")
+        return 1
+
+    print_lock = threading.Lock()
+
+    def emit(event):
+        with print_lock:
+            print(json.dumps(event), flush=True)
+
+    lookups = None
+    if args.save:
+        # Confirmed books from every camera are written in group commits
+        catalog = BufferedCatalog(open_catalog(args.catalog))
+        cache = MetadataCache(args.cache)
+        # Network/disk I/O stays off the decode workers
+        lookups = ThreadPoolExecutor(max_workers=4, thread_name_prefix="station-lookup")
+
+        def save(camera_id, code):
+            info = fetch_book_info(code, cache=cache)
+            saved = bool(info) and catalog.add(book_info_to_row(code, info))
+            emit({"camera": camera_id, "barcode": code,
+                  "title": info["title"] if info else None, "saved": saved})
+
+    def on_result(camera_id, frame, results):
+        codes = [r["data"] for r in results]
+        emit({"camera": camera_id, "time": round(time.time(), 3), "barcodes": codes})
+        if lookups is not None:
+            for code in codes:
+                lookups.submit(save, camera_id, code)
+
+    confirmer_factory = functools.partial(
+        ScanConfirmer, required_reads=args.reads, window=args.window, cooldown=args.cooldown,
+    )
+    try:
+        station = ScanStation(dict(parse_camera(spec) for spec in args.camera), on_result,
+                              workers=args.workers, confirmer_factory=confirmer_factory,
+                              gate_factory=None if args.no_gate else FrameGate, backend=args.backend, adaptive=args.adaptive)
+    except ValueError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    metrics_exporter = METRICS.start_file_exporter(args.metrics_file) if args.metrics_file else None
+    if args.metrics_port:
+        METRICS.serve(args.metrics_port)
+    station.start()
+    print(f"[Station] Scanning {len(station.sources)} cameras with {station.workers} decode workers. Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(STATS_INTERVAL)
+            print(f"[Station] Stats: {json.dumps(station.snapshot_stats())}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        station.stop()
+        station.join(timeout=2)
+        if lookups is not None:
+            lookups.shutdown(wait=True)
+            catalog.close()
+        if metrics_exporter is not None:
+            metrics_exporter.set()
+            METRICS.write_file(args.metrics_file)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
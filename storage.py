@@ -0,0 +1,237 @@
+import argparse
+import csv
+import os
+import sqlite3
+import threading
+
+from catalog import FIELDNAMES, Catalog
+from metrics import METRICS
+from service_client import RemoteCatalog, is_service_url
+from snapshot import BackgroundSnapshotCatalog, SnapshotCatalog
+
+# -----------------------------------------------------------------------
+# Storage backends — the catalog can live in books.csv (Catalog) or in a
+# SQLite database (SqliteCatalog), or behind a running scan_service.py
+# (RemoteCatalog). All expose the same methods, and open_catalog() picks
+# one from the path.
+#
+# SQLite runs in WAL mode, so readers never block the writer. barcode has
+# a UNIQUE index, so two desks scanning the same book can't both insert
+# it. genre and author are indexed, and the row count is kept by
+# triggers, so count() never scans the table.
+#
+#   python storage.py migrate books.csv library.sqlite3
+#   python storage.py export library.sqlite3 books_export.csv
+# -----------------------------------------------------------------------
+
+SQLITE_EXTENSIONS = {".db", ".sqlite", ".sqlite3"}
+MIGRATE_BATCH = 10_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id        INTEGER PRIMARY KEY,
+    title     TEXT NOT NULL DEFAULT '',
+    barcode   TEXT NOT NULL,
+    genre     TEXT NOT NULL DEFAULT '',
+    author    TEXT NOT NULL DEFAULT '',
+    publisher TEXT NOT NULL DEFAULT ''
+);
+CREATE UNIQUE INDEX IF NOT EXISTS books_barcode ON books (barcode);
+CREATE INDEX IF NOT EXISTS books_genre ON books (genre);
+CREATE INDEX IF NOT EXISTS books_author ON books (author);
+
+CREATE TABLE IF NOT EXISTS book_count (n INTEGER NOT NULL);
+INSERT INTO book_count (n)
+    SELECT COUNT(*) FROM books WHERE NOT EXISTS (SELECT 1 FROM book_count);
+CREATE TRIGGER IF NOT EXISTS books_count_insert AFTER INSERT ON books
+    BEGIN UPDATE book_count SET n = n + 1; END;
+CREATE TRIGGER IF NOT EXISTS books_count_delete AFTER DELETE ON books
+    BEGIN UPDATE book_count SET n = n - 1; END;
+"""
+
+_COLUMNS = ", ".join(FIELDNAMES)
+
+
+def is_sqlite_path(path):
+    return os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS
+
+
+def open_catalog(path, snapshot=False, background=False):
+    """Returns a SqliteCatalog for .db/.sqlite/.sqlite3 files, a RemoteCatalog for a
+    scan service URL, and a CSV Catalog otherwise (served from its memory-mapped
+    snapshot with snapshot=True, built on a background thread with background=True)."""
+    if is_service_url(path):
+        return RemoteCatalog(path)
+    if is_sqlite_path(path):
+        return SqliteCatalog(path)
+    if snapshot:
+        return BackgroundSnapshotCatalog(path) if background else SnapshotCatalog(path)
+    return Catalog(path)
+
+
+class SqliteCatalog:
+    # The UNIQUE barcode index keeps one row per barcode
+    allows_duplicates = False
+
+    def __init__(self, path):
+        self.path = path
+        self.version = 0
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._data_version = self._read_data_version()
+        print(f"[Catalog] Opened {self.count()} books from '{path}'")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _read_data_version(self):
+        return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        """Bumps version when another connection committed since the last check."""
+        with self._lock:
+            data_version = self._read_data_version()
+            if data_version != self._data_version:
+                self._data_version = data_version
+                self.version += 1
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def get(self, barcode):
+        rows = self._query(f"SELECT {_COLUMNS} FROM books WHERE barcode = ?", (barcode,))
+        return rows[0] if rows else None
+
+    def __contains__(self, barcode):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM books WHERE barcode = ?", (barcode,)
+            ).fetchone() is not None
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT n FROM book_count").fetchone()[0]
+
+    def rows(self):
+        return self._query(f"SELECT {_COLUMNS} FROM books ORDER BY id")
+
+    def page(self, offset, limit):
+        return self._query(f"SELECT {_COLUMNS} FROM books ORDER BY id LIMIT ? OFFSET ?", (limit, offset))
+
+    def titles(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT title FROM books ORDER BY id")]
+
+    def books_in_genre(self, genre):
+        return self._query(f"SELECT {_COLUMNS} FROM books WHERE genre = ? ORDER BY id", (genre,))
+
+    def books_by_author(self, author):
+        return self._query(f"SELECT {_COLUMNS} FROM books WHERE author = ? ORDER BY id", (author,))
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def add(self, row, allow_duplicate=False):
+        """Inserts one book. Returns False if the barcode already exists."""
+        return self.add_many([row], allow_duplicate=allow_duplicate) == 1
+
+    def add_many(self, rows, allow_duplicate=False):
+        """Inserts books in one transaction. Returns how many were written.
+
+        The UNIQUE barcode index always wins: allow_duplicate is accepted for
+        interface compatibility with the CSV catalog, but duplicates are skipped.
+        """
+        values = [tuple(str(row.get(key) or '') for key in FIELDNAMES) for row in rows]
+        if not values:
+            return 0
+        with self._lock, METRICS.timer("catalog_write"):
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.count()
+                self._conn.executemany(
+                    f"INSERT OR IGNORE INTO books ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)", values
+                )
+                written = self.count() - before
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if written:
+                self.version += 1
+                self._data_version = self._read_data_version()
+            return written
+
+    def compact(self, barcodes=None):
+        """Checkpoints the WAL into the main file. The unique index already rules out
+        duplicate barcodes, so nothing is removed (`barcodes` is ignored)."""
+        with self._lock, METRICS.timer("catalog_compact"):
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return 0
+
+
+# -----------------------------------------------------------------------
+# Migration / export
+# -----------------------------------------------------------------------
+
+def migrate_csv(csv_path, db_path, batch_size=MIGRATE_BATCH):
+    """Copies every row of a books.csv into a SQLite catalog. Returns (read, written)."""
+    rows = Catalog(csv_path).rows()
+    target = SqliteCatalog(db_path)
+    written = 0
+    try:
+        for start in range(0, len(rows), batch_size):
+            written += target.add_many(rows[start:start + batch_size])
+    finally:
+        target.close()
+    return len(rows), written
+
+
+def export_csv(catalog, csv_path):
+    """Writes any catalog out in the books.csv format. Returns the number of rows."""
+    rows = catalog.rows()
+    tmp_path = csv_path + ".tmp"
+    with open(tmp_path, mode='w', newline='', encoding='utf-8') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, csv_path)
+    return len(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Catalog storage tools.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    migrate = sub.add_parser("migrate", help="copy a books.csv into a SQLite catalog")
+    migrate.add_argument("csv_file")
+    migrate.add_argument("db_file")
+
+    export = sub.add_parser("export", help="write a catalog out as CSV")
+    export.add_argument("catalog_file")
+    export.add_argument("csv_file")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        read, written = migrate_csv(args.csv_file, args.db_file)
+        print(f"[Storage] Migrated {written} of {read} rows "
+              f"({read - written} duplicate barcodes skipped) into '{args.db_file}'")
+    else:
+        count = export_csv(open_catalog(args.catalog_file), args.csv_file)
+        print(f"[Storage] Exported {count} rows to '{args.csv_file}'")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,199 @@
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from isbn import normalize_isbn
+from storage import open_catalog
+
+# -----------------------------------------------------------------------
+# Local stand-in for the Google Books volumes API — used to exercise the
+# ingestion/scan paths without network access or quota.
+#
+#   python stub_books_api.py --port 8765 --catalog books.csv
+#   python ingest.py isbns.txt --api-url "http://127.0.0.1:8765/books/v1/volumes?q=isbn:{isbn}"
+#
+# ISBNs found in the fixture catalog are answered from it. With
+# --synthetic, any other ISBN gets a generated volume. Otherwise the stub
+# reports "totalItems": 0, the same as Google Books for an unknown ISBN.
+# Like the real API it keeps connections alive, honours gzip and answers
+# If-None-Match with 304 Not Modified.
+#
+# --latency-ms / --jitter-ms delay every answer, and --error-rate answers
+# that share of requests with 503 backendError, to rehearse a slow or
+# flaky API (see bench_scan.py).
+# -----------------------------------------------------------------------
+
+
+def volume_from_row(row):
+    return {
+        "volumeInfo": {
+            "title": row.get('title', ''),
+            "authors": [a.strip() for a in row.get('author', '').split(',') if a.strip()],
+            "categories": [row.get('genre', '')] if row.get('genre') else [],
+            "publisher": row.get('publisher', ''),
+        }
+    }
+
+
+def synthetic_volume(isbn, category="STUB"):
+    return {
+        "volumeInfo": {
+            "title": f"Synthetic Book {isbn}",
+            "authors": ["Stub Author"],
+            "categories": [category],
+            "publisher": "Stub Press",
+            "publishedDate": "2000",
+        }
+    }
+
+
+ERROR_PAYLOAD = {"error": {"code": 503, "message": "Backend Error",
+                           "errors": [{"reason": "backendError"}]}}
+
+
+class StubBooksAPI:
+    def __init__(self, books=None, synthetic=False, host="127.0.0.1", port=0,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=None):
+        """latency/jitter: seconds added to every answer (jitter is the +/- spread);
+        error_rate: share of requests answered with 503."""
+        # books: normalized isbn -> volume dict
+        self.books = dict(books or {})
+        self.synthetic = synthetic
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._make_handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @classmethod
+    def from_catalog(cls, path, **kwargs):
+        catalog = open_catalog(path)
+        books = {}
+        for row in catalog.rows():
+            books[normalize_isbn(row['barcode'])] = volume_from_row(row)
+        return cls(books, **kwargs)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/books/v1/volumes"
+
+    @property
+    def isbn_url(self):
+        return self.base_url + "?q=isbn:{isbn}"
+
+    @property
+    def category_url(self):
+        return self.base_url + "?q=subject:{category}&maxResults=10"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def respond(self, query):
+        """Returns (status, payload) for a volumes query string."""
+        q = urllib.parse.parse_qs(query).get("q", [""])[0]
+        if q.startswith("isbn:"):
+            isbn = normalize_isbn(q[len("isbn:"):])
+            volume = self.books.get(isbn)
+            if volume is None and self.synthetic:
+                volume = synthetic_volume(isbn)
+            items = [volume] if volume else []
+        elif q.startswith("subject:"):
+            subject = q[len("subject:"):]
+            items = [v for v in self.books.values()
+                     if subject in v["volumeInfo"].get("categories", [])][:10]
+            if not items and self.synthetic:
+                items = [synthetic_volume(f"{subject}-{i}", subject) for i in range(10)]
+        else:
+            return 400, {"error": {"code": 400, "message": "Missing query."}}
+        return 200, {"kind": "books#volumes", "totalItems": len(items), "items": items}
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are separate writes; don't let Nagle hold the body back
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    delay = max(0.0, stub.latency + stub._rng.uniform(-stub.jitter, stub.jitter))
+                    failed = stub._rng.random() < stub.error_rate
+                    stub.errors += failed
+                if delay:
+                    time.sleep(delay)
+                parsed = urllib.parse.urlsplit(self.path)
+                status, payload = (503, ERROR_PAYLOAD) if failed else stub.respond(parsed.query)
+                body = json.dumps(payload).encode()
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+
+                if status == 200 and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=UTF-8")
+                if status == 200:
+                    self.send_header("ETag", etag)
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stub of the Google Books volumes API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--catalog", help="CSV file whose books are served as fixtures")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="answer unknown ISBNs with a generated volume")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every answer")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="+/- random spread of the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args(argv)
+
+    kwargs = {"synthetic": args.synthetic, "host": args.host, "port": args.port,
+              "latency": args.latency_ms / 1000, "jitter": args.jitter_ms / 1000,
+              "error_rate": args.error_rate}
+    stub = StubBooksAPI.from_catalog(args.catalog, **kwargs) if args.catalog else StubBooksAPI(**kwargs)
+    print(f"[Stub] Serving {len(stub.books)} books at {stub.isbn_url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import time
+
+import backends
+from backends import BackendTuner
+
+BLANK, BARCODE = "blank", "barcode"
+
+
+class FakeBackend:
+    def __init__(self, name, blank_seconds, barcode_seconds):
+        self.name = name
+        self.seconds = {BLANK: blank_seconds, BARCODE: barcode_seconds}
+
+    def decode(self, image):
+        time.sleep(self.seconds[image])
+        return [{"data": "9780306406157"}] if image == BARCODE else []
+
+
+def test_latency_is_measured_on_frames_with_a_barcode(monkeypatch):
+    # Instant on empty frames but slow on real ones, vs. steady on both
+    fakes = {"bursty": FakeBackend("bursty", 0.0, 0.03), "steady": FakeBackend("steady", 0.005, 0.005)}
+    monkeypatch.setattr(backends, "get_backend", fakes.get)
+    tuner = BackendTuner(names=["bursty", "steady"], samples=3)
+
+    for _ in range(10):
+        assert tuner(BLANK) == []
+    for _ in range(3):
+        assert tuner(BARCODE)
+
+    assert tuner.choice.name == "steady"
+    assert tuner.report()["bursty"]["hit_rate"] == 1.0
@@ -0,0 +1,49 @@
+import time
+
+from background import BackgroundRunner
+
+
+class FakeRoot:
+    """Stands in for Tk: after() callbacks run when pump() is called."""
+
+    def __init__(self):
+        self.callbacks = []
+
+    def after(self, ms, fn):
+        self.callbacks.append(fn)
+
+    def pump(self, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while self.callbacks and time.monotonic() < deadline:
+            callbacks, self.callbacks = self.callbacks, []
+            for fn in callbacks:
+                fn()
+            time.sleep(0.005)
+
+
+def fail():
+    raise RuntimeError("service down")
+
+
+def test_failure_goes_to_on_error():
+    root = FakeRoot()
+    runner = BackgroundRunner(root)
+    done, errors = [], []
+    runner.submit("job", fail, on_done=done.append, on_error=errors.append)
+    root.pump()
+    runner.shutdown()
+
+    assert done == []
+    assert [str(e) for e in errors] == ["service down"]
+
+
+def test_result_goes_to_on_done():
+    root = FakeRoot()
+    runner = BackgroundRunner(root)
+    done, errors = [], []
+    runner.submit("job", sum, [1, 2], on_done=done.append, on_error=errors.append)
+    root.pump()
+    runner.shutdown()
+
+    assert done == [3]
+    assert errors == []
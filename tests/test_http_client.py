@@ -0,0 +1,151 @@
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from http_client import HostPool, HttpClient
+from stub_books_api import StubBooksAPI
+
+ISBN = "9780446677455"
+
+
+@pytest.fixture
+def stub():
+    stub = StubBooksAPI(synthetic=True).start()
+    yield stub
+    stub.stop()
+
+
+@pytest.fixture
+def client():
+    client = HttpClient(max_per_host=2, timeout=5)
+    yield client
+    client.close()
+
+
+def test_keep_alive_connection_is_reused(stub, client):
+    for i in range(5):
+        client.get(stub.isbn_url.format(isbn=f"97804466774{i:02d}"))
+
+    assert client.stats["connections"] == 1
+    assert client.stats["reused"] == 4
+
+
+def test_gzip_body_is_decoded(stub, client):
+    response = client.get(stub.isbn_url.format(isbn=ISBN))
+
+    assert response.headers.get("Content-Encoding") == "gzip"
+    assert response.json()["items"][0]["volumeInfo"]["title"] == f"Synthetic Book {ISBN}"
+
+
+def test_etag_revalidation_serves_remembered_body(stub, client):
+    url = stub.isbn_url.format(isbn=ISBN)
+    first = client.get(url)
+    second = client.get(url)
+
+    assert not first.revalidated
+    assert second.revalidated
+    assert second.status == 200
+    assert second.body == first.body
+    assert client.stats["not_modified"] == 1
+
+
+def test_304_without_remembered_body_is_refetched(stub, client):
+    url = stub.isbn_url.format(isbn=ISBN)
+    other = HttpClient()
+    etag = other.get(url).headers["ETag"]
+    other.close()
+
+    # e.g. an ETag kept across a restart, or evicted from the client's LRU
+    response = client.get(url, headers={"If-None-Match": etag})
+
+    assert response.status == 200
+    assert response.json()["totalItems"] == 1
+    assert stub.requests == 3
+
+
+class OneShotHandler(BaseHTTPRequestHandler):
+    """Answers one keep-alive request per connection, then hangs up while the
+    client still thinks the connection is reusable (an idle-timeout close)."""
+
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+
+    def handle(self):
+        self.handle_one_request()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(cls.delay)
+        with cls.lock:
+            cls.active -= 1
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def one_shot_server():
+    handler = type("Handler", (OneShotHandler,), {"active": 0, "peak": 0, "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server, handler
+    server.shutdown()
+    server.server_close()
+
+
+def test_stale_keep_alive_connection_is_retried_on_a_fresh_one(one_shot_server, client):
+    server, _ = one_shot_server
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    assert client.get(url).body == b"ok"
+    time.sleep(0.05)   # Let the server's close reach the idle connection
+    assert client.get(url).body == b"ok"
+
+    assert client.stats["reused"] == 1
+    assert client.stats["connections"] == 2
+
+
+def test_host_pool_caps_connections_and_reuses_released_ones():
+    pool = HostPool("http", "127.0.0.1", 9, max_connections=2, timeout=0.1)
+    first, reused_first = pool.acquire()
+    second, _ = pool.acquire()
+    with pytest.raises(urllib.error.URLError):
+        pool.acquire()   # Both slots taken
+
+    pool.release(first, reusable=True)
+    again, reused_again = pool.acquire()
+    assert not reused_first
+    assert reused_again and again is first
+
+    pool.release(second, reusable=False)
+    pool.release(again, reusable=True)
+    pool.close()
+
+
+def test_concurrent_requests_stay_within_max_per_host(one_shot_server):
+    server, handler = one_shot_server
+    handler.delay = 0.05
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    client = HttpClient(max_per_host=2, timeout=5)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        bodies = list(pool.map(lambda _: client.get(url).body, range(8)))
+    client.close()
+
+    assert bodies == [b"ok"] * 8
+    assert handler.peak == 2
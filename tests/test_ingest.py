@@ -0,0 +1,154 @@
+import time
+import urllib.error
+
+import pytest
+
+import books_api
+import ingest as ingest_module
+from catalog import Catalog
+from http_client import HttpClient
+from ingest import TokenBucket, fetch_with_retry, ingest, resolve_many
+from isbn import isbn13_check_digit, normalize_isbn
+from metadata_cache import MetadataCache
+from stub_books_api import StubBooksAPI
+
+
+def make_isbns(n):
+    isbns = []
+    for i in range(n):
+        first12 = f"978{i:09d}"
+        isbns.append(first12 + isbn13_check_digit(first12))
+    return isbns
+
+
+@pytest.fixture
+def flaky_api(monkeypatch):
+    # Every third answer or so is a 503 backendError
+    stub = StubBooksAPI(synthetic=True, error_rate=0.3, seed=7).start()
+    monkeypatch.setattr(books_api, "GOOGLE_BOOKS_API", stub.isbn_url)
+    monkeypatch.setattr(books_api, "HTTP_CLIENT", HttpClient(max_per_host=4, timeout=5))
+    yield stub
+    books_api.HTTP_CLIENT.close()
+    stub.stop()
+
+
+def test_ingest_retries_503_and_writes_every_code(tmp_path, flaky_api):
+    codes = make_isbns(40)
+    catalog = Catalog(str(tmp_path / "books.csv"))
+
+    summary = ingest(codes, catalog, concurrency=4, rate=0, retries=8, backoff=0.001)
+
+    assert flaky_api.errors > 0
+    assert flaky_api.requests == len(codes) + flaky_api.errors
+    assert summary["failed"] == 0
+    assert summary["written"] == len(codes)
+    assert sorted(row["barcode"] for row in Catalog(str(tmp_path / "books.csv")).rows()) == sorted(codes)
+
+
+def test_ingest_rerun_is_idempotent(tmp_path, flaky_api):
+    codes = make_isbns(10)
+    path = str(tmp_path / "books.csv")
+    ingest(codes, Catalog(path), concurrency=4, rate=0, retries=8, backoff=0.001)
+    requests = flaky_api.requests
+
+    summary = ingest(codes, Catalog(path), concurrency=4, rate=0, retries=8, backoff=0.001)
+
+    assert summary["skipped_existing"] == len(codes)
+    assert summary["written"] == 0
+    assert flaky_api.requests == requests
+    assert Catalog(path).count() == len(codes)
+
+
+def http_error(status, retry_after=None):
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+    return urllib.error.HTTPError("http://books.test/", status, "error", headers, None)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff delays instead of sleeping."""
+    delays = []
+    monkeypatch.setattr(ingest_module.time, "sleep", delays.append)
+    return delays
+
+
+def scripted(monkeypatch, *outcomes):
+    """request_book_info raises/returns the outcomes in order; returns the call log."""
+    calls = []
+    outcomes = list(outcomes)
+
+    def request_book_info(code):
+        calls.append(code)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(books_api, "request_book_info", request_book_info)
+    return calls
+
+
+def test_token_bucket_limits_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(11):
+        bucket.acquire()
+    # The first token is free, the other ten come at 50 per second
+    assert time.monotonic() - started >= 0.18
+
+
+def test_token_bucket_allows_burst_and_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate=1, burst=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.1
+
+    unlimited = TokenBucket(rate=0)
+    for _ in range(1000):
+        unlimited.acquire()
+
+
+def test_fetch_with_retry_backs_off_exponentially_on_5xx(monkeypatch, sleeps):
+    book = {"title": "T"}
+    calls = scripted(monkeypatch, http_error(503), http_error(500), book)
+
+    assert fetch_with_retry("9780000000002", TokenBucket(0), retries=3, backoff=1.0) == book
+    assert len(calls) == 3
+    # backoff * 2**attempt, with 50-100% jitter
+    assert 0.5 <= sleeps[0] <= 1.0
+    assert 1.0 <= sleeps[1] <= 2.0
+
+
+def test_fetch_with_retry_honours_retry_after_on_429(monkeypatch, sleeps):
+    scripted(monkeypatch, http_error(429, retry_after="7"), None)
+
+    assert fetch_with_retry("9780000000002", TokenBucket(0), retries=3, backoff=1.0) is None
+    assert sleeps == [7.0]
+
+
+def test_fetch_with_retry_gives_up(monkeypatch, sleeps):
+    calls = scripted(monkeypatch, http_error(503), http_error(503), http_error(503))
+    with pytest.raises(urllib.error.HTTPError):
+        fetch_with_retry("9780000000002", TokenBucket(0), retries=2, backoff=0.01)
+    assert len(calls) == 3
+
+    calls = scripted(monkeypatch, http_error(400))
+    with pytest.raises(urllib.error.HTTPError):
+        fetch_with_retry("9780000000002", TokenBucket(0), retries=5, backoff=0.01)
+    assert len(calls) == 1   # Not a retryable status
+
+
+def test_resolve_many_skips_cached_codes(tmp_path, monkeypatch):
+    cached, fresh = make_isbns(2)
+    cache = MetadataCache(str(tmp_path / "cache.sqlite3"))
+    cache.put(normalize_isbn(cached), {"title": "Cached"})
+    calls = scripted(monkeypatch, {"title": "Fetched"})
+
+    results, failures = resolve_many([cached, fresh], cache=cache, concurrency=2, rate=0)
+    cache.close()
+
+    assert calls == [fresh]
+    assert failures == {}
+    assert results[cached]["title"] == "Cached"
+    assert results[fresh]["title"] == "Fetched"
@@ -0,0 +1,24 @@
+from isbn import canonical_code, is_valid_barcode
+
+
+def test_check_digit_applies_to_ean_upc_isbn_lengths():
+    assert is_valid_barcode("9780306406157")
+    assert not is_valid_barcode("9780306406158")     # EAN-13, bad check digit
+    assert is_valid_barcode("0306406152")
+    assert not is_valid_barcode("0306406153")        # ISBN-10, bad check digit
+    assert is_valid_barcode("036000291452")
+    assert not is_valid_barcode("036000291453")      # UPC-A, bad check digit
+
+
+def test_other_symbologies_pass_unless_strict():
+    codabar = "31234000567890"                       # 14-digit library item
+    assert is_valid_barcode(codabar)
+    assert not is_valid_barcode(codabar, strict=True)
+    assert is_valid_barcode("LIB-123A")
+    assert not is_valid_barcode("")
+
+
+def test_canonical_code_only_cleans_isbn_ean():
+    assert canonical_code("978-0-306-40615-7") == "9780306406157"
+    assert canonical_code("LIB-123A") == "LIB-123A"
+    assert canonical_code(" 31234000567890 ") == "31234000567890"
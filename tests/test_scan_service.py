@@ -0,0 +1,28 @@
+import asyncio
+import time
+
+from catalog import Catalog
+from scan_service import ScanService
+
+
+class SlowCatalog(Catalog):
+    def add_many(self, rows, allow_duplicate=False):
+        time.sleep(0.2)   # A batch is still being written when stop() is called
+        return super().add_many(rows, allow_duplicate=allow_duplicate)
+
+
+def test_stop_waits_for_queued_and_in_flight_writes(tmp_path):
+    path = str(tmp_path / "books.csv")
+    service = ScanService(SlowCatalog(path), batch_size=2, batch_delay=0.01)
+
+    async def run():
+        await service.start(port=0)
+        writes = [asyncio.ensure_future(service.write({'title': f't{i}', 'barcode': str(i), 'genre': 'g'}))
+                  for i in range(5)]
+        await asyncio.sleep(0.05)
+        await service.stop()
+        # Writes dropped by stop() would never resolve
+        return await asyncio.wait_for(asyncio.gather(*writes), 5)
+
+    assert asyncio.run(run()) == [True] * 5
+    assert Catalog(path).count() == 5
@@ -0,0 +1,54 @@
+from catalog import Catalog
+from snapshot import SnapshotCatalog
+
+HEADER = b"title,barcode,genre,author,publisher\r\n"
+
+
+def write_csv(path, body):
+    with open(path, mode='wb') as f:
+        f.write(HEADER + body)
+
+
+def test_complete_last_row_without_newline_is_kept(tmp_path):
+    path = str(tmp_path / "books.csv")
+    write_csv(path, b"A,111,g,a,p\r\nB,222,g,a,p")
+
+    catalog = SnapshotCatalog(path)
+    assert catalog.count() == Catalog(path).count() == 2
+    assert catalog.get('222')['title'] == 'B'
+
+    assert catalog.add({'title': 'C', 'barcode': '333', 'genre': 'g'})
+    catalog.close()
+
+    rows = Catalog(path).rows()
+    assert [row['barcode'] for row in rows] == ['111', '222', '333']
+    assert SnapshotCatalog(path).get('222')['title'] == 'B'
+
+
+def test_torn_last_row_is_skipped_but_not_cut(tmp_path):
+    path = str(tmp_path / "books.csv")
+    write_csv(path, b"A,111,g,a,p\r\nB,22")
+
+    catalog = SnapshotCatalog(path)
+    assert catalog.count() == 1
+    assert catalog.add({'title': 'C', 'barcode': '333', 'genre': 'g'})
+    catalog.close()
+
+    with open(path, mode='rb') as f:
+        data = f.read()
+    assert b"B,22\r\n" in data
+    assert data.endswith(b"C,333,g,,\r\n")
+    assert Catalog(path).get('333')['title'] == 'C'
+
+
+def test_rows_appended_by_another_desk_survive(tmp_path):
+    path = str(tmp_path / "books.csv")
+    write_csv(path, b"A,111,g,a,p\r\n")
+    catalog = SnapshotCatalog(path)
+
+    # Another desk appends between our refreshes
+    Catalog(path).add({'title': 'B', 'barcode': '222', 'genre': 'g'})
+    assert catalog.add({'title': 'C', 'barcode': '333', 'genre': 'g'})
+    catalog.close()
+
+    assert [row['barcode'] for row in Catalog(path).rows()] == ['111', '222', '333']
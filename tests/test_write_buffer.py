@@ -0,0 +1,47 @@
+import pytest
+
+from catalog import Catalog
+from snapshot import SnapshotCatalog
+from write_buffer import BufferedCatalog
+
+HEADER = "title,barcode,genre,author,publisher\r\n"
+
+
+def append_line(path, line):
+    # Another desk writing the same book at the same moment
+    with open(path, mode='a', newline='', encoding='utf-8') as f:
+        f.write(line + "\r\n")
+
+
+@pytest.fixture(params=[Catalog, SnapshotCatalog], ids=["csv", "snapshot"])
+def books_csv(request, tmp_path):
+    path = str(tmp_path / "books.csv")
+    with open(path, mode='w', newline='', encoding='utf-8') as f:
+        # 111 twice: a duplicate confirmed in an earlier session
+        f.write(HEADER + "A,111,g,,\r\nA again,111,g,,\r\n")
+    return path, request.param
+
+
+def test_compaction_removes_duplicates_the_buffer_wrote(books_csv):
+    path, catalog_class = books_csv
+    buffered = BufferedCatalog(catalog_class(path), flush_seconds=60)
+    assert buffered.add({'title': 'B', 'barcode': '222', 'genre': 'g'})
+    buffered.flush()
+    append_line(path, "B other desk,222,g,,")
+
+    assert buffered.compact() == 1
+    buffered.close()
+
+    assert [row['title'] for row in Catalog(path).rows()] == ['A', 'A again', 'B']
+
+
+def test_confirmed_duplicates_survive_close(books_csv):
+    path, catalog_class = books_csv
+    buffered = BufferedCatalog(catalog_class(path), flush_seconds=60)
+    assert buffered.allows_duplicates
+    assert buffered.add({'title': 'C', 'barcode': '333', 'genre': 'g'})
+    assert not buffered.add({'title': 'C rejected', 'barcode': '333', 'genre': 'g'})
+    assert buffered.add({'title': 'C confirmed', 'barcode': '333', 'genre': 'g'}, allow_duplicate=True)
+    buffered.close()
+
+    assert [row['title'] for row in Catalog(path).rows()] == ['A', 'A again', 'C', 'C confirmed']
@@ -0,0 +1,172 @@
+import threading
+import time
+from collections import deque
+
+from isbn import is_valid_barcode
+
+# -----------------------------------------------------------------------
+# Temporal confirmation — in continuous scanning the same book stays in
+# view for dozens of frames, and a single misread must not reach the API
+# or the catalog. A code is emitted only after:
+#
+#   1. it passes the ISBN/EAN/UPC check-digit test,
+#   2. it was read required_reads times within window seconds, and
+#   3. it was not already emitted in the last cooldown seconds.
+# -----------------------------------------------------------------------
+
+DEFAULT_REQUIRED_READS = 3
+DEFAULT_WINDOW = 1.5
+DEFAULT_COOLDOWN = 30.0
+
+# RoiTracker: padding around the last hit, as a fraction of its larger side
+DEFAULT_TRACK_PADDING = 0.25
+MIN_TRACK_PADDING = 24
+# Consecutive ROI misses, or seconds without a hit, before the track is dropped
+DEFAULT_MAX_MISSES = 3
+DEFAULT_MAX_AGE = 1.0
+
+
+class ScanConfirmer:
+    def __init__(self, required_reads=DEFAULT_REQUIRED_READS, window=DEFAULT_WINDOW,
+                 cooldown=DEFAULT_COOLDOWN, strict=False):
+        self.required_reads = max(1, required_reads)
+        self.window = window
+        self.cooldown = cooldown
+        self.strict = strict
+        self.stats = {"observed": 0, "invalid": 0, "confirmed": 0, "suppressed": 0}
+
+        self._reads = {}         # code -> deque of read timestamps inside the window
+        self._last_emit = {}     # code -> time it was last emitted
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+
+    def observe(self, code, now=None):
+        """Records one read. Returns the code when it becomes confirmed, else None."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.stats["observed"] += 1
+            if not is_valid_barcode(code, strict=self.strict):
+                self.stats["invalid"] += 1
+                return None
+
+            last = self._last_emit.get(code)
+            if last is not None and now - last < self.cooldown:
+                self.stats["suppressed"] += 1
+                return None
+
+            reads = self._reads.setdefault(code, deque())
+            reads.append(now)
+            while reads and now - reads[0] > self.window:
+                reads.popleft()
+
+            self._prune(now)
+
+            if len(reads) < self.required_reads:
+                return None
+
+            del self._reads[code]
+            self._last_emit[code] = now
+            self.stats["confirmed"] += 1
+            return code
+
+    def observe_all(self, results, now=None):
+        """Feeds every decoded result of one frame; returns the newly confirmed ones."""
+        confirmed = []
+        seen = set()
+        for result in results:
+            code = result["data"]
+            if code in seen:
+                continue
+            seen.add(code)
+            if self.observe(code, now=now):
+                confirmed.append(result)
+        return confirmed
+
+    def _prune(self, now):
+        # Drop stale state once per window so memory stays flat on long runs
+        if now - self._last_prune < self.window:
+            return
+        self._last_prune = now
+        for code in [c for c, reads in self._reads.items() if not reads or now - reads[-1] > self.window]:
+            del self._reads[code]
+        for code in [c for c, t in self._last_emit.items() if now - t >= self.cooldown]:
+            del self._last_emit[code]
+
+
+# -----------------------------------------------------------------------
+# ROI tracking — once a barcode is found, the next frames only need to
+# look where it was. RoiTracker keeps the box around the last hit (the
+# union of all rects in it); VariantCascade.decode() then decodes just
+# that box, padded for hand movement, instead of the guide box and the
+# full frame. After a few consecutive misses, or when the last hit is
+# too old, the track is dropped and the full cascade takes over again.
+# -----------------------------------------------------------------------
+
+class RoiTracker:
+    def __init__(self, padding=DEFAULT_TRACK_PADDING, max_misses=DEFAULT_MAX_MISSES,
+                 max_age=DEFAULT_MAX_AGE):
+        self.padding = padding
+        self.max_misses = max(1, max_misses)
+        self.max_age = max_age
+        self.stats = {"acquired": 0, "tracked_hits": 0, "misses": 0, "lost": 0}
+
+        self._box = None        # (x, y, w, h) of the last hit
+        self._last_hit = 0.0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def tracking(self):
+        with self._lock:
+            return self._box is not None
+
+    def _drop(self):
+        self._box = None
+        self._misses = 0
+        self.stats["lost"] += 1
+
+    def roi(self, shape, now=None):
+        """Padded (x1, y1, x2, y2) to decode in a frame of this shape, or None for a full search."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._box is None:
+                return None
+            if now - self._last_hit > self.max_age:
+                self._drop()
+                return None
+            x, y, w, h = self._box
+        pad = max(MIN_TRACK_PADDING, int(self.padding * max(w, h)))
+        height, width = shape[:2]
+        x1, y1 = max(0, x - pad), max(0, y - pad)
+        x2, y2 = min(width, x + w + pad), min(height, y + h + pad)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+        return x1, y1, x2, y2
+
+    def update(self, results, now=None):
+        """Records a hit; results must carry frame-coordinate rects."""
+        rects = [r["rect"] for r in results if r.get("rect")]
+        if not rects:
+            return
+        x1 = min(x for x, _, _, _ in rects)
+        y1 = min(y for _, y, _, _ in rects)
+        x2 = max(x + w for x, _, w, _ in rects)
+        y2 = max(y + h for _, y, _, h in rects)
+        with self._lock:
+            self.stats["tracked_hits" if self._box is not None else "acquired"] += 1
+            self._box = (x1, y1, x2 - x1, y2 - y1)
+            self._last_hit = time.monotonic() if now is None else now
+            self._misses = 0
+
+    def miss(self):
+        with self._lock:
+            if self._box is None:
+                return
+            self.stats["misses"] += 1
+            self._misses += 1
+            if self._misses >= self.max_misses:
+                self._drop()
+
+    def snapshot_stats(self):
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,234 @@
+import threading
+import time
+
+from catalog import FIELDNAMES
+from metrics import METRICS
+
+# -----------------------------------------------------------------------
+# Write buffer — group commit for catalog appends.
+#
+# BufferedCatalog wraps any catalog (CSV, SQLite, remote). add() only
+# checks for duplicates in memory and queues the row. A flusher thread
+# writes the queue in one add_many call (one fsync'ed append / one
+# transaction) once FLUSH_ROWS rows are waiting or the oldest has waited
+# FLUSH_SECONDS. After COMPACT_EVERY flushed rows, and on close(), the
+# catalog is compacted: an atomic rewrite without duplicate barcodes
+# (SQLite: WAL checkpoint). On catalogs that allow duplicates (CSV) only
+# barcodes this buffer wrote are de-duplicated — e.g. when another desk
+# appended the same book at the same moment. Duplicates the user
+# confirmed (add(..., allow_duplicate=True), written straight through)
+# and those already in the file are kept.
+#
+# Queued rows are visible to get() / `in` right away. Listing queries
+# flush first, so they always see everything that was added.
+# -----------------------------------------------------------------------
+
+DEFAULT_FLUSH_ROWS = 256
+DEFAULT_FLUSH_SECONDS = 0.5
+DEFAULT_COMPACT_EVERY = 10_000
+
+
+class BufferedCatalog:
+    def __init__(self, catalog, flush_rows=DEFAULT_FLUSH_ROWS, flush_seconds=DEFAULT_FLUSH_SECONDS,
+                 compact_every=DEFAULT_COMPACT_EVERY):
+        self.catalog = catalog
+        self.path = catalog.path
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.compact_every = compact_every
+        self.stats = {"queued": 0, "rejected": 0, "flushes": 0, "flushed": 0, "compactions": 0, "removed": 0}
+
+        self._pending = []       # rows waiting for the next flush, in order
+        self._pending_by_barcode = {}
+        self._oldest = None      # monotonic time the oldest pending row was queued
+        self._since_compact = 0
+        self._written = set()    # barcodes flushed by this buffer; compaction scope on CSV
+        self._closed = False
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        # Only one flush/compaction at a time; held while writing
+        self._flush_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="catalog-flush", daemon=True)
+        self._thread.start()
+
+    @property
+    def allows_duplicates(self):
+        return getattr(self.catalog, "allows_duplicates", False)
+
+    @property
+    def version(self):
+        # Changes on every queued row as well as on every write to the catalog
+        return self.catalog.version + self.stats["queued"]
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def add(self, row, allow_duplicate=False):
+        """Queues one book. Returns False if the barcode is already in the catalog or queued."""
+        return self.add_many([row], allow_duplicate=allow_duplicate) == 1
+
+    def add_many(self, rows, allow_duplicate=False):
+        """Queues books for the next group commit. Returns how many were accepted.
+
+        With allow_duplicate on a catalog that allows duplicates, the queue is
+        flushed and the rows are written straight through (Add Book's "Add anyway?").
+        """
+        if allow_duplicate and self.allows_duplicates:
+            self.flush()
+            with self._lock:
+                # Confirmed by the user: compaction must leave these alone
+                self._written.difference_update(str(row.get('barcode') or '') for row in rows)
+            return self.catalog.add_many(rows, allow_duplicate=True)
+        accepted = []
+        with self._lock:
+            for row in rows:
+                clean = {key: str(row.get(key) or '') for key in FIELDNAMES}
+                barcode = clean['barcode']
+                if barcode in self._pending_by_barcode:
+                    self.stats["rejected"] += 1
+                    continue
+                self._pending_by_barcode[barcode] = clean
+                accepted.append(clean)
+
+        # Checking the catalog may touch the disk; do it outside the lock
+        fresh = [row for row in accepted if row['barcode'] not in self.catalog]
+        fresh_ids = {id(row) for row in fresh}
+        with self._lock:
+            for row in accepted:
+                if id(row) not in fresh_ids:
+                    self._pending_by_barcode.pop(row['barcode'], None)
+                    self.stats["rejected"] += 1
+            if fresh:
+                first = not self._pending
+                if first:
+                    self._oldest = time.monotonic()
+                self._pending.extend(fresh)
+                self.stats["queued"] += len(fresh)
+                # Wake the flusher to start the timer, or to flush a full buffer
+                if first or len(self._pending) >= self.flush_rows:
+                    self._wake.notify()
+        return len(fresh)
+
+    def flush(self):
+        """Writes every queued row now. Returns how many rows the catalog wrote."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending, self._oldest = self._pending, [], None
+            if not rows:
+                return 0
+            try:
+                with METRICS.timer("catalog_group_commit"):
+                    written = self.catalog.add_many(rows)
+            except Exception:
+                with self._lock:
+                    # Keep them for the next attempt, ahead of anything queued meanwhile
+                    self._pending[:0] = rows
+                    self._oldest = time.monotonic()
+                raise
+            with self._lock:
+                for row in rows:
+                    self._pending_by_barcode.pop(row['barcode'], None)
+                    self._written.add(row['barcode'])
+                self.stats["flushes"] += 1
+                self.stats["flushed"] += written
+                self._since_compact += written
+                compact_due = self.compact_every and self._since_compact >= self.compact_every
+            if compact_due:
+                self._compact_locked()
+            return written
+
+    def compact(self):
+        with self._flush_lock:
+            return self._compact_locked()
+
+    def _compact_locked(self):
+        compact = getattr(self.catalog, "compact", None)
+        if compact is None:
+            return 0
+        if self.allows_duplicates:
+            with self._lock:
+                barcodes = set(self._written)
+            removed = compact(barcodes) if barcodes else 0
+        else:
+            removed = compact()
+        with self._lock:
+            self._since_compact = 0
+            self.stats["compactions"] += 1
+            self.stats["removed"] += removed
+        if removed:
+            print(f"[Catalog] Compaction removed {removed} duplicate rows")
+        return removed
+
+    def _run(self):
+        with self._lock:
+            while not self._closed:
+                if not self._pending:
+                    self._wake.wait()
+                    continue
+                due = self._oldest + self.flush_seconds - time.monotonic()
+                if len(self._pending) < self.flush_rows and due > 0:
+                    self._wake.wait(due)
+                    continue
+                self._lock.release()
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"[Catalog] Flush failed, will retry: {e}")
+                    time.sleep(self.flush_seconds)
+                finally:
+                    self._lock.acquire()
+
+    def close(self):
+        """Flushes, compacts (see _compact_locked) and stops the flusher thread."""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+        self._thread.join()
+        self.flush()
+        self.compact()
+        close = getattr(self.catalog, "close", None)
+        if close is not None:
+            close()
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def refresh(self):
+        self.catalog.refresh()
+
+    def get(self, barcode):
+        with self._lock:
+            row = self._pending_by_barcode.get(barcode)
+        return dict(row) if row is not None else self.catalog.get(barcode)
+
+    def __contains__(self, barcode):
+        with self._lock:
+            if barcode in self._pending_by_barcode:
+                return True
+        return barcode in self.catalog
+
+    def count(self):
+        self.flush()
+        return self.catalog.count()
+
+    def rows(self):
+        self.flush()
+        return self.catalog.rows()
+
+    def page(self, offset, limit):
+        self.flush()
+        return self.catalog.page(offset, limit)
+
+    def titles(self):
+        self.flush()
+        return self.catalog.titles()
+
+    def books_in_genre(self, genre):
+        self.flush()
+        return self.catalog.books_in_genre(genre)
+
+    def books_by_author(self, author):
+        self.flush()
+        return self.catalog.books_by_author(author)